@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of counting points per quarter mesh.
+
+Compares from_coordinate() with a dictionary of code strings,
+MeshAggregator.update() and MeshAggregator.add_array() (requires NumPy).
+"""
+
+import random
+import timeit
+
+from jpmesh import Angle, Coordinate, MeshAggregator, QuarterMesh
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    rand = random.Random(0)
+    points = [
+        (rand.uniform(139.0, 140.0), rand.uniform(35.0, 36.0))
+        for _ in range(100000)]
+
+    def from_coordinate():
+        """Count the points with from_coordinate() and a dictionary."""
+        counts = {}
+        for lon, lat in points:
+            code = QuarterMesh.from_coordinate(Coordinate(
+                lon=Angle.from_degree(lon), lat=Angle.from_degree(lat))).code
+            counts[code] = counts.get(code, 0) + 1
+
+    def aggregator():
+        """Count the points with MeshAggregator."""
+        MeshAggregator(QuarterMesh).update(points)
+
+    def measure(func):
+        """Returns the time per point in microseconds."""
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        return seconds / len(points) * 1e6
+
+    base = measure(from_coordinate)
+    fast = measure(aggregator)
+    print('from_coordinate: {0:.2f} us'.format(base))
+    print('update():        {0:.2f} us ({1:.1f}x)'.format(fast, base / fast))
+    if numpy is None:
+        return
+    lons, lats = (numpy.array(column) for column in zip(*points))
+    vectorized = measure(
+        lambda: MeshAggregator(QuarterMesh).add_array(lons, lats))
+    print('add_array():     {0:.2f} us ({1:.1f}x)'.format(
+        vectorized, base / vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of encoding coordinates to mesh codes for each mesh level.
+
+Compares the Angle and Coordinate object chain of the original
+SomeMesh.from_coordinate() with jpmesh.encode()
+in the floating point mode and the exact mode.
+"""
+
+import os
+import random
+import sys
+import timeit
+
+from jpmesh import MESH_CLASSES, encode
+
+# The object chain of the original from_coordinate() is kept in the tests.
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'test'))
+from test_mesh import reference_code # pylint: disable=C0413
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    rand = random.Random(0)
+    points = [
+        (rand.uniform(123.0, 153.0), rand.uniform(24.0, 45.0))
+        for _ in range(10000)]
+
+    def from_objects(mesh_class):
+        """Encode the points with the object chain."""
+        for lon, lat in points:
+            reference_code(lon, lat, mesh_class)
+
+    def from_encode(mesh_class, exact=False):
+        """Encode the points with encode()."""
+        for lon, lat in points:
+            encode(lon, lat, mesh_class, exact=exact)
+
+    def measure(func, *args):
+        """Returns the time per point in microseconds."""
+        seconds = min(timeit.repeat(lambda: func(*args), number=1, repeat=3))
+        return seconds / len(points) * 1e6
+
+    print('{0:<14s}{1:>18s}{2:>18s}{3:>18s}'.format(
+        'mesh', 'objects', 'encode', 'encode(exact)'))
+    for mesh_class in MESH_CLASSES:
+        base = measure(from_objects, mesh_class)
+        fast = measure(from_encode, mesh_class)
+        exact = measure(from_encode, mesh_class, True)
+        print('{0:<14s}{1:>15.2f} us{2:>8.2f} us ({3:4.1f}x){4:>8.2f} us '
+              '({5:4.1f}x)'.format(
+                  mesh_class.__name__, base, fast, base / fast,
+                  exact, base / exact))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of joining points with reference meshes of mixed levels.
+
+Compares from_coordinate() and a dictionary lookup at each level
+with jpmesh.MeshJoinIndex.
+"""
+
+import random
+import timeit
+
+from jpmesh import Angle, Coordinate, MeshJoinIndex, ThirdMesh, QuarterMesh
+from jpmesh import encode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    rand = random.Random(0)
+    references = {}
+    for _ in range(100000):
+        mesh_class = rand.choice((ThirdMesh, QuarterMesh))
+        references[encode(
+            rand.uniform(139.0, 140.0), rand.uniform(35.0, 36.0),
+            mesh_class)] = mesh_class.level
+    index = MeshJoinIndex(references.items())
+    points = [
+        (rand.uniform(139.0, 140.0), rand.uniform(35.0, 36.0))
+        for _ in range(100000)]
+
+    def from_coordinate():
+        """Join the points with from_coordinate() at each level."""
+        for lon, lat in points:
+            coord = Coordinate(
+                lon=Angle.from_degree(lon), lat=Angle.from_degree(lat))
+            for mesh_class in (QuarterMesh, ThirdMesh):
+                code = mesh_class.from_coordinate(coord).code
+                if code in references:
+                    break
+
+    def join_index():
+        """Join the points with MeshJoinIndex.lookup()."""
+        for lon, lat in points:
+            index.lookup(lon, lat)
+
+    def measure(func):
+        """Returns the time per point in microseconds."""
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        return seconds / len(points) * 1e6
+
+    base = measure(from_coordinate)
+    fast = measure(join_index)
+    print('from_coordinate: {0:.2f} us'.format(base))
+    print('lookup():        {0:.2f} us ({1:.1f}x)'.format(fast, base / fast))
+    if numpy is None:
+        return
+    lons, lats = (numpy.array(column) for column in zip(*points))
+    vectorized = measure(lambda: index.lookup_array(lons, lats))
+    print('lookup_array():  {0:.2f} us ({1:.1f}x)'.format(
+        vectorized, base / vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of encoding many coordinates in multiple processes.
+
+Shows the scaling of jpmesh.encode_parallel() from 1 to the number of CPUs.
+"""
+
+import multiprocessing
+import random
+import timeit
+
+from jpmesh import encode_parallel
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    rand = random.Random(0)
+    size = 1000000
+    lons = [rand.uniform(123.0, 153.0) for _ in range(size)]
+    lats = [rand.uniform(24.0, 45.0) for _ in range(size)]
+
+    print('{0:<10s}{1:>12s}{2:>16s}{3:>10s}'.format(
+        'workers', 'seconds', 'points/s', 'speedup'))
+    base = None
+    workers = 1
+    while True:
+        seconds = min(timeit.repeat(
+            lambda: encode_parallel(lons, lats, 6, workers=workers),
+            number=1, repeat=3))
+        base = base or seconds
+        print('{0:<10d}{1:>12.3f}{2:>16.0f}{3:>9.1f}x'.format(
+            workers, seconds, size / seconds, base / seconds))
+        if workers >= multiprocessing.cpu_count():
+            break
+        workers = min(workers * 2, multiprocessing.cpu_count())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,26 @@
 """
 Japan grid square code (JIS X 0410) utility for Python.
 """
+# The module is kept in one file to be used portably.
+# pylint: disable=C0302
 
+import argparse
+import array
+import binascii
+import collections
+import csv
+import io
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import numbers
+import os
 import re
+import struct
+import sys
+import time
 
 
 # Meta informations.
@@ -21,7 +39,11 @@ def _code_pattern_regex(pattern):
 
 class Angle(object):
     """Angles.
+
+    Angles are immutable and hold only a float in milliseconds.
     """
+    __slots__ = ('__millisecond',)
+
     def __init__(self, millisecond):
         """Initialize with degrees.
         """
@@ -51,6 +73,18 @@ class Angle(object):
         """
         return self.__millisecond
 
+    @property
+    def exact_millisecond(self):
+        """Returns the angle in milliseconds rounded to an integer.
+
+        All the mesh sizes are integers in milliseconds, so that mesh borders
+        are calculated exactly with integer division of this value.
+        """
+        return int(round(self.__millisecond))
+
+    def __reduce__(self):
+        return (Angle, (self.__millisecond,))
+
     def __add__(self, that):
         return Angle.from_millisecond(self.millisecond + that.millisecond)
 
@@ -137,7 +171,11 @@ class Angle(object):
 
 class Coordinate(object):
     """Coordinates with longitude and latitude.
+
+    Coordinates are immutable and hold only the two angles.
     """
+    __slots__ = ('__lon', '__lat')
+
     def __init__(self, lon, lat):
         """Initialize.
         :param lon: A longitude angle.
@@ -158,6 +196,9 @@ class Coordinate(object):
         """
         return self.__lat
 
+    def __reduce__(self):
+        return (Coordinate, (self.__lon, self.__lat))
+
     def __add__(self, that):
         return Coordinate(lon=self.lon + that.lon, lat=self.lat + that.lat)
 
@@ -201,26 +242,160 @@ class Coordinate(object):
 
 class JapanMesh(object):
     """Japan mesh base class.
+
+    A mesh is immutable and holds only the integer mesh code, which packs
+    the numbers of all the levels, and the level is the class variable.
+    The code string, the south-west border and the parent mesh are
+    calculated on each access.
+
+    Meshes are equal if their levels and codes are the same, so that they
+    can be dictionary keys and set members. They are sorted in the spatial
+    order (see spatial_key).
+
+    Note:
+        Class variables below must be defined for each subclass.
+
+        - level: The mesh level.
+        - size: The mesh size.
+
+        Each subclass must also define empty `__slots__`
+        to keep instances compact.
     """
-    def __init__(self, code, south_west):
-        """Initialize
-        :param code: The mesh code.
-        :param south_west: The coordinate at the south-west border.
+    __slots__ = ('__int_code',)
+    level = None
+    size = None
+
+    def __init__(self, code):
+        """Initialize.
+        :param code: The integer mesh code for the level of the class.
+        """
+        self.__int_code = code
+
+    def __reduce__(self):
+        return (_new_mesh, (self.level, self.__int_code))
+
+    def __hash__(self):
+        return hash(self.packed_code)
+
+    def __eq__(self, that):
+        if not isinstance(that, JapanMesh):
+            return NotImplemented
+        return self.level == that.level and self.int_code == that.int_code
+
+    def __ne__(self, that):
+        if not isinstance(that, JapanMesh):
+            return NotImplemented
+        return self.level != that.level or self.int_code != that.int_code
+
+    def __lt__(self, that):
+        if not isinstance(that, JapanMesh):
+            return NotImplemented
+        return self.spatial_key < that.spatial_key
+
+    def __le__(self, that):
+        if not isinstance(that, JapanMesh):
+            return NotImplemented
+        return self.spatial_key <= that.spatial_key
+
+    def __gt__(self, that):
+        if not isinstance(that, JapanMesh):
+            return NotImplemented
+        return self.spatial_key > that.spatial_key
+
+    def __ge__(self, that):
+        if not isinstance(that, JapanMesh):
+            return NotImplemented
+        return self.spatial_key >= that.spatial_key
+
+    @property
+    def spatial_key(self):
+        """Returns the key to sort meshes in the spatial order, which is
+        (level, row, column) in the grid of the level.
+
+        Meshes are sorted by the level, then from the south to the north,
+        and then from the west to the east.
+        """
+        return (self.level,) + _code_to_index(self.level, self.__int_code)
+
+    @property
+    def morton_key(self):
+        """Returns the Morton key (Z-order key) of the mesh
+        (see morton_key).
+        """
+        return _morton_key(
+            self.level, *_code_to_index(self.level, self.__int_code))
+
+    @property
+    def int_code(self):
+        """Returns the mesh code in an integer.
+        """
+        return self.__int_code
+
+    @property
+    def packed_code(self):
+        """Returns the packed mesh code, the 64-bit integer which includes
+        the level (see pack_mesh_code).
         """
-        self.__code = code
-        self.__south_west = south_west
+        return self.level * _PACKED_LEVEL_UNIT + self.__int_code
 
     @property
     def code(self):
         """Returns the mesh code.
         """
-        return self.__code
+        # The level is None only for the abstract classes.
+        return _CODE_FORMATS[self.level].format( # pylint: disable=E1126
+            self.__int_code)
 
     @property
     def south_west(self):
         """Returns the coordinate at the south-west border.
         """
-        return self.__south_west
+        west, south = _south_west_millisecond(self.level, self.__int_code)
+        return Coordinate(
+            lon=Angle.from_millisecond(west),
+            lat=Angle.from_millisecond(south))
+
+    @property
+    def parent_mesh(self):
+        """Returns the parent mesh, or None for 1st meshes.
+        """
+        if self.level == 1:
+            return None
+        return _create_mesh(
+            self.level - 1, self.__int_code // _PARENT_DIVISORS[self.level])
+
+    def parent(self, level=None):
+        """Returns the ancestor mesh of the level.
+
+        :param level: A mesh level number or a mesh class which is not
+            finer than this mesh. The parent level if None.
+        """
+        ancestor_level, code = _ancestor_code(
+            self.level, self.__int_code, level)
+        return _create_mesh(ancestor_level, code)
+
+    def children(self):
+        """Returns the child meshes in the spatial order,
+        or an empty list for the finest meshes.
+        """
+        if self.level == len(MESH_CLASSES):
+            return []
+        return [
+            _create_mesh(self.level + 1, code)
+            for code in _iter_descendant_codes(
+                self.level, self.__int_code, self.level + 1)]
+
+    def descendants(self, level):
+        """Yields the descendant meshes of the level lazily,
+        in the order of the codes.
+
+        :param level: A mesh level number or a mesh class which is not
+            coarser than this mesh.
+        """
+        descendant_level = _mesh_level(level)
+        for code in _iter_descendant_codes(
+                self.level, self.__int_code, descendant_level):
+            yield _create_mesh(descendant_level, code)
 
 
 class NumberDividedMesh(JapanMesh):
@@ -229,6 +404,7 @@ class NumberDividedMesh(JapanMesh):
     Note:
         Class variables below must be defined for each subclass.
 
+        - level: The mesh level (2 for 2nd meshes, 3 for 3rd meshes).
         - ParentMesh: The parent mesh.
         - divide_num: The number of division for the parent mesh.
         - size: The mesh size.
@@ -241,6 +417,8 @@ class NumberDividedMesh(JapanMesh):
     """
     # To improve performance,
     # these variables will be injected precalculated.
+    __slots__ = ()
+    level = None
     ParentMesh = None
     divide_num = None
     size = None
@@ -270,11 +448,8 @@ class NumberDividedMesh(JapanMesh):
                 'Invalid latitude number for {0}: {1:d}'
                 .format(self.__class__.__name__, lat_number))
 
-        code = '{0}{1:01d}{2:01d}'.format(
-            parent_mesh.code, lat_number, lon_number)
-        south_west = parent_mesh.south_west + Coordinate(
-            lon=self.size.lon * lon_number, lat=self.size.lat * lat_number)
-        JapanMesh.__init__(self, code, south_west)
+        JapanMesh.__init__(
+            self, parent_mesh.int_code * 100 + lat_number * 10 + lon_number)
 
     @classmethod
     def from_code(cls, code):
@@ -282,27 +457,18 @@ class NumberDividedMesh(JapanMesh):
 
         :param code: A mesh code.
         """
-        matches = cls.code_parse_regex.match(code)
-        if not matches:
-            raise ValueError(
-                'Invalid mesh code for {0}: {1}'
-                .format(cls.__name__, code))
-        parent_mesh = cls.ParentMesh.from_code(matches.group(1))
-        lat_number = int(matches.group(2))
-        lon_number = int(matches.group(3))
-        return cls(parent_mesh, lon_number, lat_number)
+        return _parse_mesh_code(code, cls)
 
     @classmethod
-    def from_coordinate(cls, coord):
+    def from_coordinate(cls, coord, exact=False):
         """Create an instance from a coordinate.
 
         :param coord: A coordinate.
+        :param exact: Calculate with integer milliseconds if True,
+            which never misclassify points on the mesh borders.
         """
-        parent_mesh = cls.ParentMesh.from_coordinate(coord)
-        remaining = coord - parent_mesh.south_west
-        lon_number = int(remaining.lon.ratio_in(cls.size.lon))
-        lat_number = int(remaining.lat.ratio_in(cls.size.lat))
-        return cls(parent_mesh, lon_number, lat_number)
+        return _create_mesh(
+            cls.level, _encode_coordinate(coord, cls.level, exact))
 
 
 class IndexDividedMesh(JapanMesh):
@@ -311,6 +477,7 @@ class IndexDividedMesh(JapanMesh):
     Note:
         Class variables below must be defined for each subclass.
 
+        - level: The mesh level (4 for 1/2 meshes, 5 for 1/4 meshes, etc.).
         - ParentMesh: The parent mesh.
         - size: The mesh size.
         - code_pattern: The code pattern.
@@ -319,6 +486,8 @@ class IndexDividedMesh(JapanMesh):
             - The first match is the parent mesh code.
             - The second match is the divide index.
     """
+    __slots__ = ()
+    level = None
     ParentMesh = None
     size = None
     code_pattern = None
@@ -342,42 +511,31 @@ class IndexDividedMesh(JapanMesh):
                 'Invalid divide index for {0}: {1:d}'
                 .format(self.__class__.__name__, div_index))
 
-        code = '{0}{1:01d}'.format(parent_mesh.code, div_index)
-        south_west = parent_mesh.south_west + Coordinate(
-            lon=self.size.lon * ((div_index - 1) % 2),
-            lat=self.size.lat * ((div_index - 1) // 2))
-        JapanMesh.__init__(self, code, south_west)
+        JapanMesh.__init__(self, parent_mesh.int_code * 10 + div_index)
 
     @classmethod
     def from_code(cls, code):
         """Create an instance from a mesh code.
         :param code: A mesh code.
         """
-        matches = cls.code_parse_regex.match(code)
-        if not matches:
-            raise ValueError(
-                'Invalid mesh code for {0}: {1}'
-                .format(cls.__name__, code))
-        parent_mesh = cls.ParentMesh.from_code(matches.group(1))
-        div_index = int(matches.group(2))
-        return cls(parent_mesh, div_index)
+        return _parse_mesh_code(code, cls)
 
     @classmethod
-    def from_coordinate(cls, coord):
+    def from_coordinate(cls, coord, exact=False):
         """Create an instance from a coordinate.
         :param coord: A coordinate.
+        :param exact: Calculate with integer milliseconds if True,
+            which never misclassify points on the mesh borders.
         """
-        parent_mesh = cls.ParentMesh.from_coordinate(coord)
-        remaining = coord - parent_mesh.south_west
-        lon_number = int(remaining.lon.ratio_in(cls.size.lon))
-        lat_number = int(remaining.lat.ratio_in(cls.size.lat))
-        div_index = lat_number * 2 + lon_number + 1
-        return cls(parent_mesh, div_index)
+        return _create_mesh(
+            cls.level, _encode_coordinate(coord, cls.level, exact))
 
 
 class FirstMesh(JapanMesh):
     """1st mesh (about 80km square).
     """
+    __slots__ = ()
+    level = 1
     size = Coordinate(lon=Angle.from_minute(60), lat=Angle.from_minute(40))
     code_pattern = r'[0-9]{4}'
     code_regex = _code_pattern_regex(code_pattern)
@@ -404,34 +562,23 @@ class FirstMesh(JapanMesh):
                 'Invalid latitude number for {0}: {1:d}'
                 .format(self.__class__.__name__, lat_number))
 
-        code = '{0:02d}{1:02d}'.format(lat_number, lon_number)
-        south_west = Coordinate(
-            lon=Angle.from_degree(lon_number + 100),
-            lat=Angle.from_minute(lat_number * 40))
-        JapanMesh.__init__(self, code, south_west)
+        JapanMesh.__init__(self, lat_number * 100 + lon_number)
 
     @staticmethod
     def from_code(code):
         """Create an instance from a mesh code.
         :param code: A mesh code.
         """
-        matches = FirstMesh.code_parse_regex.match(code)
-        if not matches:
-            raise ValueError(
-                'Invalid mesh code for {0}: {1}'
-                .format(FirstMesh.__name__, code))
-        lat_number = int(matches.group(1))
-        lon_number = int(matches.group(2))
-        return FirstMesh(lon_number, lat_number)
+        return _parse_mesh_code(code, FirstMesh)
 
     @staticmethod
-    def from_coordinate(coord):
+    def from_coordinate(coord, exact=False):
         """Create an instance from a coordinate.
         :param coord: A coordinate.
+        :param exact: Calculate with integer milliseconds if True,
+            which never misclassify points on the mesh borders.
         """
-        lon_number = int(coord.lon.degree) - 100
-        lat_number = int(coord.lat.degree * 1.5)
-        return FirstMesh(lon_number, lat_number)
+        return _create_mesh(1, _encode_coordinate(coord, 1, exact))
 
 
 def create_number_devided_mesh(name, parent_mesh, divide_num):
@@ -448,6 +595,8 @@ def create_number_devided_mesh(name, parent_mesh, divide_num):
         .format(parent_mesh.code_pattern, divide_num - 1))
 
     return type(name, (NumberDividedMesh,), {
+        '__slots__': (),
+        'level': parent_mesh.level + 1,
         'ParentMesh': parent_mesh,
         'divide_num': divide_num,
         'size': size,
@@ -469,6 +618,8 @@ def create_index_divided_mesh(name, parent_mesh):
         r'^({0})-?([1-4])$'.format(parent_mesh.code_pattern))
 
     return type(name, (IndexDividedMesh,), {
+        '__slots__': (),
+        'level': parent_mesh.level + 1,
         'ParentMesh': parent_mesh,
         'size': size,
         'code_pattern': code_pattern,
@@ -490,11 +641,3614 @@ MESH_CLASSES = [
 ]
 
 
+# Precalculated tables for the object-free functions below.
+# Mesh code lengths without hyphens, indexed by the mesh level.
+_CODE_LENGTHS = (None, 4, 6, 8, 9, 10, 11)
+_CODE_FORMATS = tuple(
+    None if length is None else '{{0:0{0:d}d}}'.format(length)
+    for length in _CODE_LENGTHS)
+# The unit of the level in packed codes, which are
+# `level * _PACKED_LEVEL_UNIT + integer mesh code`.
+_PACKED_LEVEL_UNIT = 10 ** _CODE_LENGTHS[-1]
+# The array typecode of unsigned 64-bit integers such as packed codes.
+# Python 2.7 has no 'Q', where 'L' is 64-bit on LP64 platforms.
+try:
+    array.array('Q')
+    _UINT64_TYPECODE = 'Q'
+except ValueError:
+    _UINT64_TYPECODE = 'L'
+# Divisors of integer mesh codes to get their parents.
+_PARENT_DIVISORS = (None, None) + tuple(
+    10 ** (length - parent_length)
+    for parent_length, length in zip(_CODE_LENGTHS[1:], _CODE_LENGTHS[2:]))
+
+# Suffixes of integer mesh codes of the children in the spatial order,
+# indexed by the level of the children.
+_CHILD_SUFFIXES = (None, None) + tuple(
+    (1, 2, 3, 4) if issubclass(mesh_class, IndexDividedMesh) else
+    tuple(lat_number * 10 + lon_number
+          for lat_number in range(mesh_class.divide_num)
+          for lon_number in range(mesh_class.divide_num))
+    for mesh_class in MESH_CLASSES[1:])
+
+# Division steps from the 1st mesh to the finer meshes:
+# (longitude size in integer milliseconds,
+#  latitude size in integer milliseconds,
+#  whether divided with indexes, the number of division).
+_DIVIDE_STEPS = tuple(
+    (mesh_class.size.lon.exact_millisecond,
+     mesh_class.size.lat.exact_millisecond,
+     issubclass(mesh_class, IndexDividedMesh),
+     getattr(mesh_class, 'divide_num', 2))
+    for mesh_class in MESH_CLASSES[1:])
+
+# Mesh sizes in integer milliseconds (longitude, latitude),
+# indexed by the mesh level.
+_MESH_SIZES = (None,) + tuple(
+    (mesh_class.size.lon.exact_millisecond,
+     mesh_class.size.lat.exact_millisecond)
+    for mesh_class in MESH_CLASSES)
+
+# Milliseconds in a degree.
+_MILLISECONDS_PER_DEGREE = 60 * 60 * 1000
+
+
+def _mesh_level(level):
+    """Returns the mesh level number.
+
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    """
+    mesh_level = getattr(level, 'level', level)
+    if mesh_level not in range(1, len(MESH_CLASSES) + 1):
+        raise ValueError('Invalid mesh level: {0}'.format(level))
+    return int(mesh_level)
+
+
+def _ancestor_code(level, code, ancestor_level=None):
+    """Returns the level and the integer code of the ancestor mesh.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    :param ancestor_level: A mesh level number or a mesh class which is not
+        finer than the mesh. The parent level if None.
+    """
+    if ancestor_level is None:
+        if level == 1:
+            raise ValueError('1st meshes have no parents.')
+        ancestor_level = level - 1
+    ancestor_level = _mesh_level(ancestor_level)
+    if ancestor_level > level:
+        raise ValueError('Mesh level {0} is finer than {1}'.format(
+            ancestor_level, level))
+    return ancestor_level, code // 10 ** (
+        _CODE_LENGTHS[level] - _CODE_LENGTHS[ancestor_level])
+
+
+def _iter_descendant_codes(level, code, descendant_level):
+    """Yields the integer codes of the descendant meshes lazily,
+    in the order of the codes.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    :param descendant_level: A mesh level number which is not coarser
+        than the mesh.
+    """
+    if descendant_level < level:
+        raise ValueError('Mesh level {0} is coarser than {1}'.format(
+            descendant_level, level))
+    levels = list(range(level + 1, descendant_level + 1))
+    code *= 10 ** (_CODE_LENGTHS[descendant_level] - _CODE_LENGTHS[level])
+    places = dict(
+        (child_level, 10 ** (
+            _CODE_LENGTHS[descendant_level] - _CODE_LENGTHS[child_level]))
+        for child_level in levels)
+
+    # The offsets of the finer levels are calculated at once
+    # as long as they are not too many.
+    offsets = [0]
+    while levels and len(offsets) * len(_CHILD_SUFFIXES[levels[-1]]) <= 4096:
+        child_level = levels.pop()
+        offsets = [
+            suffix * places[child_level] + offset
+            for suffix in _CHILD_SUFFIXES[child_level] for offset in offsets]
+    for suffixes in itertools.product(
+            *[_CHILD_SUFFIXES[child_level] for child_level in levels]):
+        base = code + sum(
+            suffix * places[child_level]
+            for suffix, child_level in zip(suffixes, levels))
+        for offset in offsets:
+            yield base + offset
+
+
+def parent_code(packed_code, level=None):
+    """Returns the packed code of the ancestor mesh.
+
+    :param packed_code: A packed mesh code (see pack_mesh_code).
+    :param level: A mesh level number or a mesh class which is not finer
+        than the mesh. The parent level if None.
+
+    >>> unpack_mesh_code(parent_code(pack_mesh_code('533935961'), 2))
+    '533935'
+    """
+    ancestor_level, code = _ancestor_code(
+        *_unpack_code_int(packed_code), ancestor_level=level)
+    return ancestor_level * _PACKED_LEVEL_UNIT + code
+
+
+def child_codes(packed_code):
+    """Returns the packed codes of the child meshes in the spatial order,
+    or an empty list for the finest meshes.
+
+    :param packed_code: A packed mesh code (see pack_mesh_code).
+    """
+    level, code = _unpack_code_int(packed_code)
+    if level == len(MESH_CLASSES):
+        return []
+    unit = (level + 1) * _PACKED_LEVEL_UNIT
+    return [
+        unit + child_code
+        for child_code in _iter_descendant_codes(level, code, level + 1)]
+
+
+def descendant_codes(packed_code, level):
+    """Yields the packed codes of the descendant meshes of the level
+    lazily, in the order of the codes.
+
+    :param packed_code: A packed mesh code (see pack_mesh_code).
+    :param level: A mesh level number or a mesh class which is not
+        coarser than the mesh.
+    """
+    mesh_level, code = _unpack_code_int(packed_code)
+    descendant_level = _mesh_level(level)
+    unit = descendant_level * _PACKED_LEVEL_UNIT
+    for descendant_code in _iter_descendant_codes(
+            mesh_level, code, descendant_level):
+        yield unit + descendant_code
+
+
+def _encode_int(lon_millisecond, lat_millisecond, level):
+    """Returns the mesh code in an integer for the given coordinate.
+
+    The floating point calculation is the same as the one which
+    from_coordinate() of the mesh classes did with Angle and Coordinate,
+    so that the results are exactly the same.
+
+    :param lon_millisecond: A longitude in milliseconds.
+    :param lat_millisecond: A latitude in milliseconds.
+    :param level: A mesh level number.
+    """
+    lon_number = int(lon_millisecond / 1000.0 / 60.0 / 60.0) - 100
+    lat_number = int(lat_millisecond / 1000.0 / 60.0 / 60.0 * 1.5)
+    if lon_number < 0 or lon_number >= 100:
+        raise ValueError(
+            'Invalid longitude number for {0}: {1:d}'
+            .format(FirstMesh.__name__, lon_number))
+    if lat_number < 0 or lat_number >= 100:
+        raise ValueError(
+            'Invalid latitude number for {0}: {1:d}'
+            .format(FirstMesh.__name__, lat_number))
+    code = lat_number * 100 + lon_number
+    west = float(lon_number + 100) * 60.0 * 60.0 * 1000.0
+    south = float(lat_number * 40) * 60.0 * 1000.0
+
+    for index in range(level - 1):
+        lon_size, lat_size, indexed, divide_num = _DIVIDE_STEPS[index]
+        lon_number = int((lon_millisecond - west) / lon_size)
+        lat_number = int((lat_millisecond - south) / lat_size)
+        if indexed:
+            div_index = lat_number * 2 + lon_number + 1
+            if div_index < 1 or div_index > 4:
+                raise ValueError(
+                    'Invalid divide index for {0}: {1:d}'
+                    .format(MESH_CLASSES[index + 1].__name__, div_index))
+            code = code * 10 + div_index
+        else:
+            if lon_number < 0 or lon_number >= divide_num:
+                raise ValueError(
+                    'Invalid longitude number for {0}: {1:d}'
+                    .format(MESH_CLASSES[index + 1].__name__, lon_number))
+            if lat_number < 0 or lat_number >= divide_num:
+                raise ValueError(
+                    'Invalid latitude number for {0}: {1:d}'
+                    .format(MESH_CLASSES[index + 1].__name__, lat_number))
+            code = code * 100 + lat_number * 10 + lon_number
+        west += lon_size * lon_number
+        south += lat_size * lat_number
+
+    return code
+
+
+def _encode_exact_int(lon_millisecond, lat_millisecond, level):
+    """Returns the mesh code in an integer for the given coordinate,
+    calculated with integer milliseconds.
+
+    :param lon_millisecond: A longitude in integer milliseconds.
+    :param lat_millisecond: A latitude in integer milliseconds.
+    :param level: A mesh level number.
+    """
+    lon_size, lat_size = _MESH_SIZES[1]
+    lon_number, lon_rest = divmod(lon_millisecond, lon_size)
+    lat_number, lat_rest = divmod(lat_millisecond, lat_size)
+    lon_number -= 100
+    if lon_number < 0 or lon_number >= 100:
+        raise ValueError(
+            'Invalid longitude number for {0}: {1:d}'
+            .format(FirstMesh.__name__, lon_number))
+    if lat_number < 0 or lat_number >= 100:
+        raise ValueError(
+            'Invalid latitude number for {0}: {1:d}'
+            .format(FirstMesh.__name__, lat_number))
+    code = lat_number * 100 + lon_number
+
+    for index in range(level - 1):
+        lon_size, lat_size, indexed, _ = _DIVIDE_STEPS[index]
+        lon_number, lon_rest = divmod(lon_rest, lon_size)
+        lat_number, lat_rest = divmod(lat_rest, lat_size)
+        if indexed:
+            code = code * 10 + lat_number * 2 + lon_number + 1
+        else:
+            code = code * 100 + lat_number * 10 + lon_number
+
+    return code
+
+
+def _encode_coordinate(coord, level, exact):
+    """Returns the mesh code in an integer for the given coordinate.
+
+    :param coord: A coordinate.
+    :param level: A mesh level number.
+    :param exact: Calculate with integer milliseconds if True.
+    """
+    if exact:
+        return _encode_exact_int(
+            coord.lon.exact_millisecond, coord.lat.exact_millisecond, level)
+    return _encode_int(coord.lon.millisecond, coord.lat.millisecond, level)
+
+
+def _new_mesh(level, code):
+    """Returns a new mesh instance for the given integer mesh code
+    without validation nor creating the parent meshes.
+
+    :param level: A mesh level number.
+    :param code: A valid integer mesh code.
+    """
+    mesh_class = MESH_CLASSES[level - 1]
+    mesh = mesh_class.__new__(mesh_class)
+    JapanMesh.__init__(mesh, code)
+    return mesh
+
+
+def _code_to_index(level, code):
+    """Returns the global (row, column) index of the mesh in the grid of
+    the level, which counts meshes from the 1st mesh '0000'.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    """
+    row = 0
+    column = 0
+    scale = 1
+    for _, _, indexed, divide_num in reversed(_DIVIDE_STEPS[:level - 1]):
+        if indexed:
+            code, div_index = divmod(code, 10)
+            row += (div_index - 1) // 2 * scale
+            column += (div_index - 1) % 2 * scale
+        else:
+            code, digits = divmod(code, 100)
+            row += digits // 10 * scale
+            column += digits % 10 * scale
+        scale *= divide_num
+    return code // 100 * scale + row, code % 100 * scale + column
+
+
+def _index_to_code(level, row, column):
+    """Returns the integer mesh code for the global (row, column) index
+    in the grid of the level.
+
+    :param level: A mesh level number.
+    :param row: A row index from the south.
+    :param column: A column index from the west.
+    """
+    code = 0
+    place = 1
+    for _, _, indexed, divide_num in reversed(_DIVIDE_STEPS[:level - 1]):
+        row, lat_number = divmod(row, divide_num)
+        column, lon_number = divmod(column, divide_num)
+        if indexed:
+            code += (lat_number * 2 + lon_number + 1) * place
+            place *= 10
+        else:
+            code += (lat_number * 10 + lon_number) * place
+            place *= 100
+    return (row * 100 + column) * place + code
+
+
+def _is_valid_code(level, code):
+    """Returns whether the integer mesh code is valid for the level.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    """
+    if code < 0:
+        return False
+    for _, _, indexed, divide_num in reversed(_DIVIDE_STEPS[:level - 1]):
+        if indexed:
+            code, div_index = divmod(code, 10)
+            if div_index < 1 or div_index > 4:
+                return False
+        else:
+            code, digits = divmod(code, 100)
+            if digits // 10 >= divide_num or digits % 10 >= divide_num:
+                return False
+    return code < 10000
+
+
+def _south_west_millisecond(level, code):
+    """Returns the integer milliseconds of the longitude and the latitude
+    at the south-west border of the mesh.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    """
+    row, column = _code_to_index(level, code)
+    lon_size, lat_size = _MESH_SIZES[level]
+    return 100 * _MESH_SIZES[1][0] + column * lon_size, row * lat_size
+
+
+def _create_mesh(level, code):
+    """Returns the mesh instance for the given integer mesh code,
+    which is taken from the mesh cache if enabled.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    """
+    if _mesh_cache is None:
+        return _new_mesh(level, code)
+    return _mesh_cache.get(level, code)
+
+
+class _MeshCache(object):
+    """LRU cache of mesh instances keyed by the packed mesh code.
+    """
+    def __init__(self, maxsize):
+        """Initialize.
+        :param maxsize: The maximum number of the cached meshes.
+        """
+        if maxsize < 1:
+            raise ValueError('Invalid cache size: {0}'.format(maxsize))
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__meshes = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__meshes)
+
+    def get(self, level, code):
+        """Returns the cached mesh, or create and cache it.
+
+        Parent meshes are created through this cache on the first access,
+        so that they are shared with their children.
+
+        :param level: A mesh level number.
+        :param code: An integer mesh code.
+        """
+        key = level * _PACKED_LEVEL_UNIT + code
+        meshes = self.__meshes
+        mesh = meshes.pop(key, None)
+        if mesh is not None:
+            self.hits += 1
+            meshes[key] = mesh
+            return mesh
+
+        self.misses += 1
+        mesh = _new_mesh(level, code)
+        if len(meshes) >= self.maxsize:
+            meshes.popitem(last=False)
+        meshes[key] = mesh
+        return mesh
+
+    def clear(self):
+        """Clear the cached meshes and the statistics.
+        """
+        self.__meshes.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class MeshCacheInfo(collections.namedtuple(
+        'MeshCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])):
+    """Statistics of the mesh cache.
+
+    - hits: The number of meshes taken from the cache.
+    - misses: The number of meshes created and cached.
+    - maxsize: The maximum number of the cached meshes.
+    - currsize: The current number of the cached meshes.
+    """
+    __slots__ = ()
+
+
+_mesh_cache = None # pylint: disable=C0103
+
+
+def enable_mesh_cache(maxsize=65536):
+    """Enable the LRU cache of mesh instances.
+
+    from_code(), from_coordinate() and parse_mesh_code() then return
+    the cached instances for the same meshes, and the parent meshes are
+    shared by their children. The cache is disabled by default.
+
+    :param maxsize: The maximum number of the cached meshes.
+        The least recently used ones are evicted over this size.
+    """
+    global _mesh_cache # pylint: disable=W0603,C0103
+    _mesh_cache = _MeshCache(maxsize)
+
+
+def disable_mesh_cache():
+    """Disable the mesh cache and drop the cached meshes.
+    """
+    global _mesh_cache # pylint: disable=W0603,C0103
+    _mesh_cache = None
+
+
+def clear_mesh_cache():
+    """Clear the cached meshes and the statistics of the mesh cache.
+    """
+    if _mesh_cache is not None:
+        _mesh_cache.clear()
+
+
+def mesh_cache_info():
+    """Returns the MeshCacheInfo of the mesh cache, or None if disabled.
+    """
+    if _mesh_cache is None:
+        return None
+    return MeshCacheInfo(
+        hits=_mesh_cache.hits, misses=_mesh_cache.misses,
+        maxsize=_mesh_cache.maxsize, currsize=len(_mesh_cache))
+
+
+def _create_mesh_code_regex():
+    """Create the regular expression to parse mesh codes of all the levels
+    in one match.
+
+    Each group is a latitude number, a longitude number or a divide index
+    from the 1st mesh, and the groups of finer levels are optional.
+    """
+    pattern = r''
+    for mesh_class in reversed(MESH_CLASSES[1:]):
+        if issubclass(mesh_class, IndexDividedMesh):
+            pattern = r'(?:-?([1-4]){0})?'.format(pattern)
+        else:
+            pattern = r'(?:-?([0-{1:d}])([0-{1:d}]){0})?'.format(
+                pattern, mesh_class.divide_num - 1)
+    return re.compile(r'^([0-9]{{2}})([0-9]{{2}}){0}$'.format(pattern))
+
+
+_MESH_CODE_REGEX = _create_mesh_code_regex()
+
+# Mesh levels indexed by the number of groups matched with _MESH_CODE_REGEX.
+_LEVELS_BY_GROUP_COUNT = (None, None, 1, None, 2, None, 3, 4, 5, 6)
+
+
+def _parse_code_int(code, mesh_class=None):
+    """Returns the level and the integer mesh code for the given mesh code.
+
+    :param code: A mesh code.
+    :param mesh_class: The expected mesh class, or None for any level.
+    """
+    matches = _MESH_CODE_REGEX.match(code)
+    level = _LEVELS_BY_GROUP_COUNT[matches.lastindex] if matches else None
+    if level is None or (
+            mesh_class is not None and level != mesh_class.level):
+        if mesh_class is None:
+            raise ValueError('Invalid mesh code: {0}'.format(code))
+        raise ValueError(
+            'Invalid mesh code for {0}: {1}'
+            .format(mesh_class.__name__, code))
+    return level, int(''.join(matches.groups('')))
+
+
+def _parse_mesh_code(code, mesh_class=None):
+    """Returns the mesh instance for the given mesh code.
+
+    :param code: A mesh code.
+    :param mesh_class: The expected mesh class, or None for any level.
+    """
+    return _create_mesh(*_parse_code_int(code, mesh_class))
+
+
 def parse_mesh_code(code):
     """Returns the mesh instance for the given mesh code.
+
+    The code is parsed in one regular expression match for all the levels.
+
     :param code: A mesh code.
     """
-    for mesh_class in MESH_CLASSES:
-        if mesh_class.code_regex.match(code):
-            return mesh_class.from_code(code)
-    raise ValueError('Invalid mesh code: {0}'.format(code))
+    return _parse_mesh_code(code)
+
+
+def _unpack_code_int(packed_code):
+    """Returns the level and the integer mesh code for the packed code.
+
+    :param packed_code: A packed mesh code.
+    """
+    level, code = divmod(int(packed_code), _PACKED_LEVEL_UNIT)
+    if not (0 < level < len(_CODE_LENGTHS) and
+            code < 10 ** _CODE_LENGTHS[level] and
+            _is_valid_code(level, code)):
+        raise ValueError('Invalid packed mesh code: {0}'.format(packed_code))
+    return level, code
+
+
+def _format_code(level, code, hyphen):
+    """Returns the mesh code string.
+
+    :param level: A mesh level number.
+    :param code: An integer mesh code.
+    :param hyphen: Hyphenate the code at the level borders if True.
+    """
+    code = _CODE_FORMATS[level].format(code)
+    if not hyphen:
+        return code
+    return '-'.join(
+        code[begin:end] for begin, end
+        in zip((0,) + _CODE_LENGTHS[1:level], _CODE_LENGTHS[1:level + 1]))
+
+
+def pack_mesh_code(code):
+    """Returns the packed mesh code for the given mesh code.
+
+    A packed mesh code is a 64-bit unsigned integer
+    `level * 10 ** 11 + integer mesh code`, so that the level is
+    recoverable and codes of a level are in the order of code strings.
+    For example, '5339-35-96' is packed to 300053393596.
+
+    :param code: A mesh code, which may be hyphenated.
+    """
+    level, int_code = _parse_code_int(code)
+    return level * _PACKED_LEVEL_UNIT + int_code
+
+
+def unpack_mesh_code(packed_code, hyphen=False):
+    """Returns the mesh code string for the given packed mesh code.
+
+    :param packed_code: A packed mesh code.
+    :param hyphen: Hyphenate the code at the level borders if True,
+        like '5339-35-96'.
+    """
+    return _format_code(*_unpack_code_int(packed_code), hyphen=hyphen)
+
+
+def parse_packed_code(packed_code):
+    """Returns the mesh instance for the given packed mesh code.
+
+    :param packed_code: A packed mesh code.
+    """
+    return _create_mesh(*_unpack_code_int(packed_code))
+
+
+def _uint64_array(values=()):
+    """Returns an array of unsigned 64-bit integers, which is array('Q'),
+    or array('L') on Python 2.7.
+
+    :param values: An iterable of integers.
+    """
+    return array.array(_UINT64_TYPECODE, values)
+
+
+def pack_mesh_codes(codes):
+    """Returns the packed mesh codes for the given mesh codes.
+
+    :param codes: Mesh codes, which may be hyphenated.
+        NumPy string arrays are converted in a vectorized way.
+    :return: An array('Q') (array('L') on Python 2.7),
+        or a NumPy uint64 array for a NumPy array.
+    """
+    if hasattr(codes, 'dtype'):
+        numpy = _import_numpy()
+        codes = numpy.asarray(codes)
+        if codes.dtype.kind == 'O':
+            codes = codes.astype(str)
+        int_codes, levels, valid = _code_string_array(
+            numpy, codes.reshape(-1))
+        if not valid.all():
+            raise ValueError('Invalid mesh code: {0}'.format(
+                codes.reshape(-1)[numpy.argmin(valid)]))
+        return (levels.astype(numpy.uint64) * _PACKED_LEVEL_UNIT +
+                int_codes.astype(numpy.uint64)).reshape(codes.shape)
+    return _uint64_array(pack_mesh_code(code) for code in codes)
+
+
+def unpack_mesh_codes(packed_codes, hyphen=False):
+    """Returns the list of mesh code strings for the given packed codes.
+
+    :param packed_codes: Packed mesh codes, such as a list, an array('Q')
+        or a NumPy integer array.
+    :param hyphen: Hyphenate the codes at the level borders if True.
+    """
+    return [
+        _format_code(*_unpack_code_int(packed_code), hyphen=hyphen)
+        for packed_code in packed_codes]
+
+
+def _encode_degree(lon, lat, level, exact):
+    """Returns the mesh code in an integer for the longitude and
+    the latitude in degrees.
+
+    :param lon: A longitude in degrees.
+    :param lat: A latitude in degrees.
+    :param level: A mesh level number.
+    :param exact: Calculate with integer milliseconds if True.
+    """
+    if exact:
+        return _encode_exact_int(
+            int(round(float(lon) * _MILLISECONDS_PER_DEGREE)),
+            int(round(float(lat) * _MILLISECONDS_PER_DEGREE)), level)
+    return _encode_int(
+        float(lon) * 60.0 * 60.0 * 1000.0,
+        float(lat) * 60.0 * 60.0 * 1000.0, level)
+
+
+def encode(lon, lat, level, as_int=False, exact=False):
+    """Returns the mesh code for the given coordinate without creating
+    any mesh instances.
+
+    The result is the same as `SomeMesh.from_coordinate(coord, exact).code`.
+
+    :param lon: A longitude in degrees.
+    :param lat: A latitude in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param as_int: Returns the mesh code in an integer if True.
+    :param exact: Calculate with integer milliseconds if True,
+        which never misclassify points on the mesh borders.
+
+    >>> encode(139.7, 35.6, ThirdMesh)
+    '53393526'
+    """
+    mesh_level = _mesh_level(level)
+    code = _encode_degree(lon, lat, mesh_level, exact)
+    if as_int:
+        return code
+    return _CODE_FORMATS[mesh_level].format(code)
+
+
+def _import_numpy():
+    """Returns the NumPy module, which is required only for array functions.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('NumPy is required for the array functions.')
+    return numpy
+
+
+def _encode_exact_array(numpy, lon_millisecond, lat_millisecond, level):
+    """Returns the mesh code array and the validity mask
+    calculated with integer milliseconds.
+
+    :param numpy: The NumPy module.
+    :param lon_millisecond: A longitude array in rounded milliseconds.
+    :param lat_millisecond: A latitude array in rounded milliseconds.
+    :param level: A mesh level number.
+    """
+    lon_size, lat_size = _MESH_SIZES[1]
+    valid = ((lon_millisecond >= 100 * lon_size) &
+             (lon_millisecond < 200 * lon_size) &
+             (lat_millisecond >= 0) & (lat_millisecond < 100 * lat_size))
+    lon_millisecond = numpy.where(
+        valid, lon_millisecond, 100 * lon_size).astype(numpy.int64)
+    lat_millisecond = numpy.where(
+        valid, lat_millisecond, 0).astype(numpy.int64)
+
+    lon_number, lon_rest = numpy.divmod(lon_millisecond, lon_size)
+    lat_number, lat_rest = numpy.divmod(lat_millisecond, lat_size)
+    codes = lat_number * 100 + lon_number - 100
+    for lon_size, lat_size, indexed, _ in _DIVIDE_STEPS[:level - 1]:
+        lon_number, lon_rest = numpy.divmod(lon_rest, lon_size)
+        lat_number, lat_rest = numpy.divmod(lat_rest, lat_size)
+        if indexed:
+            codes = codes * 10 + lat_number * 2 + lon_number + 1
+        else:
+            codes = codes * 100 + lat_number * 10 + lon_number
+
+    return numpy.where(valid, codes, 0), valid
+
+
+def _encode_float_array(numpy, lon_millisecond, lat_millisecond, level):
+    """Returns the mesh code array and the validity mask
+    calculated in the same way as the mesh classes.
+
+    :param numpy: The NumPy module.
+    :param lon_millisecond: A longitude array in milliseconds.
+    :param lat_millisecond: A latitude array in milliseconds.
+    :param level: A mesh level number.
+    """
+    lon_number = numpy.trunc(lon_millisecond / 1000.0 / 60.0 / 60.0) - 100
+    lat_number = numpy.trunc(lat_millisecond / 1000.0 / 60.0 / 60.0 * 1.5)
+    valid = ((lon_number >= 0) & (lon_number < 100) &
+             (lat_number >= 0) & (lat_number < 100))
+    lon_number = numpy.where(valid, lon_number, 0).astype(numpy.int64)
+    lat_number = numpy.where(valid, lat_number, 0).astype(numpy.int64)
+    codes = lat_number * 100 + lon_number
+    west = (lon_number + 100).astype(numpy.float64) * 60.0 * 60.0 * 1000.0
+    south = (lat_number * 40).astype(numpy.float64) * 60.0 * 1000.0
+
+    for lon_size, lat_size, indexed, divide_num in _DIVIDE_STEPS[:level - 1]:
+        lon_number = numpy.trunc((lon_millisecond - west) / lon_size)
+        lat_number = numpy.trunc((lat_millisecond - south) / lat_size)
+        if indexed:
+            valid &= ((lat_number * 2 + lon_number >= 0) &
+                      (lat_number * 2 + lon_number < 4))
+        else:
+            valid &= ((lon_number >= 0) & (lon_number < divide_num) &
+                      (lat_number >= 0) & (lat_number < divide_num))
+        lon_number = numpy.where(valid, lon_number, 0).astype(numpy.int64)
+        lat_number = numpy.where(valid, lat_number, 0).astype(numpy.int64)
+        if indexed:
+            codes = codes * 10 + lat_number * 2 + lon_number + 1
+        else:
+            codes = codes * 100 + lat_number * 10 + lon_number
+        west += lon_size * lon_number
+        south += lat_size * lat_number
+
+    return numpy.where(valid, codes, 0), valid
+
+
+def encode_array(lons, lats, level, exact=False):
+    """Returns the mesh codes for the given coordinates in a vectorized way.
+
+    The results are the same as `encode(lon, lat, level, True, exact)`
+    for each coordinate, but coordinates out of the range are reported
+    with the validity mask instead of ValueError.
+    Requires NumPy.
+
+    :param lons: Longitudes in degrees (an array-like or a buffer).
+        Float64 arrays and buffers are used without copying.
+    :param lats: Latitudes in degrees, in the same shape as `lons`.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param exact: Calculate with integer milliseconds if True,
+        which never misclassify points on the mesh borders.
+    :return: A tuple of the mesh code integer array
+        (0 for invalid coordinates) and the validity mask array.
+    """
+    numpy = _import_numpy()
+    mesh_level = _mesh_level(level)
+    lons = numpy.asarray(lons, dtype=numpy.float64)
+    lats = numpy.asarray(lats, dtype=numpy.float64)
+    if exact:
+        return _encode_exact_array(
+            numpy, numpy.rint(lons * float(_MILLISECONDS_PER_DEGREE)),
+            numpy.rint(lats * float(_MILLISECONDS_PER_DEGREE)), mesh_level)
+    return _encode_float_array(
+        numpy, lons * 60.0 * 60.0 * 1000.0, lats * 60.0 * 60.0 * 1000.0,
+        mesh_level)
+
+
+class MeshGeometryArrays(collections.namedtuple(
+        'MeshGeometryArrays',
+        ['level', 'south_west', 'size', 'center', 'bounds', 'valid'])):
+    """Mesh geometries decoded by decode_array().
+
+    All the angles are in degrees and those of invalid codes are NaN.
+
+    - level: The mesh level numbers (0 for invalid codes).
+    - south_west: (longitude, latitude) at the south-west borders.
+    - size: (longitude, latitude) sizes of the meshes.
+    - center: (longitude, latitude) at the centers.
+    - bounds: (west, south, east, north) borders.
+    - valid: The validity mask.
+    """
+    __slots__ = ()
+
+
+def _code_string_levels(numpy, chars, digit_counts, lengths):
+    """Returns the levels and the validity mask for the characters
+    of mesh code strings.
+
+    :param numpy: The NumPy module.
+    :param chars: A 2-dimensional array of the character ordinals.
+    :param digit_counts: The cumulative numbers of the digits.
+    :param lengths: The numbers of the digits.
+    """
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    is_hyphen = chars == ord('-')
+    is_end = chars == 0
+    valid = ~(~is_digit & ~is_hyphen & ~is_end).any(axis=1)
+    valid &= ~(is_end[:, :-1] & ~is_end[:, 1:]).any(axis=1)
+    valid &= ~(is_hyphen[:, :-1] & is_hyphen[:, 1:]).any(axis=1)
+
+    level_table = numpy.zeros(_CODE_LENGTHS[-1] + 2, numpy.int64)
+    hyphen_table = numpy.zeros(_CODE_LENGTHS[-1] + 2, bool)
+    for level in range(1, len(_CODE_LENGTHS)):
+        level_table[_CODE_LENGTHS[level]] = level
+        hyphen_table[_CODE_LENGTHS[level]] = level < len(_CODE_LENGTHS) - 1
+    levels = level_table[lengths]
+    valid &= levels > 0
+    valid &= ~(is_hyphen & ~(
+        hyphen_table[digit_counts] & (digit_counts < lengths[:, None]))
+              ).any(axis=1)
+    return levels, valid
+
+
+def _code_string_array(numpy, codes):
+    """Returns the integer codes, levels and the validity mask
+    for the mesh code string array.
+
+    :param numpy: The NumPy module.
+    :param codes: A 1-dimensional mesh code string array, which may be
+        hyphenated at the level borders.
+    """
+    codes = numpy.ascontiguousarray(codes)
+    char_type = numpy.uint32 if codes.dtype.kind == 'U' else numpy.uint8
+    width = codes.dtype.itemsize // numpy.dtype(char_type).itemsize
+    chars = codes.view(char_type).reshape(len(codes), width)
+    if char_type is not numpy.uint8:
+        # Non-ASCII characters are invalid, and kept invalid in bytes.
+        chars = numpy.minimum(chars, 0xFF).astype(numpy.uint8)
+
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    digit_counts = numpy.minimum(
+        numpy.cumsum(is_digit, axis=1, dtype=numpy.min_scalar_type(width)),
+        _CODE_LENGTHS[-1] + 1)
+    lengths = digit_counts[:, -1] if width else numpy.zeros(len(codes), int)
+    levels, valid = _code_string_levels(numpy, chars, digit_counts, lengths)
+
+    # Accumulated column by column to keep the memory usage
+    # in the order of the codes.
+    int_codes = numpy.zeros(len(codes), numpy.int64)
+    for column in range(width):
+        int_codes = numpy.where(
+            is_digit[:, column] & (
+                digit_counts[:, column] <= _CODE_LENGTHS[-1]),
+            int_codes * 10 + (chars[:, column] - ord('0')), int_codes)
+    return int_codes, numpy.where(valid, levels, 0), valid
+
+
+def _int_code_array(numpy, codes, level):
+    """Returns the integer codes, levels and the validity mask
+    for the integer or packed mesh code array.
+
+    :param numpy: The NumPy module.
+    :param codes: A 1-dimensional integer mesh code array.
+    :param level: A mesh level number or a mesh class, or None to guess.
+    """
+    int_codes = codes.astype(numpy.int64)
+    valid = (int_codes >= 0) & (int_codes == codes)
+    if level is not None:
+        levels = numpy.full(len(codes), _mesh_level(level), numpy.int64)
+    else:
+        levels = numpy.zeros(len(codes), numpy.int64)
+        for mesh_level in range(len(_CODE_LENGTHS) - 1, 0, -1):
+            levels[int_codes < 10 ** _CODE_LENGTHS[mesh_level]] = (
+                mesh_level)
+        packed_levels, packed_codes = numpy.divmod(
+            int_codes, _PACKED_LEVEL_UNIT)
+        is_packed = int_codes >= _PACKED_LEVEL_UNIT
+        levels = numpy.where(
+            is_packed & (packed_levels < len(_CODE_LENGTHS)),
+            packed_levels, levels)
+        int_codes = numpy.where(is_packed, packed_codes, int_codes)
+    valid &= (levels > 0) & (
+        int_codes < 10 ** numpy.array(_CODE_LENGTHS[1:])[
+            numpy.maximum(levels - 1, 0)])
+    return int_codes, levels, valid
+
+
+def _mesh_number_array(numpy, int_codes, lengths, level):
+    """Returns the longitude and the latitude numbers of the digits
+    of the level in the integer codes, and their validity mask.
+
+    :param numpy: The NumPy module.
+    :param int_codes: An integer mesh code array.
+    :param lengths: The numbers of the digits of the codes.
+    :param level: A mesh level number from 2.
+    """
+    _, _, indexed, divide_num = _DIVIDE_STEPS[level - 2]
+    digits = int_codes // 10 ** numpy.maximum(
+        lengths - _CODE_LENGTHS[level], 0)
+    if indexed:
+        digits = digits % 10 - 1
+        return digits % 2, digits // 2, (digits >= 0) & (digits < 4)
+    lon_number, lat_number = digits % 10, digits // 10 % 10
+    return (lon_number, lat_number,
+            (lon_number < divide_num) & (lat_number < divide_num))
+
+
+def _south_west_millisecond_array(numpy, int_codes, levels, valid):
+    """Returns the integer milliseconds of the longitudes and the latitudes
+    at the south-west borders of the meshes, and updates the validity mask
+    with the digits of the codes.
+
+    :param numpy: The NumPy module.
+    :param int_codes: An integer mesh code array.
+    :param levels: A mesh level number array.
+    :param valid: The validity mask to update.
+    """
+    lengths = numpy.array((0,) + _CODE_LENGTHS[1:])[levels]
+    south, west = numpy.divmod(
+        int_codes // 10 ** numpy.maximum(lengths - 4, 0), 100)
+    west = (west + 100) * _MESH_SIZES[1][0]
+    south = south * _MESH_SIZES[1][1]
+    for mesh_level in range(2, len(_CODE_LENGTHS)):
+        lon_size, lat_size, _, _ = _DIVIDE_STEPS[mesh_level - 2]
+        has_level = levels >= mesh_level
+        lon_number, lat_number, valid_numbers = _mesh_number_array(
+            numpy, int_codes, lengths, mesh_level)
+        valid &= ~has_level | valid_numbers
+        west = west + numpy.where(has_level, lon_number * lon_size, 0)
+        south = south + numpy.where(has_level, lat_number * lat_size, 0)
+    return west, south
+
+
+def decode_array(codes, level=None):
+    """Returns the geometries of the meshes for the given codes
+    in a vectorized way.
+
+    Invalid codes are reported with the validity mask
+    instead of ValueError. Requires NumPy.
+
+    :param codes: Mesh codes in a NumPy string or integer array,
+        or an iterable of mesh codes.
+        Integer codes may be packed ones (see pack_mesh_code).
+    :param level: A mesh level number (1 to 6) or a mesh class for integer
+        codes. The levels of integer codes are guessed from the number of
+        digits if None, which is wrong for 1st mesh latitude numbers
+        under 10 (far south of Japan), and are taken from packed codes.
+    :return: A MeshGeometryArrays.
+    """
+    numpy = _import_numpy()
+    if not isinstance(codes, numpy.ndarray):
+        codes = list(codes)
+    codes = numpy.asarray(codes)
+    if codes.dtype.kind == 'O':
+        codes = codes.astype(str)
+    shape = codes.shape
+    codes = codes.reshape(-1)
+
+    if codes.dtype.kind in 'US':
+        int_codes, levels, valid = _code_string_array(numpy, codes)
+    else:
+        int_codes, levels, valid = _int_code_array(numpy, codes, level)
+    west, south = _south_west_millisecond_array(
+        numpy, int_codes, levels, valid)
+
+    levels = numpy.where(valid, levels, 0)
+    sizes = numpy.array([(numpy.nan, numpy.nan)] + list(_MESH_SIZES[1:]))
+    south_west = numpy.stack([west, south], axis=-1).astype(numpy.float64)
+    south_west[~valid] = numpy.nan
+    south_west = south_west / 1000.0 / 60.0 / 60.0
+    size = sizes[levels] / 1000.0 / 60.0 / 60.0
+    center = south_west + size / 2.0
+    bounds = numpy.concatenate([south_west, south_west + size], axis=-1)
+    return MeshGeometryArrays(
+        level=levels.reshape(shape),
+        south_west=south_west.reshape(shape + (2,)),
+        size=size.reshape(shape + (2,)),
+        center=center.reshape(shape + (2,)),
+        bounds=bounds.reshape(shape + (4,)),
+        valid=valid.reshape(shape))
+
+
+def _grid_shape(level):
+    """Returns the numbers of (rows, columns) in the grid of the level.
+
+    :param level: A mesh level number.
+    """
+    lon_size, lat_size = _MESH_SIZES[level]
+    return (100 * _MESH_SIZES[1][1] // lat_size,
+            100 * _MESH_SIZES[1][0] // lon_size)
+
+
+def _bbox_index_range(west, south, east, north, level):
+    """Returns the (row, column) index ranges of the meshes
+    intersecting the bounding box, which are clipped in the grid,
+    or None if no meshes intersect.
+
+    Meshes which only touch the box at their borders are excluded,
+    except for the ones which include the box of zero width or height.
+
+    :param west: The west border in degrees.
+    :param south: The south border in degrees.
+    :param east: The east border in degrees.
+    :param north: The north border in degrees.
+    :param level: A mesh level number.
+    """
+    if west > east or south > north:
+        raise ValueError('Invalid bounding box: {0}'.format(
+            (west, south, east, north)))
+    lon_size, lat_size = _MESH_SIZES[level]
+    origin = 100 * _MESH_SIZES[1][0]
+    west, south, east, north = (
+        int(round(float(angle) * _MILLISECONDS_PER_DEGREE))
+        for angle in (west, south, east, north))
+    min_row = south // lat_size
+    max_row = max(min_row, -(-north // lat_size) - 1)
+    min_column = (west - origin) // lon_size
+    max_column = max(min_column, -(-(east - origin) // lon_size) - 1)
+
+    rows, columns = _grid_shape(level)
+    min_row, min_column = max(min_row, 0), max(min_column, 0)
+    max_row, max_column = min(max_row, rows - 1), min(max_column, columns - 1)
+    if min_row > max_row or min_column > max_column:
+        return None
+    return (min_row, max_row + 1), (min_column, max_column + 1)
+
+
+def _column_code_offsets(level, min_column, max_column):
+    """Returns the offsets of the integer mesh codes for the columns
+    in [min_column, max_column).
+
+    Mesh codes are linear in the digits of the rows and the columns,
+    so that the code of (row, column) is the code of (row, 0)
+    plus the offset of the column.
+
+    :param level: A mesh level number.
+    :param min_column: The first column index.
+    :param max_column: The column index after the last one.
+    """
+    base = _index_to_code(level, 0, 0)
+    return [
+        _index_to_code(level, 0, column) - base
+        for column in range(min_column, max_column)]
+
+
+def _iter_index_range_codes(level, row_range, column_range):
+    """Yields the integer codes of the meshes in the index ranges
+    in the spatial order.
+
+    :param level: A mesh level number.
+    :param row_range: The (first, last + 1) row indexes.
+    :param column_range: The (first, last + 1) column indexes.
+    """
+    column_codes = _column_code_offsets(level, *column_range)
+    for row in range(*row_range):
+        row_code = _index_to_code(level, row, 0)
+        for column_code in column_codes:
+            yield row_code + column_code
+
+
+def iter_bbox_codes(west, south, east, north, level, as_int=False): # pylint: disable=R0913
+    """Yields the codes of the meshes intersecting the bounding box
+    in the spatial order (see JapanMesh.spatial_key), without creating
+    any mesh instances.
+
+    The index ranges are calculated with integer milliseconds,
+    and the codes are calculated from the codes of the first column
+    and the offsets of the columns.
+
+    :param west: The west border in degrees.
+    :param south: The south border in degrees.
+    :param east: The east border in degrees.
+    :param north: The north border in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param as_int: Yields the mesh codes in integers if True.
+
+    >>> list(iter_bbox_codes(139.7, 35.6, 139.72, 35.61, ThirdMesh))
+    ['53393526', '53393527', '53393536', '53393537']
+    """
+    mesh_level = _mesh_level(level)
+    index_range = _bbox_index_range(west, south, east, north, mesh_level)
+    if index_range is None:
+        return
+    codes = _iter_index_range_codes(mesh_level, *index_range)
+    if as_int:
+        for code in codes:
+            yield code
+        return
+    code_format = _CODE_FORMATS[mesh_level]
+    for code in codes:
+        yield code_format.format(code)
+
+
+def iter_bbox_meshes(west, south, east, north, level):
+    """Yields the meshes intersecting the bounding box
+    in the spatial order.
+
+    :param west: The west border in degrees.
+    :param south: The south border in degrees.
+    :param east: The east border in degrees.
+    :param north: The north border in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    """
+    mesh_level = _mesh_level(level)
+    for code in iter_bbox_codes(
+            west, south, east, north, mesh_level, as_int=True):
+        yield _create_mesh(mesh_level, code)
+
+
+def _index_to_code_array(numpy, level, rows, columns):
+    """Returns the integer mesh code array for the (row, column) indexes.
+
+    :param numpy: The NumPy module.
+    :param level: A mesh level number.
+    :param rows: A row index array.
+    :param columns: A column index array.
+    """
+    codes = numpy.zeros(numpy.broadcast(rows, columns).shape, numpy.int64)
+    place = 1
+    for _, _, indexed, divide_num in reversed(_DIVIDE_STEPS[:level - 1]):
+        rows, lat_number = numpy.divmod(rows, divide_num)
+        columns, lon_number = numpy.divmod(columns, divide_num)
+        if indexed:
+            codes += (lat_number * 2 + lon_number + 1) * place
+            place *= 10
+        else:
+            codes += (lat_number * 10 + lon_number) * place
+            place *= 100
+    return (rows * 100 + columns) * place + codes
+
+
+def bbox_code_array(west, south, east, north, level):
+    """Returns the integer codes of the meshes intersecting the bounding
+    box in a 2-dimensional array of (rows from the south, columns from
+    the west). Requires NumPy.
+
+    :param west: The west border in degrees.
+    :param south: The south border in degrees.
+    :param east: The east border in degrees.
+    :param north: The north border in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    """
+    numpy = _import_numpy()
+    mesh_level = _mesh_level(level)
+    index_range = _bbox_index_range(west, south, east, north, mesh_level)
+    if index_range is None:
+        return numpy.zeros((0, 0), numpy.int64)
+    rows = numpy.arange(*index_range[0], dtype=numpy.int64)
+    columns = numpy.arange(*index_range[1], dtype=numpy.int64)
+    return _index_to_code_array(
+        numpy, mesh_level, rows[:, None], columns[None, :])
+
+
+def _polygon_edges(rings, origin):
+    """Returns the edges of the rings in integer milliseconds from the
+    origin, as tuples of (south, north, x at the south, x at the north).
+    Horizontal edges are from the west to the east.
+
+    :param rings: Rings of (lon, lat) in degrees, which may be closed.
+    :param origin: The longitude of the grid origin in milliseconds.
+    """
+    edges = []
+    for vertices in rings:
+        points = [
+            (int(round(float(lon) * _MILLISECONDS_PER_DEGREE)) - origin,
+             int(round(float(lat) * _MILLISECONDS_PER_DEGREE)))
+            for lon, lat in vertices]
+        for (start_x, start_y), (end_x, end_y) in zip(
+                points, points[1:] + points[:1]):
+            if start_y > end_y or (start_y == end_y and start_x > end_x):
+                start_x, start_y, end_x, end_y = end_x, end_y, start_x, start_y
+            edges.append((start_y, end_y, start_x, end_x))
+    edges.sort()
+    return edges
+
+
+def _merge_spans(spans):
+    """Returns the sorted and merged column spans [begin, end).
+
+    :param spans: An iterable of column spans [begin, end).
+    """
+    merged = []
+    for begin, end in sorted(spans):
+        if merged and begin <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        elif begin < end:
+            merged.append([begin, end])
+    return merged
+
+
+def _subtract_spans(spans, excluded_spans):
+    """Returns the merged column spans excluding the other merged spans.
+
+    :param spans: Merged column spans [begin, end).
+    :param excluded_spans: Merged column spans [begin, end) to exclude.
+    """
+    results = []
+    for begin, end in spans:
+        for excluded_begin, excluded_end in excluded_spans:
+            if excluded_end <= begin or excluded_begin >= end:
+                continue
+            if excluded_begin > begin:
+                results.append([begin, excluded_begin])
+            begin = max(begin, excluded_end)
+        if begin < end:
+            results.append([begin, end])
+    return results
+
+
+def _iter_scanline_edges(edges, level):
+    """Yields (row, active edges) of the rows crossed by the edges
+    from the south.
+
+    :param edges: The sorted edges (see _polygon_edges).
+    :param level: A mesh level number.
+    """
+    lat_size = _MESH_SIZES[level][1]
+    min_row = max(int(edges[0][0] // lat_size), 0)
+    max_row = min(
+        int(-(-max(edge[1] for edge in edges) // lat_size)),
+        _grid_shape(level)[0])
+    active = []
+    next_edge = 0
+    for row in range(min_row, max_row):
+        south = row * lat_size
+        while (next_edge < len(edges) and
+               edges[next_edge][0] < south + lat_size):
+            active.append(edges[next_edge])
+            next_edge += 1
+        active = [edge for edge in active if edge[1] > south]
+        if active:
+            yield row, active
+
+
+def _scanline_spans(edges, south, north, lon_size):
+    """Returns the merged column spans of the meshes crossed by the edges
+    in a row, and those of the meshes whose centers are between
+    the crossings of the center line in the even-odd rule.
+
+    :param edges: The edges crossing the row (see _polygon_edges).
+    :param south: The south border of the row in milliseconds.
+    :param north: The north border of the row in milliseconds.
+    :param lon_size: The longitude size of the meshes in milliseconds.
+    """
+    center = south + (north - south) / 2.0
+    border_spans = []
+    crossings = []
+    for edge_south, edge_north, south_x, north_x in edges:
+        if edge_south == edge_north:
+            border_spans.append(
+                (int(south_x // lon_size), int(-(-north_x // lon_size))))
+            continue
+        slope = float(north_x - south_x) / (edge_north - edge_south)
+        west = south_x + slope * (max(edge_south, south) - edge_south)
+        east = south_x + slope * (min(edge_north, north) - edge_south)
+        if west > east:
+            west, east = east, west
+        border_spans.append(
+            (int(west // lon_size), int(-(-east // lon_size))))
+        if edge_south <= center < edge_north:
+            crossings.append(south_x + slope * (center - edge_south))
+    crossings.sort()
+    inner_spans = _merge_spans(
+        (int((west / lon_size + 0.5) // 1),
+         int((east / lon_size + 0.5) // 1))
+        for west, east in zip(crossings[0::2], crossings[1::2]))
+    return _merge_spans(border_spans), inner_spans
+
+
+def _iter_polygon_spans(rings, level, contained):
+    """Yields (row, column spans) of the meshes covering the polygon
+    row by row, where the column spans are merged ones [begin, end).
+
+    Each row is a scanline: the meshes crossed by the active edges are
+    on the border, and the ones whose centers are between the crossings
+    of the center line in the even-odd rule are inside.
+
+    :param rings: The exterior ring and the holes.
+    :param level: A mesh level number.
+    :param contained: Yields only the meshes inside the polygon if True,
+        otherwise the meshes intersecting the polygon.
+    """
+    lon_size, lat_size = _MESH_SIZES[level]
+    columns = _grid_shape(level)[1]
+    edges = _polygon_edges(rings, 100 * _MESH_SIZES[1][0])
+    if not edges:
+        return
+    for row, active in _iter_scanline_edges(edges, level):
+        border_spans, inner_spans = _scanline_spans(
+            active, row * lat_size, (row + 1) * lat_size, lon_size)
+        if contained:
+            spans = _subtract_spans(inner_spans, border_spans)
+        else:
+            spans = _merge_spans(border_spans + inner_spans)
+        spans = [
+            (max(begin, 0), min(end, columns)) for begin, end in spans
+            if end > 0 and begin < columns]
+        if spans:
+            yield row, spans
+
+
+def compact_mesh_codes(codes):
+    """Returns the mesh codes where complete groups of the children are
+    replaced with their parents recursively, in the spatial order.
+
+    For example, four quarter meshes of a half mesh are replaced with the
+    half mesh, and the 100 3rd meshes of a 2nd mesh with the 2nd mesh.
+
+    :param codes: Mesh codes of any levels, which may be hyphenated.
+    """
+    codes_by_level = [set() for _ in _CODE_LENGTHS]
+    for code in codes:
+        level, int_code = _parse_code_int(code)
+        codes_by_level[level].add(int_code)
+    return _compact_codes(codes_by_level)
+
+
+def _compact_codes(codes_by_level):
+    """Returns the compacted mesh codes in the spatial order.
+
+    :param codes_by_level: Sets of integer mesh codes indexed by the levels,
+        which are modified.
+    """
+    for level in range(len(_CODE_LENGTHS) - 1, 1, -1):
+        divisor = _PARENT_DIVISORS[level]
+        child_count = _DIVIDE_STEPS[level - 2][3] ** 2
+        counts = collections.Counter(
+            code // divisor for code in codes_by_level[level])
+        parents = set(
+            parent for parent, count in counts.items()
+            if count == child_count)
+        if parents:
+            codes_by_level[level] = set(
+                code for code in codes_by_level[level]
+                if code // divisor not in parents)
+            codes_by_level[level - 1] |= parents
+    results = []
+    for level in range(1, len(_CODE_LENGTHS)):
+        results.extend(
+            _CODE_FORMATS[level].format(code) for _, code in sorted(
+                (_code_to_index(level, code), code)
+                for code in codes_by_level[level]))
+    return results
+
+
+def _rings_index_range(rings, level):
+    """Returns the (row, column) index ranges of the meshes intersecting
+    the bounding box of the rings, or None if empty.
+
+    :param rings: Rings of (lon, lat) in degrees.
+    :param level: A mesh level number.
+    """
+    lons = [lon for vertices in rings for lon, _ in vertices]
+    lats = [lat for vertices in rings for _, lat in vertices]
+    if not lons:
+        return None
+    return _bbox_index_range(
+        min(lons), min(lats), max(lons), max(lats), level)
+
+
+def _iter_polygon_codes(rings, level, contained):
+    """Yields the integer codes of the meshes covering the polygon
+    in the spatial order.
+
+    :param rings: The exterior ring and the holes.
+    :param level: A mesh level number.
+    :param contained: Yields only the meshes inside the polygon if True.
+    """
+    index_range = _rings_index_range(rings, level)
+    if index_range is None:
+        return
+    min_column = index_range[1][0]
+    column_codes = _column_code_offsets(level, *index_range[1])
+    for row, spans in _iter_polygon_spans(rings, level, contained):
+        row_code = _index_to_code(level, row, 0)
+        for begin, end in spans:
+            for column_code in column_codes[
+                    begin - min_column:end - min_column]:
+                yield row_code + column_code
+
+
+def polygon_cover(exterior, level, holes=(), contained=False,
+                  compact=False):
+    """Returns the codes of the meshes covering the polygon
+    in the spatial order.
+
+    The polygon is rasterized row by row with the scanline of the edges,
+    instead of testing every mesh in the bounding box.
+
+    :param exterior: The exterior ring in (lon, lat) degrees,
+        which may be closed or not.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param holes: The interior rings in (lon, lat) degrees.
+    :param contained: Returns only the meshes inside the polygon if True,
+        otherwise the meshes intersecting the polygon.
+    :param compact: Replace complete groups of the children with their
+        parents if True (see compact_mesh_codes).
+
+    >>> polygon_cover(
+    ...     [(139.7, 35.6), (139.72, 35.6), (139.7, 35.61)], ThirdMesh)
+    ['53393526', '53393527', '53393536']
+    """
+    mesh_level = _mesh_level(level)
+    codes = _iter_polygon_codes(
+        [exterior] + list(holes), mesh_level, contained)
+    if compact:
+        codes_by_level = [set() for _ in _CODE_LENGTHS]
+        codes_by_level[mesh_level].update(codes)
+        return _compact_codes(codes_by_level)
+    code_format = _CODE_FORMATS[mesh_level]
+    return [code_format.format(code) for code in codes]
+
+
+def _ring_offsets(k):
+    """Returns the (row, column) offsets of the square ring at the
+    Chebyshev distance k in the spatial order.
+
+    :param k: The distance in meshes.
+    """
+    return [
+        (row, column)
+        for row in range(-k, k + 1) for column in range(-k, k + 1)
+        if max(abs(row), abs(column)) == k]
+
+
+def _neighbor_offsets(k):
+    """Returns the (row, column) offsets within the Chebyshev distance k
+    except the center, in the spatial order.
+
+    :param k: The distance in meshes.
+    """
+    return [
+        (row, column)
+        for row in range(-k, k + 1) for column in range(-k, k + 1)
+        if row or column]
+
+
+def _offset_packed_codes(packed_code, offsets):
+    """Returns the packed codes of the meshes at the (row, column) offsets
+    from the mesh, except the ones out of the mesh range.
+
+    The codes are the sums of the codes of the rows and the columns
+    (see _column_code_offsets), which are calculated once for each.
+
+    :param packed_code: A packed mesh code.
+    :param offsets: (row, column) offsets.
+    """
+    level, code = _unpack_code_int(packed_code)
+    row, column = _code_to_index(level, code)
+    rows, columns = _grid_shape(level)
+    base = level * _PACKED_LEVEL_UNIT - _index_to_code(level, 0, 0)
+    row_codes = {}
+    column_codes = {}
+    results = []
+    for neighbor_row, neighbor_column in (
+            (row + row_offset, column + column_offset)
+            for row_offset, column_offset in offsets):
+        if not (0 <= neighbor_row < rows and 0 <= neighbor_column < columns):
+            continue
+        if neighbor_row not in row_codes:
+            row_codes[neighbor_row] = _index_to_code(level, neighbor_row, 0)
+        if neighbor_column not in column_codes:
+            column_codes[neighbor_column] = _index_to_code(
+                level, 0, neighbor_column)
+        results.append(
+            base + row_codes[neighbor_row] + column_codes[neighbor_column])
+    return results
+
+
+def neighbors(packed_code, k=1):
+    """Returns the packed codes of the meshes within the distance k
+    (in the number of meshes in any direction) except the mesh itself,
+    in the spatial order.
+
+    The codes are calculated from the global (row, column) indexes,
+    so that the carries across the 2nd and the 1st meshes and the
+    division indexes of the half meshes and the finer ones are handled.
+    Meshes out of the mesh range are omitted.
+
+    :param packed_code: A packed mesh code (see pack_mesh_code).
+    :param k: The distance in meshes, 1 for the 8 neighbors.
+
+    >>> unpack_mesh_codes(neighbors(pack_mesh_code('53393599')))[3:5]
+    ['53393598', '53393690']
+    """
+    if k < 1:
+        raise ValueError('Invalid distance: {0}'.format(k))
+    return _offset_packed_codes(packed_code, _neighbor_offsets(k))
+
+
+def ring(packed_code, k=1):
+    """Returns the packed codes of the meshes at exactly the distance k
+    from the mesh, which is the square ring of 8 * k meshes,
+    in the spatial order. Meshes out of the mesh range are omitted.
+
+    :param packed_code: A packed mesh code (see pack_mesh_code).
+    :param k: The distance in meshes.
+    """
+    if k < 0:
+        raise ValueError('Invalid distance: {0}'.format(k))
+    return _offset_packed_codes(packed_code, _ring_offsets(k))
+
+
+def _code_to_index_array(numpy, level, codes):
+    """Returns the global (row, column) index arrays
+    for the integer mesh code array.
+
+    :param numpy: The NumPy module.
+    :param level: A mesh level number.
+    :param codes: An integer mesh code array.
+    """
+    rows = numpy.zeros_like(codes)
+    columns = numpy.zeros_like(codes)
+    scale = 1
+    for _, _, indexed, divide_num in reversed(_DIVIDE_STEPS[:level - 1]):
+        if indexed:
+            codes, div_index = numpy.divmod(codes, 10)
+            rows += (div_index - 1) // 2 * scale
+            columns += (div_index - 1) % 2 * scale
+        else:
+            codes, digits = numpy.divmod(codes, 100)
+            rows += digits // 10 * scale
+            columns += digits % 10 * scale
+        scale *= divide_num
+    return codes // 100 * scale + rows, codes % 100 * scale + columns
+
+
+def _offset_level_code_array(numpy, level, codes, row_offsets,
+                             column_offsets):
+    """Returns the 2-dimensional packed code array of the meshes at the
+    offsets from the meshes of a level, where the invalid codes and
+    the meshes out of the mesh range are 0.
+
+    :param numpy: The NumPy module.
+    :param level: A mesh level number.
+    :param codes: An integer mesh code array of the level.
+    :param row_offsets: A row offset array.
+    :param column_offsets: A column offset array.
+    """
+    rows, columns = _code_to_index_array(numpy, level, codes)
+    valid = (
+        (codes < 10 ** _CODE_LENGTHS[level]) &
+        (_index_to_code_array(numpy, level, rows, columns) == codes))
+    rows = rows[:, None] + row_offsets[None, :]
+    columns = columns[:, None] + column_offsets[None, :]
+    row_count, column_count = _grid_shape(level)
+    valid = (valid[:, None] & (rows >= 0) & (rows < row_count) &
+             (columns >= 0) & (columns < column_count))
+    neighbor_codes = _index_to_code_array(
+        numpy, level, numpy.where(valid, rows, 0),
+        numpy.where(valid, columns, 0)) + level * _PACKED_LEVEL_UNIT
+    return numpy.where(valid, neighbor_codes, 0)
+
+
+def _offset_packed_code_array(packed_codes, offsets):
+    """Returns the 2-dimensional packed code array of the meshes at the
+    (row, column) offsets from the meshes, where the invalid codes and
+    the meshes out of the mesh range are 0.
+
+    :param packed_codes: Packed mesh codes.
+    :param offsets: (row, column) offsets.
+    """
+    numpy = _import_numpy()
+    packed_codes = numpy.asarray(packed_codes, dtype=numpy.uint64).ravel()
+    levels = (packed_codes // _PACKED_LEVEL_UNIT).astype(numpy.int64)
+    codes = (packed_codes % _PACKED_LEVEL_UNIT).astype(numpy.int64)
+    row_offsets = numpy.array([offset[0] for offset in offsets], numpy.int64)
+    column_offsets = numpy.array(
+        [offset[1] for offset in offsets], numpy.int64)
+    results = numpy.zeros((len(packed_codes), len(offsets)), numpy.uint64)
+    for level in range(1, len(_CODE_LENGTHS)):
+        indexes = numpy.nonzero(levels == level)[0]
+        results[indexes] = _offset_level_code_array(
+            numpy, level, codes[indexes], row_offsets, column_offsets)
+    return results
+
+
+def neighbors_array(packed_codes, k=1):
+    """Returns the packed codes of the neighbors for many meshes
+    in a vectorized way. Requires NumPy.
+
+    :param packed_codes: Packed mesh codes.
+    :param k: The distance in meshes, 1 for the 8 neighbors.
+    :return: A uint64 array of (the number of the codes, (2k + 1)^2 - 1)
+        in the same order as neighbors(), where the meshes out of the mesh
+        range and the ones of invalid codes are 0.
+    """
+    if k < 1:
+        raise ValueError('Invalid distance: {0}'.format(k))
+    return _offset_packed_code_array(packed_codes, _neighbor_offsets(k))
+
+
+def ring_array(packed_codes, k=1):
+    """Returns the packed codes of the rings for many meshes
+    in a vectorized way. Requires NumPy.
+
+    :param packed_codes: Packed mesh codes.
+    :param k: The distance in meshes.
+    :return: A uint64 array of (the number of the codes, 8k) in the same
+        order as ring(), where the meshes out of the mesh range
+        and the ones of invalid codes are 0.
+    """
+    if k < 0:
+        raise ValueError('Invalid distance: {0}'.format(k))
+    return _offset_packed_code_array(packed_codes, _ring_offsets(k))
+
+
+# Bits of the level in Morton keys, which are
+# `level << _MORTON_LEVEL_SHIFT | interleaved row and column bits`.
+_MORTON_LEVEL_SHIFT = 32
+# Bits of the row and the column indexes in Morton keys.
+_MORTON_INDEX_BITS = 16
+
+
+def _spread_bits(value):
+    """Returns the 16-bit value with its bits spread to the even bits.
+    """
+    value &= 0xFFFF
+    value = (value | value << 8) & 0x00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F
+    value = (value | value << 2) & 0x33333333
+    return (value | value << 1) & 0x55555555
+
+
+def _compact_bits(value):
+    """Returns the value of the even bits, which is the inverse of
+    _spread_bits().
+    """
+    value &= 0x55555555
+    value = (value | value >> 1) & 0x33333333
+    value = (value | value >> 2) & 0x0F0F0F0F
+    value = (value | value >> 4) & 0x00FF00FF
+    return (value | value >> 8) & 0xFFFF
+
+
+def _morton_key(level, row, column):
+    """Returns the Morton key for the (row, column) index of the level.
+    """
+    return (level << _MORTON_LEVEL_SHIFT |
+            _spread_bits(row) << 1 | _spread_bits(column))
+
+
+def morton_key(packed_code):
+    """Returns the Morton key (Z-order key) of the mesh, which interleaves
+    the bits of the global (row, column) index in the grid of the level.
+
+    Meshes close to each other tend to be close in the order of the keys.
+    The level is kept in the upper bits, so that keys of different levels
+    never collide.
+
+    :param packed_code: A packed mesh code (see pack_mesh_code).
+
+    >>> morton_key(pack_mesh_code('0001')), morton_key(pack_mesh_code('0100'))
+    (4294967297, 4294967298)
+    """
+    level, code = _unpack_code_int(packed_code)
+    return _morton_key(level, *_code_to_index(level, code))
+
+
+def morton_key_to_packed_code(key):
+    """Returns the packed code of the mesh for the Morton key.
+
+    :param key: A Morton key (see morton_key).
+    """
+    level = key >> _MORTON_LEVEL_SHIFT
+    bits = key & ((1 << _MORTON_LEVEL_SHIFT) - 1)
+    row = _compact_bits(bits >> 1)
+    column = _compact_bits(bits)
+    if not 0 < level < len(_CODE_LENGTHS):
+        raise ValueError('Invalid Morton key: {0}'.format(key))
+    rows, columns = _grid_shape(level)
+    if row >= rows or column >= columns:
+        raise ValueError('Invalid Morton key: {0}'.format(key))
+    return level * _PACKED_LEVEL_UNIT + _index_to_code(level, row, column)
+
+
+def _quadtree_key_ranges(level, index_range):
+    """Returns the ranges of the Morton keys of the meshes in the index
+    ranges, as sorted and disjoint [begin, end) lists.
+
+    :param level: A mesh level number.
+    :param index_range: The (row, column) index ranges of the meshes.
+    """
+    (min_row, max_row), (min_column, max_column) = index_range
+    ranges = []
+    squares = [(0, 0, _MORTON_INDEX_BITS)]
+    while squares:
+        row, column, bits = squares.pop()
+        size = 1 << bits
+        if (row >= max_row or row + size <= min_row or
+                column >= max_column or column + size <= min_column):
+            continue
+        if (min_row <= row and row + size <= max_row and
+                min_column <= column and column + size <= max_column):
+            begin = _morton_key(level, row, column)
+            if ranges and ranges[-1][1] == begin:
+                ranges[-1][1] = begin + size * size
+            else:
+                ranges.append([begin, begin + size * size])
+            continue
+        half = size // 2
+        # Pushed in the reverse order to pop in the order of the keys.
+        squares.extend([
+            (row + half, column + half, bits - 1),
+            (row + half, column, bits - 1),
+            (row, column + half, bits - 1),
+            (row, column, bits - 1)])
+    return ranges
+
+
+def _fill_key_range_gaps(ranges, max_ranges):
+    """Returns the ranges with the smallest gaps filled
+    to reduce them to max_ranges.
+
+    :param ranges: Sorted and disjoint [begin, end) lists.
+    :param max_ranges: The maximum number of the ranges.
+    """
+    gaps = sorted(
+        (ranges[index + 1][0] - ranges[index][1], index)
+        for index in range(len(ranges) - 1))
+    filled = set(index for _, index in gaps[:len(ranges) - max_ranges])
+    merged = [ranges[0]]
+    for index, key_range in enumerate(ranges[1:]):
+        if index in filled:
+            merged[-1][1] = key_range[1]
+        else:
+            merged.append(key_range)
+    return merged
+
+
+def morton_ranges(west, south, east, north, level, max_ranges=None): # pylint: disable=R0913
+    """Returns the ranges of the Morton keys of the meshes intersecting
+    the bounding box, as sorted and disjoint [begin, end) pairs.
+
+    The box is decomposed into aligned squares of the quadtree, each of
+    which is a range of keys, and the adjacent ranges are merged.
+
+    :param west: The west border in degrees.
+    :param south: The south border in degrees.
+    :param east: The east border in degrees.
+    :param north: The north border in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param max_ranges: The maximum number of the ranges if not None.
+        The smallest gaps between the ranges are filled to reduce them,
+        where the ranges include keys out of the box.
+    """
+    if max_ranges is not None and max_ranges < 1:
+        raise ValueError('Invalid number of ranges: {0}'.format(max_ranges))
+    mesh_level = _mesh_level(level)
+    index_range = _bbox_index_range(west, south, east, north, mesh_level)
+    if index_range is None:
+        return []
+    ranges = _quadtree_key_ranges(mesh_level, index_range)
+    if max_ranges is not None and len(ranges) > max_ranges:
+        ranges = _fill_key_range_gaps(ranges, max_ranges)
+    return [tuple(key_range) for key_range in ranges]
+
+
+def _item_code_int(item):
+    """Returns the level and the integer mesh code of the item.
+
+    :param item: A mesh, a mesh code or a packed code.
+    """
+    if isinstance(item, JapanMesh):
+        return item.level, item.int_code
+    if isinstance(item, numbers.Integral):
+        return _unpack_code_int(item)
+    return _parse_code_int(item)
+
+
+def _item_packed_code(item):
+    """Returns the packed code of the item.
+
+    :param item: A mesh, a mesh code or a packed code.
+    """
+    level, code = _item_code_int(item)
+    return level * _PACKED_LEVEL_UNIT + code
+
+
+# Numbers of meshes in the edges of the blocks of MeshSet, which are
+# 1st meshes for the levels 1 to 3 and 3rd meshes for the finer levels.
+_SET_BLOCK_EDGES = (None, 1, 8, 80, 2, 4, 8)
+# Header of serialized MeshSet: magic, version, level and block count.
+_SET_HEADER = struct.Struct('>4sBBI')
+_SET_MAGIC = b'JPMS'
+# (block row, block column) of a serialized block of MeshSet.
+_SET_BLOCK_KEY = struct.Struct('>HH')
+
+
+class MeshSet(object):
+    """Set of meshes of a level, stored as bitmaps per block.
+
+    A block is a 1st mesh for the levels 1 to 3 and a 3rd mesh for the
+    finer levels, and its bitmap is an integer whose bits are the meshes
+    in the block in the spatial order. Set operations are bitwise
+    operations of the blocks, and sets are serialized compactly with
+    to_bytes().
+
+    Items are meshes, mesh codes or packed codes of the level.
+
+    >>> meshes = MeshSet(ThirdMesh, ['53393526', '53393527'])
+    >>> '5339-35-26' in meshes, len(meshes | MeshSet(3, ['53393599']))
+    (True, 3)
+    """
+
+    def __init__(self, level, items=()):
+        """Initialize.
+        :param level: A mesh level number (1 to 6) or a mesh class.
+        :param items: An iterable of meshes, mesh codes or packed codes.
+        """
+        self.level = _mesh_level(level)
+        self.__edge = _SET_BLOCK_EDGES[self.level]
+        self.__blocks = {}
+        for item in items:
+            self.add(item)
+
+    def __locate(self, item):
+        """Returns the block key and the bit of the item.
+        """
+        level, code = _item_code_int(item)
+        if level != self.level:
+            raise ValueError('Invalid mesh level: {0}'.format(level))
+        row, column = _code_to_index(level, code)
+        block_row, local_row = divmod(row, self.__edge)
+        block_column, local_column = divmod(column, self.__edge)
+        return ((block_row, block_column),
+                1 << (local_row * self.__edge + local_column))
+
+    def __new_set(self, blocks):
+        """Returns a new set of the same level with the blocks.
+        """
+        mesh_set = MeshSet(self.level)
+        mesh_set.__blocks = blocks # pylint: disable=W0212
+        return mesh_set
+
+    def __check_level(self, that):
+        """Raises ValueError if the levels differ.
+        """
+        if that.level != self.level:
+            raise ValueError('Mesh levels differ: {0} and {1}'.format(
+                self.level, that.level))
+
+    def add(self, item):
+        """Add a mesh to the set.
+
+        :param item: A mesh, a mesh code or a packed code of the level.
+        """
+        key, bit = self.__locate(item)
+        self.__blocks[key] = self.__blocks.get(key, 0) | bit
+
+    def discard(self, item):
+        """Remove a mesh from the set if present.
+
+        :param item: A mesh, a mesh code or a packed code of the level.
+        """
+        key, bit = self.__locate(item)
+        bits = self.__blocks.get(key, 0) & ~bit
+        if bits:
+            self.__blocks[key] = bits
+        else:
+            self.__blocks.pop(key, None)
+
+    def __contains__(self, item):
+        try:
+            key, bit = self.__locate(item)
+        except (TypeError, ValueError):
+            return False
+        return bool(self.__blocks.get(key, 0) & bit)
+
+    def __len__(self):
+        return sum(bin(bits).count('1') for bits in self.__blocks.values())
+
+    def __iter__(self):
+        level = self.level
+        for code in self.iter_codes(as_int=True):
+            yield _create_mesh(level, code)
+
+    def iter_codes(self, as_int=False):
+        """Yields the codes of the meshes block by block,
+        without creating any mesh instances.
+
+        :param as_int: Yields the mesh codes in integers if True.
+        """
+        level = self.level
+        edge = self.__edge
+        code_format = _CODE_FORMATS[level]
+        for block_row, block_column in sorted(self.__blocks):
+            bits = self.__blocks[(block_row, block_column)]
+            while bits:
+                lowest_bit = bits & -bits
+                bits ^= lowest_bit
+                local_row, local_column = divmod(
+                    lowest_bit.bit_length() - 1, edge)
+                code = _index_to_code(
+                    level, block_row * edge + local_row,
+                    block_column * edge + local_column)
+                yield code if as_int else code_format.format(code)
+
+    def packed_codes(self):
+        """Returns the packed codes of the meshes in an array('Q')
+        (array('L') on Python 2.7).
+        """
+        unit = self.level * _PACKED_LEVEL_UNIT
+        return _uint64_array(
+            unit + code for code in self.iter_codes(as_int=True))
+
+    def __eq__(self, that):
+        if not isinstance(that, MeshSet):
+            return NotImplemented
+        # pylint: disable=W0212
+        return self.level == that.level and self.__blocks == that.__blocks
+
+    def __ne__(self, that):
+        if not isinstance(that, MeshSet):
+            return NotImplemented
+        return not self == that
+
+    __hash__ = None
+
+    def __or__(self, that):
+        self.__check_level(that)
+        blocks = dict(self.__blocks)
+        for key, bits in that.__blocks.items(): # pylint: disable=W0212
+            blocks[key] = blocks.get(key, 0) | bits
+        return self.__new_set(blocks)
+
+    def __and__(self, that):
+        self.__check_level(that)
+        # pylint: disable=W0212
+        small, large = sorted(
+            (self.__blocks, that.__blocks), key=len)
+        blocks = {}
+        for key, bits in small.items():
+            bits &= large.get(key, 0)
+            if bits:
+                blocks[key] = bits
+        return self.__new_set(blocks)
+
+    def __sub__(self, that):
+        self.__check_level(that)
+        blocks = {}
+        for key, bits in self.__blocks.items():
+            bits &= ~that.__blocks.get(key, 0) # pylint: disable=W0212
+            if bits:
+                blocks[key] = bits
+        return self.__new_set(blocks)
+
+    def __xor__(self, that):
+        self.__check_level(that)
+        blocks = dict(self.__blocks)
+        for key, bits in that.__blocks.items(): # pylint: disable=W0212
+            bits ^= blocks.get(key, 0)
+            if bits:
+                blocks[key] = bits
+            else:
+                del blocks[key]
+        return self.__new_set(blocks)
+
+    def __ior__(self, that):
+        self.__check_level(that)
+        blocks = self.__blocks
+        for key, bits in that.__blocks.items(): # pylint: disable=W0212
+            blocks[key] = blocks.get(key, 0) | bits
+        return self
+
+    def __iand__(self, that):
+        self.__blocks = (self & that).__blocks # pylint: disable=W0212
+        return self
+
+    def __isub__(self, that):
+        self.__blocks = (self - that).__blocks # pylint: disable=W0212
+        return self
+
+    def __le__(self, that):
+        if not isinstance(that, MeshSet):
+            return NotImplemented
+        return not self - that
+
+    def __ge__(self, that):
+        if not isinstance(that, MeshSet):
+            return NotImplemented
+        return not that - self
+
+    def __nonzero__(self):
+        return bool(self.__blocks)
+
+    __bool__ = __nonzero__
+
+    def __reduce__(self):
+        return (_load_mesh_set, (self.to_bytes(),))
+
+    def to_bytes(self):
+        """Returns the serialized bytes of the set, which are the header
+        and the fixed size bitmaps of the non-empty blocks.
+        """
+        size = (self.__edge * self.__edge + 7) // 8
+        chunks = [_SET_HEADER.pack(
+            _SET_MAGIC, 1, self.level, len(self.__blocks))]
+        for key in sorted(self.__blocks):
+            chunks.append(_SET_BLOCK_KEY.pack(*key))
+            chunks.append(binascii.unhexlify(
+                '{0:0{1}x}'.format(self.__blocks[key], size * 2)))
+        return b''.join(chunks)
+
+    @staticmethod
+    def from_bytes(data):
+        """Returns the set deserialized from the bytes of to_bytes().
+
+        :param data: Serialized bytes.
+        """
+        try:
+            magic, version, level, count = _SET_HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError('Invalid mesh set data.')
+        if magic != _SET_MAGIC or version != 1:
+            raise ValueError('Invalid mesh set data.')
+        mesh_set = MeshSet(level)
+        edge = _SET_BLOCK_EDGES[level]
+        size = (edge * edge + 7) // 8
+        block_size = _SET_BLOCK_KEY.size + size
+        if len(data) != _SET_HEADER.size + block_size * count:
+            raise ValueError('Invalid mesh set data.')
+        blocks = {}
+        for offset in range(_SET_HEADER.size, len(data), block_size):
+            key = _SET_BLOCK_KEY.unpack_from(data, offset)
+            bits = data[offset + _SET_BLOCK_KEY.size:offset + block_size]
+            blocks[key] = int(binascii.hexlify(bits), 16)
+        mesh_set.__blocks = blocks # pylint: disable=W0212
+        return mesh_set
+
+
+
+def _load_mesh_set(data):
+    """Returns the mesh set deserialized from the bytes for pickle,
+    which cannot refer to static methods on Python 2.7.
+
+    :param data: Serialized bytes.
+    """
+    return MeshSet.from_bytes(data)
+
+
+# Header of mesh store files: magic, version, count, slot count and
+# the struct format of the values.
+_STORE_HEADER = struct.Struct('<4sB3xQQ8s')
+_STORE_MAGIC = b'JPMV'
+# Packed codes as the keys of the hash table in mesh store files,
+# where 0 is for empty slots.
+_STORE_KEY = struct.Struct('<Q')
+# Multiplier of the Fibonacci hashing of packed codes.
+_STORE_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def _store_slot(packed_code, slot_bits):
+    """Returns the first slot of the packed code in the hash table
+    of 2 ** slot_bits slots.
+    """
+    return ((packed_code * _STORE_HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (
+        64 - slot_bits) if slot_bits else 0
+
+
+class MeshStoreWriter(object):
+    """Writer of mesh store files, which map meshes to fixed size values
+    (see MeshStore).
+
+    Values are buffered compactly in bytes, and the file is written
+    on close(). The last value is kept for duplicated meshes.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'population.jpmv')
+    >>> with MeshStoreWriter(path, 'i') as writer:
+    ...     writer.add('53393526', 120)
+    >>> with MeshStore(path) as store:
+    ...     store['5339-35-26'], store.get('53393527')
+    (120, None)
+    """
+
+    def __init__(self, path, value_format='d'):
+        """Initialize.
+        :param path: The path of the file to write.
+        :param value_format: The struct format of the values without the
+            byte order, such as 'd' for floats or 'iid' for tuples
+            of two integers and a float.
+        """
+        if len(value_format) > 8 or value_format[:1] in '@=<>!':
+            raise ValueError('Invalid value format: {0}'.format(value_format))
+        self.path = path
+        self.value_format = value_format
+        self.__value_struct = struct.Struct('<' + value_format)
+        self.__codes = _uint64_array()
+        self.__values = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def add(self, item, value):
+        """Add the value of a mesh.
+
+        :param item: A mesh, a mesh code or a packed code.
+        :param value: A value, or a tuple of values for multiple fields.
+        """
+        if not isinstance(value, tuple):
+            value = (value,)
+        packed_code = _item_packed_code(item)
+        packed_value = self.__value_struct.pack(*value)
+        self.__codes.append(packed_code)
+        self.__values += packed_value
+
+    def update(self, items):
+        """Add the values of meshes.
+
+        :param items: An iterable of (mesh, value).
+        """
+        for item, value in items:
+            self.add(item, value)
+
+    def close(self):
+        """Build the hash table and write the file.
+        """
+        value_size = self.__value_struct.size
+        slot_bits = (2 * len(self.__codes) - 1).bit_length()
+        slot_count = 1 << slot_bits
+        keys = _uint64_array([0]) * slot_count
+        values = bytearray(slot_count * value_size)
+        count = 0
+        for index, packed_code in enumerate(self.__codes):
+            slot = _store_slot(packed_code, slot_bits)
+            while keys[slot] and keys[slot] != packed_code:
+                slot = (slot + 1) & (slot_count - 1)
+            if not keys[slot]:
+                keys[slot] = packed_code
+                count += 1
+            values[slot * value_size:(slot + 1) * value_size] = (
+                self.__values[index * value_size:(index + 1) * value_size])
+        if sys.byteorder != 'little':
+            keys.byteswap()
+
+        with open(self.path, 'wb') as store_file:
+            store_file.write(_STORE_HEADER.pack(
+                _STORE_MAGIC, 1, count, slot_count,
+                self.value_format.encode('ascii')))
+            keys.tofile(store_file)
+            store_file.write(values)
+        self.__codes = _uint64_array()
+        self.__values = bytearray()
+
+
+class MeshStore(object): # pylint: disable=R0902
+    """Read-only map from meshes to fixed size values in a file,
+    which is memory-mapped and never loaded at once.
+
+    The file is a hash table of packed codes with open addressing,
+    so that a lookup reads a few slots in O(1). Processes opening the
+    same file share its pages through the OS page cache, and a store
+    is pickled as its path to be opened again in worker processes.
+    Files are made with MeshStoreWriter.
+    """
+
+    def __init__(self, path):
+        """Initialize.
+        :param path: The path of the mesh store file.
+        """
+        self.path = path
+        with open(path, 'rb') as store_file:
+            try:
+                self.__map = mmap.mmap(
+                    store_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError('Invalid mesh store file: {0}'.format(path))
+        try:
+            magic, version, count, slot_count, value_format = (
+                _STORE_HEADER.unpack_from(self.__map))
+            value_format = value_format.rstrip(b'\0').decode('ascii')
+            if magic != _STORE_MAGIC or version != 1:
+                raise ValueError('Invalid mesh store file: {0}'.format(path))
+            self.__value_struct = struct.Struct('<' + value_format)
+            # The table has to be a power of two slots with an empty one
+            # at least, or lookups would not stop.
+            if (slot_count < 1 or slot_count & (slot_count - 1) or
+                    count >= slot_count or
+                    len(self.__map) != _STORE_HEADER.size + (
+                        _STORE_KEY.size + self.__value_struct.size) *
+                    slot_count):
+                raise ValueError('Invalid mesh store file: {0}'.format(path))
+        except (struct.error, ValueError):
+            self.__map.close()
+            raise ValueError('Invalid mesh store file: {0}'.format(path))
+        self.value_format = value_format
+        self.__count = count
+        self.__slot_count = slot_count
+        self.__slot_bits = slot_count.bit_length() - 1
+        self.__values_offset = (
+            _STORE_HEADER.size + _STORE_KEY.size * slot_count)
+
+    def __reduce__(self):
+        return (MeshStore, (self.path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the memory map.
+        """
+        self.__map.close()
+
+    def __len__(self):
+        return self.__count
+
+    def __value(self, slot):
+        """Returns the value in the slot.
+        """
+        values = self.__value_struct.unpack_from(
+            self.__map, self.__values_offset + self.__value_struct.size * slot)
+        return values[0] if len(values) == 1 else values
+
+    def __find(self, packed_code):
+        """Returns the slot of the packed code, or None if not found.
+        """
+        start = _store_slot(packed_code, self.__slot_bits)
+        mask = self.__slot_count - 1
+        slot = start
+        while True:
+            key = _STORE_KEY.unpack_from(
+                self.__map, _STORE_HEADER.size + _STORE_KEY.size * slot)[0]
+            if key == packed_code:
+                return slot
+            if not key:
+                return None
+            slot = (slot + 1) & mask
+            if slot == start:
+                return None
+
+    def get(self, item, default=None):
+        """Returns the value of the mesh, or the default if not found.
+
+        :param item: A mesh, a mesh code or a packed code.
+        :param default: The value for the meshes not found.
+        """
+        try:
+            slot = self.__find(_item_packed_code(item))
+        except (TypeError, ValueError):
+            return default
+        return default if slot is None else self.__value(slot)
+
+    def get_index(self, level, row, column, default=None):
+        """Returns the value of the mesh at the global (row, column) index
+        in the grid of the level, or the default if not found.
+
+        :param level: A mesh level number (1 to 6) or a mesh class.
+        :param row: A row index from the south.
+        :param column: A column index from the west.
+        :param default: The value for the meshes not found.
+        """
+        mesh_level = _mesh_level(level)
+        rows, columns = _grid_shape(mesh_level)
+        if not (0 <= row < rows and 0 <= column < columns):
+            return default
+        slot = self.__find(mesh_level * _PACKED_LEVEL_UNIT + _index_to_code(
+            mesh_level, row, column))
+        return default if slot is None else self.__value(slot)
+
+    def __getitem__(self, item):
+        slot = self.__find(_item_packed_code(item))
+        if slot is None:
+            raise KeyError(item)
+        return self.__value(slot)
+
+    def __contains__(self, item):
+        try:
+            return self.__find(_item_packed_code(item)) is not None
+        except (TypeError, ValueError):
+            return False
+
+    def items(self):
+        """Yields (packed code, value) of the meshes in the order of
+        the slots in the file.
+        """
+        for slot in range(self.__slot_count):
+            key = _STORE_KEY.unpack_from(
+                self.__map, _STORE_HEADER.size + _STORE_KEY.size * slot)[0]
+            if key:
+                yield key, self.__value(slot)
+
+
+class MeshGrid(collections.namedtuple(
+        'MeshGrid', ['level', 'row', 'column', 'values'])):
+    """Values of the meshes of a level laid out in a dense 2-dimensional
+    NumPy array, made by values_to_grid().
+
+    - level: The mesh level number.
+    - row: The global row index of the meshes in `values[0]`.
+    - column: The global column index of the meshes in `values[:, 0]`.
+    - values: The array of (rows from the south, columns from the west).
+    """
+    __slots__ = ()
+
+    @property
+    def south_west(self):
+        """Returns the coordinate at the south-west border of the grid.
+        """
+        lon_size, lat_size = _MESH_SIZES[self.level]
+        return Coordinate(
+            lon=Angle.from_millisecond(
+                100 * _MESH_SIZES[1][0] + self.column * lon_size),
+            lat=Angle.from_millisecond(self.row * lat_size))
+
+    @property
+    def mesh_size(self):
+        """Returns the size of the meshes.
+        """
+        return MESH_CLASSES[self.level - 1].size
+
+    def codes(self):
+        """Returns the integer mesh codes of the cells
+        in an array of the same shape as the values.
+        """
+        numpy = _import_numpy()
+        rows, columns = self.values.shape
+        return _index_to_code_array(
+            numpy, self.level,
+            numpy.arange(self.row, self.row + rows)[:, None],
+            numpy.arange(self.column, self.column + columns)[None, :])
+
+
+def _region_index_range(region, level):
+    """Returns the (row, column) index ranges of the region
+    in the grid of the level.
+
+    :param region: A mesh, a mesh code or a bounding box
+        (west, south, east, north) in degrees.
+    :param level: A mesh level number.
+    """
+    if isinstance(region, tuple):
+        index_range = _bbox_index_range(*region, level=level)
+        return index_range or ((0, 0), (0, 0))
+    region_level, code = _item_code_int(region)
+    if region_level > level:
+        raise ValueError('Mesh level {0} is finer than {1}'.format(
+            region_level, level))
+    row, column = _code_to_index(region_level, code)
+    rows, columns = _grid_shape(level)
+    region_rows, region_columns = _grid_shape(region_level)
+    row_scale = rows // region_rows
+    column_scale = columns // region_columns
+    return ((row * row_scale, (row + 1) * row_scale),
+            (column * column_scale, (column + 1) * column_scale))
+
+
+def _region_cell_array(numpy, codes, level, index_range):
+    """Returns the mask of the codes of the level in the index ranges,
+    and the (row, column) indexes of the masked codes from the south-west
+    of the ranges.
+
+    :param numpy: The NumPy module.
+    :param codes: Mesh codes, integer mesh codes of the level
+        or packed codes.
+    :param level: A mesh level number.
+    :param index_range: The (row, column) index ranges of the region.
+    """
+    codes = numpy.asarray(codes)
+    if codes.dtype.kind not in 'iu':
+        codes = numpy.asarray(pack_mesh_codes(codes), dtype=numpy.uint64)
+    codes = codes.astype(numpy.uint64).ravel()
+    # Integers under the unit are not packed, as in decode_array(),
+    # where 0 is for invalid coordinates in encode_array().
+    selected = numpy.where(
+        codes < _PACKED_LEVEL_UNIT, codes > 0,
+        codes // _PACKED_LEVEL_UNIT == level)
+    rows, columns = _code_to_index_array(
+        numpy, level, (codes[selected] % _PACKED_LEVEL_UNIT).astype(
+            numpy.int64))
+    (min_row, max_row), (min_column, max_column) = index_range
+    inside = ((rows >= min_row) & (rows < max_row) &
+              (columns >= min_column) & (columns < max_column))
+    selected[selected] = inside
+    return selected, rows[inside] - min_row, columns[inside] - min_column
+
+
+def values_to_grid(codes, values, region, level, fill_value=float('nan')):
+    """Returns the MeshGrid of the values of the meshes in the region.
+    Requires NumPy.
+
+    The cells are located with the global (row, column) indexes
+    in a vectorized way, where meshes of other levels and the ones
+    out of the region are ignored.
+
+    :param codes: Mesh codes or packed codes, such as a list or a NumPy
+        array (see pack_mesh_codes). Integer codes which are not packed
+        are taken as the codes of the level, such as encode_array() makes.
+    :param values: The values of the meshes.
+    :param region: A mesh such as a FirstMesh or a SecondMesh, a mesh code,
+        or a bounding box (west, south, east, north) in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param fill_value: The value of the cells without values.
+    """
+    numpy = _import_numpy()
+    mesh_level = _mesh_level(level)
+    index_range = _region_index_range(region, mesh_level)
+    values = numpy.asarray(values)
+    grid = numpy.full(
+        tuple(end - begin for begin, end in index_range), fill_value,
+        dtype=numpy.result_type(values.dtype, numpy.min_scalar_type(
+            fill_value)) if values.size else numpy.float64)
+
+    selected, rows, columns = _region_cell_array(
+        numpy, codes, mesh_level, index_range)
+    grid[rows, columns] = values.ravel()[selected]
+    return MeshGrid(
+        level=mesh_level, row=index_range[0][0], column=index_range[1][0],
+        values=grid)
+
+
+def iter_grid_values(grid, fill_value=float('nan'), as_int=False):
+    """Yields (code, value) of the cells with values in the MeshGrid,
+    in the spatial order. Requires NumPy.
+
+    :param grid: A MeshGrid.
+    :param fill_value: The value of the cells without values,
+        which may be NaN.
+    :param as_int: Yields the mesh codes in integers if True.
+    """
+    numpy = _import_numpy()
+    values = numpy.asarray(grid.values)
+    if fill_value != fill_value:
+        has_value = ~numpy.isnan(values)
+    else:
+        has_value = values != fill_value
+    rows, columns = numpy.nonzero(has_value)
+    codes = _index_to_code_array(
+        numpy, grid.level, rows + grid.row, columns + grid.column)
+    code_format = _CODE_FORMATS[grid.level]
+    for code, value in zip(codes.tolist(), values[rows, columns].tolist()):
+        yield (code if as_int else code_format.format(code)), value
+
+
+class MeshJoinStats(collections.namedtuple(
+        'MeshJoinStats', ['lookups', 'matches', 'probes'])):
+    """Statistics of the lookups of MeshJoinIndex.
+
+    - lookups: The number of the looked up points.
+    - matches: The number of the points which matched reference meshes.
+    - probes: The number of the probes of the reference meshes,
+        which is at most the number of the levels per lookup.
+    """
+    __slots__ = ()
+
+
+class MeshJoinIndex(object): # pylint: disable=R0902
+    """Index of reference meshes of mixed levels to join points with
+    the most specific meshes which contain them.
+
+    A point is encoded once at the finest level of the references,
+    and the codes of the coarser levels are derived by integer divisions,
+    which are probed from the finest level.
+
+    >>> index = MeshJoinIndex([('53393526', 'high'), ('5339-35', 'low')])
+    >>> index.lookup(139.7, 35.6), index.lookup(139.71, 35.59)
+    ((300053393526, 'high'), (200000533935, 'low'))
+    """
+
+    def __init__(self, items=(), exact=False):
+        """Initialize.
+        :param items: An iterable of (mesh, value), where the meshes
+            are meshes, mesh codes or packed codes.
+        :param exact: Encode points with integer milliseconds if True.
+        """
+        self.exact = exact
+        self.__values = {}
+        self.__levels = []
+        self.__probe_steps = []
+        self.__sorted_codes = None
+        self.__lookups = 0
+        self.__matches = 0
+        self.__probes = 0
+        for item, value in items:
+            self.add(item, value)
+
+    def __len__(self):
+        return len(self.__values)
+
+    @property
+    def levels(self):
+        """Returns the levels of the reference meshes from the finest.
+        """
+        return list(self.__levels)
+
+    def add(self, item, value):
+        """Add a reference mesh and its value.
+
+        :param item: A mesh, a mesh code or a packed code.
+        :param value: The value of the mesh.
+        """
+        level, code = _item_code_int(item)
+        self.__values[level * _PACKED_LEVEL_UNIT + code] = value
+        if level not in self.__levels:
+            self.__levels = sorted(self.__levels + [level], reverse=True)
+            self.__probe_steps = [
+                (probe_level * _PACKED_LEVEL_UNIT, 10 ** (
+                    _CODE_LENGTHS[self.__levels[0]] -
+                    _CODE_LENGTHS[probe_level]))
+                for probe_level in self.__levels]
+        self.__sorted_codes = None
+
+    def stats(self):
+        """Returns the MeshJoinStats of the lookups.
+        """
+        return MeshJoinStats(
+            lookups=self.__lookups, matches=self.__matches,
+            probes=self.__probes)
+
+    def reset_stats(self):
+        """Reset the statistics of the lookups.
+        """
+        self.__lookups = 0
+        self.__matches = 0
+        self.__probes = 0
+
+    def lookup(self, lon, lat):
+        """Returns (packed code, value) of the most specific reference mesh
+        containing the point, or None if not found.
+
+        :param lon: A longitude in degrees.
+        :param lat: A latitude in degrees.
+        """
+        self.__lookups += 1
+        if not self.__levels:
+            return None
+        finest_level = self.__levels[0]
+        try:
+            code = _encode_degree(lon, lat, finest_level, self.exact)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        values = self.__values
+        for unit, divisor in self.__probe_steps:
+            self.__probes += 1
+            packed_code = unit + code // divisor
+            if packed_code in values:
+                self.__matches += 1
+                return packed_code, values[packed_code]
+        return None
+
+    def __get_sorted_codes(self, numpy):
+        """Returns the sorted integer code arrays of the levels.
+        """
+        if self.__sorted_codes is None:
+            codes = numpy.array(sorted(self.__values), dtype=numpy.uint64)
+            levels = codes // _PACKED_LEVEL_UNIT
+            self.__sorted_codes = dict(
+                (level, (codes[levels == level] % _PACKED_LEVEL_UNIT)
+                 .astype(numpy.int64))
+                for level in self.__levels)
+        return self.__sorted_codes
+
+    def lookup_array(self, lons, lats):
+        """Returns the packed codes of the most specific reference meshes
+        containing the points in a vectorized way, where 0 is for the
+        points without matches. Requires NumPy.
+
+        :param lons: Longitudes in degrees.
+        :param lats: Latitudes in degrees.
+        :return: A uint64 array of packed codes.
+        """
+        numpy = _import_numpy()
+        lons = numpy.asarray(lons, dtype=numpy.float64).ravel()
+        results = numpy.zeros(len(lons), numpy.uint64)
+        self.__lookups += len(lons)
+        if not self.__levels:
+            return results
+        finest_level = self.__levels[0]
+        codes, pending = encode_array(
+            lons, numpy.asarray(lats, dtype=numpy.float64).ravel(),
+            finest_level, exact=self.exact)
+        sorted_codes = self.__get_sorted_codes(numpy)
+        for level in self.__levels:
+            self.__probes += int(numpy.count_nonzero(pending))
+            level_codes = codes // 10 ** (
+                _CODE_LENGTHS[finest_level] - _CODE_LENGTHS[level])
+            keys = sorted_codes[level]
+            positions = numpy.minimum(
+                numpy.searchsorted(keys, level_codes), len(keys) - 1)
+            found = pending & (keys[positions] == level_codes)
+            results[found] = (
+                level_codes[found].astype(numpy.uint64) +
+                numpy.uint64(level * _PACKED_LEVEL_UNIT))
+            pending &= ~found
+        self.__matches += int(numpy.count_nonzero(results))
+        return results
+
+    def __getitem__(self, item):
+        return self.__values[_item_packed_code(item)]
+
+
+def _clipped_ring_indexes(row, column, distance, index_range):
+    """Yields (row, column) indexes of the square ring at the Chebyshev
+    distance around (row, column) in the range.
+
+    :param index_range: [min row, max row, min column, max column].
+    """
+    min_row, max_row, min_column, max_column = index_range
+    first_column = max(column - distance, min_column)
+    last_column = min(column + distance, max_column)
+    ring_rows = (row - distance, row + distance) if distance else (row,)
+    for ring_row in ring_rows:
+        if min_row <= ring_row <= max_row:
+            for ring_column in range(first_column, last_column + 1):
+                yield ring_row, ring_column
+    if not distance:
+        return
+    first_row = max(row - distance + 1, min_row)
+    last_row = min(row + distance - 1, max_row)
+    for ring_column in (column - distance, column + distance):
+        if min_column <= ring_column <= max_column:
+            for ring_row in range(first_row, last_row + 1):
+                yield ring_row, ring_column
+
+
+# Mean radius of the earth in meters.
+_EARTH_RADIUS = 6371008.8
+_METERS_PER_DEGREE = math.radians(1.0) * _EARTH_RADIUS
+
+
+class MeshNearestIndex(object):
+    """Index of meshes to search the nearest meshes of points
+    by the distances to the mesh centers.
+
+    The meshes are bucketed by the meshes of a coarse level (2nd meshes
+    by default), and the buckets are searched in square rings around the
+    point until no closer meshes can be found. Distances are in meters
+    on the equirectangular projection at the latitude of the point.
+
+    >>> index = MeshNearestIndex(['53393526', '53393599', '5339-46-00'])
+    >>> unpack_mesh_code(index.nearest(139.71, 35.61)[0])
+    '53393526'
+    """
+
+    def __init__(self, items=(), bucket_level=2):
+        """Initialize.
+        :param items: An iterable of meshes, mesh codes or packed codes,
+            which may be of mixed levels.
+        :param bucket_level: The mesh level number or the mesh class
+            of the buckets.
+        """
+        self.bucket_level = _mesh_level(bucket_level)
+        lon_size, lat_size = _MESH_SIZES[self.bucket_level]
+        self.__bucket_size = (
+            float(lon_size) / _MILLISECONDS_PER_DEGREE,
+            float(lat_size) / _MILLISECONDS_PER_DEGREE)
+        self.__buckets = {}
+        self.__bucket_range = None
+        self.__count = 0
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return self.__count
+
+    def __bucket(self, lon, lat):
+        """Returns the (row, column) of the bucket of the point.
+        """
+        return (int(lat // self.__bucket_size[1]),
+                int((lon - 100.0) // self.__bucket_size[0]))
+
+    def add(self, item):
+        """Add a mesh.
+
+        :param item: A mesh, a mesh code or a packed code.
+        """
+        level, code = _item_code_int(item)
+        west, south = _south_west_millisecond(level, code)
+        lon_size, lat_size = _MESH_SIZES[level]
+        lon = (west + lon_size / 2.0) / _MILLISECONDS_PER_DEGREE
+        lat = (south + lat_size / 2.0) / _MILLISECONDS_PER_DEGREE
+        row, column = self.__bucket(lon, lat)
+        self.__buckets.setdefault((row, column), []).append(
+            (lon, lat, level * _PACKED_LEVEL_UNIT + code))
+        self.__count += 1
+        if self.__bucket_range is None:
+            self.__bucket_range = [row, row, column, column]
+        else:
+            bucket_range = self.__bucket_range
+            bucket_range[0] = min(bucket_range[0], row)
+            bucket_range[1] = max(bucket_range[1], row)
+            bucket_range[2] = min(bucket_range[2], column)
+            bucket_range[3] = max(bucket_range[3], column)
+
+    def __distance_range(self, origin):
+        """Returns the range of the Chebyshev distances from the bucket
+        to the buckets in the bucket range.
+        """
+        row, column = origin
+        min_row, max_row, min_column, max_column = self.__bucket_range
+        return range(
+            max(min_row - row, row - max_row, min_column - column,
+                column - max_column, 0),
+            max(row - min_row, max_row - row, column - min_column,
+                max_column - column) + 1)
+
+    def __ring_candidates(self, lon, lat, origin, distance):
+        """Yields (distance in meters, packed code) of the meshes
+        in the buckets of the square ring at the Chebyshev distance
+        around the bucket.
+        """
+        lon_scale = math.cos(math.radians(lat))
+        for key in _clipped_ring_indexes(
+                origin[0], origin[1], distance, self.__bucket_range):
+            for center_lon, center_lat, packed_code in self.__buckets.get(
+                    key, ()):
+                yield math.hypot(
+                    (center_lon - lon) * lon_scale,
+                    center_lat - lat) * _METERS_PER_DEGREE, packed_code
+
+    def k_nearest(self, lon, lat, k):
+        """Returns (packed code, distance in meters) of the k nearest
+        meshes from the point, in the order of the distances.
+
+        :param lon: A longitude in degrees.
+        :param lat: A latitude in degrees.
+        :param k: The number of the meshes.
+        """
+        if k < 1:
+            raise ValueError('Invalid number of meshes: {0}'.format(k))
+        if not self.__count:
+            return []
+        lon = float(lon)
+        lat = float(lat)
+        min_bucket_size = _METERS_PER_DEGREE * min(
+            self.__bucket_size[0] * math.cos(math.radians(lat)),
+            self.__bucket_size[1])
+        origin = self.__bucket(lon, lat)
+        candidates = []
+        for distance in self.__distance_range(origin):
+            candidates.extend(
+                self.__ring_candidates(lon, lat, origin, distance))
+            if len(candidates) > k:
+                candidates.sort()
+                del candidates[k:]
+            # Meshes in the next rings are farther than this bound.
+            if (len(candidates) == k and
+                    max(candidates)[0] <= distance * min_bucket_size):
+                break
+        candidates.sort()
+        return [(packed_code, distance) for distance, packed_code
+                in candidates[:k]]
+
+    def nearest(self, lon, lat):
+        """Returns (packed code, distance in meters) of the nearest mesh
+        from the point, or None if the index is empty.
+
+        :param lon: A longitude in degrees.
+        :param lat: A latitude in degrees.
+        """
+        results = self.k_nearest(lon, lat, 1)
+        return results[0] if results else None
+
+    def k_nearest_array(self, lons, lats, k=1):
+        """Returns the k nearest meshes of the points. Requires NumPy.
+
+        :param lons: Longitudes in degrees.
+        :param lats: Latitudes in degrees.
+        :param k: The number of the meshes.
+        :return: A tuple of a uint64 packed code array and a float distance
+            array of (the number of the points, k), where the missing
+            meshes are 0 and infinity.
+        """
+        numpy = _import_numpy()
+        lons = numpy.asarray(lons, dtype=numpy.float64).ravel()
+        lats = numpy.asarray(lats, dtype=numpy.float64).ravel()
+        packed_codes = numpy.zeros((len(lons), k), numpy.uint64)
+        distances = numpy.full((len(lons), k), numpy.inf)
+        for index, (lon, lat) in enumerate(zip(lons.tolist(), lats.tolist())):
+            for rank, (packed_code, distance) in enumerate(
+                    self.k_nearest(lon, lat, k)):
+                packed_codes[index, rank] = packed_code
+                distances[index, rank] = distance
+        return packed_codes, distances
+
+
+class MeshPolygon(collections.namedtuple(
+        'MeshPolygon', ['code', 'bounds', 'values'])):
+    """A rectangle polygon of meshes, made by iter_mesh_polygons().
+
+    - code: The mesh code, or None for the dissolved meshes.
+    - bounds: (west, south, east, north) in degrees.
+    - values: A tuple of the property values.
+    """
+    __slots__ = ()
+
+    @property
+    def wkt(self):
+        """Returns the polygon in WKT.
+        """
+        west, south, east, north = self.bounds
+        return 'POLYGON (({0!r} {1!r}, {2!r} {1!r}, {2!r} {3!r}, ' \
+            '{0!r} {3!r}, {0!r} {1!r}))'.format(west, south, east, north)
+
+    @property
+    def geojson(self):
+        """Returns the polygon geometry in GeoJSON text.
+        """
+        west, south, east, north = self.bounds
+        return '{{"type": "Polygon", "coordinates": [[[{0!r}, {1!r}], ' \
+            '[{2!r}, {1!r}], [{2!r}, {3!r}], [{0!r}, {3!r}], ' \
+            '[{0!r}, {1!r}]]]}}'.format(west, south, east, north)
+
+    @property
+    def coordinates(self):
+        """Returns the counterclockwise polygon coordinates in GeoJSON.
+        """
+        west, south, east, north = self.bounds
+        return [[[west, south], [east, south], [east, north],
+                 [west, north], [west, south]]]
+
+
+def _column_pairs(columns):
+    """Returns a list of (name, values) pairs of the property columns.
+
+    :param columns: A mapping or (name, values) pairs.
+    """
+    if hasattr(columns, 'items'):
+        columns = columns.items()
+    return list(columns)
+
+
+def _iter_mesh_records(items, columns):
+    """Yields (level, row, column, values, code) of the meshes.
+    """
+    value_columns = [values for _, values in columns]
+    for row in zip(items, *value_columns):
+        level, code = _item_code_int(row[0])
+        mesh_row, mesh_column = _code_to_index(level, code)
+        yield (level, mesh_row, mesh_column, tuple(row[1:]),
+               _CODE_FORMATS[level].format(code))
+
+
+def _closed_rectangle(key, rectangle):
+    """Returns (level, min row, min column, max row, max column, values)
+    of the rectangle.
+    """
+    level, min_column, max_column, values = key
+    return level, rectangle[0], min_column, rectangle[1], max_column, values
+
+
+def _merge_row_runs(rectangles, row_key, row_runs):
+    """Merges the runs of meshes in a row into the rectangles.
+
+    :param rectangles: {(level, min column, max column, values):
+        [min row, max row]} of the rectangles.
+    :param row_key: (level, row) of the runs.
+    :param row_runs: [min column, max column, values] of the runs.
+    :return: A tuple of the list of the closed rectangles
+        and the rectangles reaching the row.
+    """
+    closed = []
+    next_rectangles = {}
+    for min_column, max_column, values in row_runs:
+        level, row = row_key
+        key = (level, min_column, max_column, values)
+        rectangle = rectangles.pop(key, None)
+        if rectangle is not None and rectangle[1] != row:
+            closed.append(_closed_rectangle(key, rectangle))
+            rectangle = None
+        if key in next_rectangles:
+            closed.append(_closed_rectangle(key, next_rectangles[key]))
+        next_rectangles[key] = [
+            row if rectangle is None else rectangle[0], row + 1]
+    closed.extend(_closed_rectangle(key, rectangle)
+                  for key, rectangle in rectangles.items())
+    return closed, next_rectangles
+
+
+def _iter_dissolved_rectangles(records):
+    """Yields (level, min row, min column, max row, max column, values)
+    of the rectangles of adjacent meshes with the same values,
+    where the max indexes are exclusive.
+
+    Runs of consecutive meshes in a row are merged, and then the same runs
+    in consecutive rows are merged, which keeps only the rectangles
+    reaching the last row.
+    """
+    rectangles = {}
+    row_key = None
+    row_runs = []
+    for level, row, column, values, _ in records:
+        if (level, row) == row_key:
+            run = row_runs[-1]
+            if column == run[1] and values == run[2]:
+                run[1] += 1
+                continue
+        else:
+            closed, rectangles = _merge_row_runs(
+                rectangles, row_key, row_runs)
+            for rectangle in closed:
+                yield rectangle
+            row_key = (level, row)
+            row_runs = []
+        row_runs.append([column, column + 1, values])
+    closed, rectangles = _merge_row_runs(rectangles, row_key, row_runs)
+    closed.extend(_closed_rectangle(key, rectangle)
+                  for key, rectangle in rectangles.items())
+    for rectangle in closed:
+        yield rectangle
+
+
+def _rectangle_bounds(level, min_row, min_column, max_row, max_column):
+    """Returns (west, south, east, north) in degrees of the rectangle
+    of the global indexes, where the max indexes are exclusive.
+    """
+    lon_size, lat_size = _MESH_SIZES[level]
+    origin = 100 * _MESH_SIZES[1][0]
+    return (
+        (origin + min_column * lon_size) / float(_MILLISECONDS_PER_DEGREE),
+        min_row * lat_size / float(_MILLISECONDS_PER_DEGREE),
+        (origin + max_column * lon_size) / float(_MILLISECONDS_PER_DEGREE),
+        max_row * lat_size / float(_MILLISECONDS_PER_DEGREE))
+
+
+def iter_mesh_polygons(items, columns=(), dissolve=False):
+    """Yields the polygons of the meshes (see MeshPolygon),
+    calculated from the codes without creating any mesh instances.
+
+    The items and the columns are read lazily. When dissolving,
+    adjacent meshes of the same level and values are merged into rectangles,
+    keeping only the rectangles of a row of meshes. The meshes are best given
+    row by row from the south and from the west in each row,
+    as iter_bbox_codes() yields, or fewer meshes are merged.
+
+    :param items: An iterable of meshes, mesh codes or packed codes.
+    :param columns: A mapping or (name, values) pairs of the property columns,
+        where the values are iterables in the order of the items.
+    :param dissolve: Merges adjacent meshes with the same values if True.
+        The values must be hashable.
+
+    >>> [polygon.wkt for polygon in iter_mesh_polygons(
+    ...     ['5339-35-26', '5339-35-27'], dissolve=True)]
+    ['POLYGON ((139.7 35.6, 139.725 35.6, 139.725 35.608333333333334, \
+139.7 35.608333333333334, 139.7 35.6))']
+    """
+    records = _iter_mesh_records(items, _column_pairs(columns))
+    if not dissolve:
+        for level, row, column, values, code in records:
+            yield MeshPolygon(
+                code=code,
+                bounds=_rectangle_bounds(
+                    level, row, column, row + 1, column + 1),
+                values=values)
+        return
+    for level, min_row, min_column, max_row, max_column, values \
+            in _iter_dissolved_rectangles(records):
+        yield MeshPolygon(
+            code=None,
+            bounds=_rectangle_bounds(
+                level, min_row, min_column, max_row, max_column),
+            values=values)
+
+
+def write_geojson(stream, items, columns=(), dissolve=False, seq=False):
+    """Writes the polygons of the meshes as GeoJSON features
+    with the properties of the mesh code ('code') and the columns.
+    The mesh codes are omitted when dissolving.
+
+    :param stream: A text stream to write.
+    :param items: An iterable of meshes, mesh codes or packed codes.
+    :param columns: A mapping or (name, values) pairs of the property columns.
+    :param dissolve: Merges adjacent meshes with the same values if True.
+        See iter_mesh_polygons().
+    :param seq: Writes a feature per line (GeoJSON Text Sequences
+        without the record separators) instead of a feature collection.
+    :return: The number of the features.
+    """
+    columns = _column_pairs(columns)
+    names = [name for name, _ in columns]
+    if not seq:
+        stream.write('{"type": "FeatureCollection", "features": [\n')
+    count = 0
+    for polygon in iter_mesh_polygons(items, columns, dissolve):
+        properties = collections.OrderedDict(
+            [] if dissolve else [('code', polygon.code)])
+        properties.update(zip(names, polygon.values))
+        if count and not seq:
+            stream.write(',\n')
+        stream.write(
+            '{{"type": "Feature", "geometry": {0}, "properties": {1}}}'.format(
+                polygon.geojson, json.dumps(properties)))
+        if seq:
+            stream.write('\n')
+        count += 1
+    if not seq:
+        stream.write('\n]}\n')
+    return count
+
+
+def write_wkt(stream, items, columns=(), dissolve=False, delimiter=','):
+    """Writes the polygons of the meshes in WKT as delimited text
+    with a header of the mesh code ('code'), the columns and 'wkt'.
+    The mesh codes are omitted when dissolving.
+
+    :param stream: A text stream to write.
+    :param items: An iterable of meshes, mesh codes or packed codes.
+    :param columns: A mapping or (name, values) pairs of the property columns.
+    :param dissolve: Merges adjacent meshes with the same values if True.
+        See iter_mesh_polygons().
+    :param delimiter: The delimiter of the columns.
+    :return: The number of the polygons.
+    """
+    columns = _column_pairs(columns)
+    writer = csv.writer(stream, delimiter=delimiter, lineterminator='\n')
+    writer.writerow(
+        ([] if dissolve else ['code']) + [name for name, _ in columns] +
+        ['wkt'])
+    count = 0
+    for polygon in iter_mesh_polygons(items, columns, dissolve):
+        writer.writerow(
+            ([] if dissolve else [polygon.code]) + list(polygon.values) +
+            [polygon.wkt])
+        count += 1
+    return count
+
+
+def _map_ordered(func, tasks, workers):
+    """Yields the results of the function for the tasks in the order,
+    running in the worker processes if `workers` is more than 1.
+
+    At most twice as many tasks as the workers are submitted at once,
+    so that the memory usage is bounded for long task iterables.
+
+    :param func: A picklable function which takes a task.
+    :param tasks: An iterable of picklable tasks.
+    :param workers: The number of the worker processes.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(pool.apply_async(func, (task,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _encode_packed_chunk(task):
+    """Returns the packed mesh codes of the coordinates in an array
+    (see _uint64_array), where 0 is for invalid coordinates.
+
+    :param task: A tuple of longitudes, latitudes, the mesh level number
+        and whether to calculate with integer milliseconds.
+    """
+    lons, lats, level, exact = task
+    unit = level * _PACKED_LEVEL_UNIT
+    if hasattr(lons, 'dtype'):
+        codes, valid = encode_array(lons, lats, level, exact=exact)
+        return _uint64_array(
+            (codes + unit * valid).astype('uint64').tolist())
+
+    packed_codes = _uint64_array()
+    for lon, lat in zip(lons, lats):
+        try:
+            packed_codes.append(
+                unit + encode(lon, lat, level, as_int=True, exact=exact))
+        except (TypeError, ValueError, OverflowError):
+            packed_codes.append(0)
+    return packed_codes
+
+
+def encode_parallel(lons, lats, level, workers=None, chunk_size=100000, # pylint: disable=R0913
+                    exact=False):
+    """Returns the packed mesh codes for many coordinates,
+    encoded in multiple processes.
+
+    The coordinates are split into chunks of rows, and the worker processes
+    send back only the packed codes. The order of the results is the same
+    as the coordinates.
+
+    :param lons: A sequence of longitudes in degrees, such as a list,
+        an array('d') or a NumPy array.
+    :param lats: A sequence of latitudes in degrees.
+    :param level: A mesh level number (1 to 6) or a mesh class.
+    :param workers: The number of the worker processes.
+        The number of CPUs if None.
+    :param chunk_size: The number of coordinates sent to a worker at once.
+    :param exact: Calculate with integer milliseconds if True.
+    :return: An array('Q') (array('L') on Python 2.7) of packed mesh codes
+        (see pack_mesh_code), where 0 is for invalid coordinates.
+    """
+    mesh_level = _mesh_level(level)
+    if len(lons) != len(lats):
+        raise ValueError('Longitudes and latitudes differ in length.')
+    if chunk_size < 1:
+        raise ValueError('Invalid chunk size: {0}'.format(chunk_size))
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    tasks = (
+        (lons[begin:begin + chunk_size], lats[begin:begin + chunk_size],
+         mesh_level, exact)
+        for begin in range(0, len(lons), chunk_size))
+    packed_codes = _uint64_array()
+    for chunk_codes in _map_ordered(_encode_packed_chunk, tasks, workers):
+        packed_codes.extend(chunk_codes)
+    return packed_codes
+
+
+class MeshStatistics(collections.namedtuple(
+        'MeshStatistics',
+        ['code', 'count', 'sum', 'min', 'max', 'mean', 'mesh'])):
+    """Statistics of the values in a mesh aggregated by MeshAggregator.
+
+    - code: The mesh code.
+    - count: The number of the values.
+    - sum: The sum of the values.
+    - min: The minimum value.
+    - max: The maximum value.
+    - mean: The mean of the values.
+    - mesh: The mesh instance, or None if the geometries are not required.
+    """
+    __slots__ = ()
+
+
+class MeshStatisticsArrays(collections.namedtuple(
+        'MeshStatisticsArrays',
+        ['packed_code', 'count', 'sum', 'min', 'max'])):
+    """Statistics of the meshes in typed arrays, aligned by the index.
+
+    - packed_code: The packed mesh codes in an array('Q')
+      (array('L') on Python 2.7).
+    - count: The numbers of the values in an array of the same type.
+    - sum: The sums of the values in an array('d').
+    - min: The minimum values in an array('d').
+    - max: The maximum values in an array('d').
+    """
+    __slots__ = ()
+
+
+class MeshAggregator(object): # pylint: disable=R0902
+    """Aggregates values of points into the meshes of a level,
+    keeping the count, the sum, the minimum and the maximum of each mesh.
+
+    Points are keyed by the integer mesh codes without creating
+    any mesh instances, and the statistics are kept in typed arrays,
+    so that the memory usage depends only on the number of the meshes.
+    Aggregators are picklable and can be merged, so that partial results
+    can be made in multiple processes.
+
+    >>> aggregator = MeshAggregator(ThirdMesh)
+    >>> aggregator.update([(139.7, 35.6, 2.0), (139.7001, 35.6001, 4.0)])
+    >>> [(stat.code, stat.count, stat.mean) for stat in aggregator]
+    [('53393526', 2, 3.0)]
+    """
+
+    def __init__(self, level, exact=False):
+        """Initialize.
+        :param level: A mesh level number (1 to 6) or a mesh class.
+        :param exact: Calculate with integer milliseconds if True.
+        """
+        self.level = _mesh_level(level)
+        self.exact = exact
+        self.invalid = 0
+        self.__indices = {}
+        self.__codes = _uint64_array()
+        self.__counts = _uint64_array()
+        self.__sums = array.array('d')
+        self.__mins = array.array('d')
+        self.__maxs = array.array('d')
+
+    def __len__(self):
+        return len(self.__codes)
+
+    def __iter__(self):
+        return self.statistics()
+
+    def __accumulate(self, code, count, total, minimum, maximum): # pylint: disable=R0913
+        """Accumulate the statistics of values into the mesh.
+        """
+        index = self.__indices.get(code)
+        if index is None:
+            self.__indices[code] = len(self.__codes)
+            self.__codes.append(code)
+            self.__counts.append(count)
+            self.__sums.append(total)
+            self.__mins.append(minimum)
+            self.__maxs.append(maximum)
+            return
+        self.__counts[index] += count
+        self.__sums[index] += total
+        if minimum < self.__mins[index]:
+            self.__mins[index] = minimum
+        if maximum > self.__maxs[index]:
+            self.__maxs[index] = maximum
+
+    def __rows(self):
+        """Returns the iterator of (code, count, sum, min, max) of the meshes.
+        """
+        return zip(self.__codes, self.__counts, self.__sums,
+                   self.__mins, self.__maxs)
+
+    def add(self, lon, lat, value=1.0):
+        """Add the value of a point, and returns whether the point is valid.
+        Invalid points are counted in `invalid` and ignored.
+
+        :param lon: A longitude in degrees.
+        :param lat: A latitude in degrees.
+        :param value: A numeric value.
+        """
+        try:
+            code = _encode_degree(lon, lat, self.level, self.exact)
+        except (TypeError, ValueError, OverflowError):
+            self.invalid += 1
+            return False
+        value = float(value)
+        self.__accumulate(code, 1, value, value, value)
+        return True
+
+    def update(self, points):
+        """Add the values of points.
+
+        :param points: An iterable of (lon, lat, value) or (lon, lat),
+            where the value is 1 if omitted.
+        """
+        for point in points:
+            self.add(*point)
+
+    def add_array(self, lons, lats, values=None):
+        """Add the values of points in arrays in a vectorized way.
+        Requires NumPy.
+
+        :param lons: Longitudes in degrees.
+        :param lats: Latitudes in degrees.
+        :param values: Numeric values, which are 1 if None.
+        """
+        numpy = _import_numpy()
+        codes, valid = encode_array(
+            numpy.ravel(lons), numpy.ravel(lats), self.level,
+            exact=self.exact)
+        if values is None:
+            values = numpy.ones(len(codes))
+        values = numpy.asarray(values, dtype=numpy.float64).ravel()[valid]
+        self.invalid += int(len(codes) - numpy.count_nonzero(valid))
+        unique_codes, inverse = numpy.unique(
+            codes[valid], return_inverse=True)
+        size = len(unique_codes)
+        counts = numpy.bincount(inverse, minlength=size)
+        sums = numpy.bincount(inverse, weights=values, minlength=size)
+        mins = numpy.full(size, numpy.inf)
+        maxs = numpy.full(size, -numpy.inf)
+        numpy.minimum.at(mins, inverse, values)
+        numpy.maximum.at(maxs, inverse, values)
+        for row in zip(unique_codes.tolist(), counts.tolist(), sums.tolist(),
+                       mins.tolist(), maxs.tolist()):
+            self.__accumulate(*row)
+
+    def merge(self, that):
+        """Merge the statistics of another aggregator of the same level,
+        and returns this aggregator.
+
+        :param that: A MeshAggregator.
+        """
+        if that.level != self.level:
+            raise ValueError('Mesh levels differ: {0} and {1}'.format(
+                self.level, that.level))
+        # pylint: disable=W0212
+        for row in that.__rows():
+            self.__accumulate(*row)
+        self.invalid += that.invalid
+        return self
+
+    def roll_up(self, level=1):
+        """Returns the aggregators of all the coarser levels down to
+        the given level, in a dictionary keyed by the level numbers.
+
+        The parent codes are derived arithmetically from the integer codes,
+        and each level is aggregated from the meshes of the next finer
+        level, so that the time and the memory depend only on the number
+        of the meshes.
+
+        :param level: The coarsest mesh level number or mesh class.
+        """
+        coarsest_level = _mesh_level(level)
+        if coarsest_level > self.level:
+            raise ValueError('Mesh level {0} is finer than {1}'.format(
+                coarsest_level, self.level))
+        aggregators = {}
+        child = self
+        for parent_level in range(self.level - 1, coarsest_level - 1, -1):
+            parent = MeshAggregator(parent_level, exact=self.exact)
+            parent.invalid = self.invalid
+            divisor = _PARENT_DIVISORS[parent_level + 1]
+            # pylint: disable=W0212
+            for code, count, total, minimum, maximum in child.__rows():
+                parent.__accumulate(
+                    code // divisor, count, total, minimum, maximum)
+            aggregators[parent_level] = parent
+            child = parent
+        return aggregators
+
+    def statistics(self, geometry=False):
+        """Yields the MeshStatistics of the meshes in the order of the codes.
+
+        :param geometry: Attach the mesh instances if True.
+        """
+        code_format = _CODE_FORMATS[self.level]
+        for code, index in sorted(self.__indices.items()):
+            count = self.__counts[index]
+            total = self.__sums[index]
+            yield MeshStatistics(
+                code=code_format.format(code), count=count, sum=total,
+                min=self.__mins[index], max=self.__maxs[index],
+                mean=total / count,
+                mesh=_create_mesh(self.level, code) if geometry else None)
+
+    def to_arrays(self):
+        """Returns the MeshStatisticsArrays of the meshes
+        in the order of addition.
+        """
+        unit = self.level * _PACKED_LEVEL_UNIT
+        return MeshStatisticsArrays(
+            packed_code=_uint64_array(unit + code for code in self.__codes),
+            count=_uint64_array(self.__counts),
+            sum=array.array('d', self.__sums),
+            min=array.array('d', self.__mins),
+            max=array.array('d', self.__maxs))
+
+
+# Delimiters of the delimited text formats for the command line interface.
+_DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+
+def _encode_row_values(values, level, exact):
+    """Returns the mesh code for the longitude and latitude values of a row,
+    or an empty string if invalid.
+
+    :param values: A pair of a longitude and a latitude in degrees,
+        which may be strings.
+    :param level: A mesh level number.
+    :param exact: Calculate with integer milliseconds if True.
+    """
+    try:
+        return encode(values[0], values[1], level, exact=exact)
+    except (TypeError, ValueError, OverflowError):
+        return ''
+
+
+def _encode_delimited_chunk(task):
+    """Returns the mesh codes for the delimited text rows.
+
+    :param task: A tuple of the rows, the longitude column index,
+        the latitude column index, the mesh level number and
+        whether to calculate with integer milliseconds.
+    """
+    rows, lon_index, lat_index, level, exact = task
+    min_length = max(lon_index, lat_index) + 1
+    return [
+        _encode_row_values((row[lon_index], row[lat_index]), level, exact)
+        if len(row) >= min_length else '' for row in rows]
+
+
+def _encode_jsonl_chunk(task):
+    """Returns the JSON lines with the mesh codes added,
+    and the number of the invalid lines.
+
+    :param task: A tuple of the JSON lines, the longitude key,
+        the latitude key, the mesh code key to add, the mesh level number
+        and whether to calculate with integer milliseconds.
+    """
+    lines, lon_key, lat_key, code_key, level, exact = task
+    results = []
+    invalid_rows = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError('Not a JSON object: {0}'.format(line.strip()))
+        code = _encode_row_values(
+            (record.get(lon_key), record.get(lat_key)), level, exact)
+        invalid_rows += not code
+        record[code_key] = code
+        results.append(json.dumps(record) + '\n')
+    return results, invalid_rows
+
+
+def _chunks(iterable, chunk_size):
+    """Yields lists of at most `chunk_size` items of the iterable.
+
+    :param iterable: An iterable.
+    :param chunk_size: The maximum number of items in a chunk.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _encode_stream(args, input_file, output_file):
+    """Encode the input stream to the output stream chunk by chunk,
+    and returns the number of the rows and the invalid rows.
+
+    :param args: The parsed command line arguments.
+    :param input_file: The input text file.
+    :param output_file: The output text file.
+    """
+    if args.format == 'jsonl':
+        return _encode_jsonl_stream(args, input_file, output_file)
+    return _encode_delimited_stream(args, input_file, output_file)
+
+
+def _encode_jsonl_stream(args, input_file, output_file):
+    """Encode the input JSON lines to the output stream chunk by chunk,
+    and returns the number of the rows and the invalid rows.
+
+    :param args: The parsed command line arguments.
+    :param input_file: The input text file.
+    :param output_file: The output text file.
+    """
+    rows = 0
+    invalid_rows = 0
+    tasks = (
+        (chunk, args.lon, args.lat, args.code_column, args.level, args.exact)
+        for chunk in _chunks(input_file, args.chunk_size))
+    for lines, chunk_invalid_rows in _map_ordered(
+            _encode_jsonl_chunk, tasks, args.workers):
+        output_file.writelines(lines)
+        rows += len(lines)
+        invalid_rows += chunk_invalid_rows
+    return rows, invalid_rows
+
+
+def _delimited_chunk_tasks(args, chunks, lon_index, lat_index):
+    """Returns the chunks of the rows and the tasks to encode them
+    (see _encode_delimited_chunk).
+
+    :param args: The parsed command line arguments.
+    :param chunks: An iterable of the chunks of the rows.
+    :param lon_index: The longitude column index.
+    :param lat_index: The latitude column index.
+    """
+    chunks, task_chunks = itertools.tee(chunks)
+    if args.workers > 1:
+        # Keep the rows in this process and send only the coordinates.
+        return chunks, (
+            ([[row[lon_index] if len(row) > lon_index else '',
+               row[lat_index] if len(row) > lat_index else '']
+              for row in chunk], 0, 1, args.level, args.exact)
+            for chunk in task_chunks)
+    return chunks, (
+        (chunk, lon_index, lat_index, args.level, args.exact)
+        for chunk in task_chunks)
+
+
+def _encode_delimited_stream(args, input_file, output_file):
+    """Encode the input delimited text to the output stream chunk by chunk,
+    and returns the number of the rows and the invalid rows.
+
+    :param args: The parsed command line arguments.
+    :param input_file: The input text file.
+    :param output_file: The output text file.
+    """
+    rows = 0
+    invalid_rows = 0
+    reader = csv.reader(input_file, delimiter=_DELIMITERS[args.format])
+    writer = csv.writer(
+        output_file, delimiter=_DELIMITERS[args.format],
+        lineterminator='\n')
+    header = next(reader, None)
+    if header is None:
+        return rows, invalid_rows
+    for column in (args.lon, args.lat):
+        if column not in header:
+            raise ValueError('Column not found: {0}'.format(column))
+    writer.writerow(header + [args.code_column])
+    lon_index = header.index(args.lon)
+    lat_index = header.index(args.lat)
+    chunks, tasks = _delimited_chunk_tasks(
+        args, _chunks(reader, args.chunk_size), lon_index, lat_index)
+    for chunk, codes in zip(chunks, _map_ordered(
+            _encode_delimited_chunk, tasks, args.workers)):
+        writer.writerows(row + [code] for row, code in zip(chunk, codes))
+        rows += len(codes)
+        invalid_rows += codes.count('')
+    return rows, invalid_rows
+
+
+def _parse_args(argv):
+    """Parse the command line arguments.
+
+    :param argv: The command line arguments without the program name.
+    """
+    parser = argparse.ArgumentParser(
+        prog='jpmesh',
+        description=(
+            'Append mesh codes to CSV, TSV or JSON lines rows '
+            'with longitudes and latitudes in degrees.'))
+    parser.add_argument(
+        'input', nargs='?', default='-',
+        help='The input file (default: the standard input).')
+    parser.add_argument(
+        '-o', '--output', default='-',
+        help='The output file (default: the standard output).')
+    parser.add_argument(
+        '-f', '--format', choices=['csv', 'tsv', 'jsonl'],
+        help='The input and output format '
+        '(default: guessed from the input file extension, or csv).')
+    parser.add_argument(
+        '-l', '--level', type=int, default=3,
+        choices=range(1, len(MESH_CLASSES) + 1),
+        help='The mesh level: 1 for 1st meshes to 6 for 1/8 meshes '
+        '(default: 3).')
+    parser.add_argument(
+        '--lon', default='lon',
+        help='The longitude column name (default: lon).')
+    parser.add_argument(
+        '--lat', default='lat',
+        help='The latitude column name (default: lat).')
+    parser.add_argument(
+        '--code-column', default='mesh_code',
+        help='The mesh code column name to append (default: mesh_code).')
+    parser.add_argument(
+        '--exact', action='store_true',
+        help='Calculate with integer milliseconds.')
+    parser.add_argument(
+        '--chunk-size', type=int, default=10000,
+        help='The number of rows processed and written at once '
+        '(default: 10000).')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help='The number of the worker processes (default: 1).')
+    parser.add_argument(
+        '-q', '--quiet', action='store_true',
+        help='Do not report the throughput.')
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error('Invalid chunk size: {0}'.format(args.chunk_size))
+    if args.workers < 1:
+        parser.error('Invalid number of workers: {0}'.format(args.workers))
+    if args.format is None:
+        extension = os.path.splitext(args.input)[1].lstrip('.').lower()
+        args.format = extension if extension in ('tsv', 'jsonl') else 'csv'
+    return args
+
+
+def _open_text(path, mode, default):
+    """Open the text file, or returns the default stream for '-'.
+
+    :param path: The file path or '-'.
+    :param mode: 'r' or 'w'.
+    :param default: The default stream.
+    """
+    if path == '-':
+        return default
+    if sys.version_info[0] < 3:
+        # The csv module of Python 2 reads and writes byte strings.
+        return open(path, mode + 'b')
+    return io.open(path, mode, newline='')
+
+
+def main(argv=None):
+    """Run the command line interface, which appends mesh codes to rows
+    streamed from a file or the standard input.
+
+    :param argv: The command line arguments without the program name.
+    """
+    args = _parse_args(argv)
+    started_at = time.time()
+    input_file = _open_text(args.input, 'r', sys.stdin)
+    output_file = _open_text(args.output, 'w', sys.stdout)
+    try:
+        rows, invalid_rows = _encode_stream(args, input_file, output_file)
+    except ValueError as error:
+        sys.stderr.write('jpmesh: error: {0}\n'.format(error))
+        return 1
+    finally:
+        output_file.flush()
+        for opened_file, default in ((input_file, sys.stdin),
+                                     (output_file, sys.stdout)):
+            if opened_file is not default:
+                opened_file.close()
+    elapsed = time.time() - started_at
+    if not args.quiet:
+        sys.stderr.write(
+            'jpmesh: {0:d} rows ({1:d} invalid) in {2:.3f} s, '
+            '{3:.0f} rows/s\n'.format(
+                rows, invalid_rows, elapsed, rows / max(elapsed, 1e-9)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
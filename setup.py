@@ -27,6 +27,8 @@ setuptools.setup(
     author_email=jpmesh.__author_email__,
     url='https://github.com/ymoch/pyjpmesh',
     py_modules=['jpmesh'],
+    extras_require={'numpy': ['numpy']},
+    entry_points={'console_scripts': ['jpmesh = jpmesh:main']},
     test_suite='nose.collector',
     tests_require=['nose', 'mock'],
     classifiers=[
@@ -0,0 +1,167 @@
+"""
+Tests for the aggregation of jpmesh.
+"""
+
+import pickle
+import random
+import unittest
+
+from nose.tools import eq_, ok_, raises
+
+from jpmesh import MeshAggregator, QuarterMesh, ThirdMesh
+from jpmesh import encode, parse_mesh_code
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestMeshAggregator(unittest.TestCase):
+    """Tests for jpmesh.MeshAggregator.
+    """
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.points = [
+            (rand.uniform(139.6, 139.8), rand.uniform(35.5, 35.7),
+             rand.uniform(-10.0, 10.0))
+            for _ in range(500)]
+        self.points.append((99.0, 35.6, 1.0))
+
+    def _expected(self, level):
+        """Returns the statistics aggregated with a dictionary."""
+        values = {}
+        for lon, lat, value in self.points:
+            try:
+                values.setdefault(encode(lon, lat, level), []).append(value)
+            except ValueError:
+                pass
+        return [
+            (code, len(values[code]), sum(values[code]), min(values[code]),
+             max(values[code]))
+            for code in sorted(values)]
+
+    @staticmethod
+    def _stats(aggregator):
+        """Returns the statistics without the means and the meshes."""
+        return [
+            (stat.code, stat.count, stat.sum, stat.min, stat.max)
+            for stat in aggregator]
+
+    def _assert_stats(self, aggregator, level):
+        """Assert the statistics are the same as the expected ones."""
+        expected = self._expected(level)
+        actual = self._stats(aggregator)
+        eq_([row[:2] for row in actual], [row[:2] for row in expected])
+        for row, expected_row in zip(actual, expected):
+            for value, expected_value in zip(row[2:], expected_row[2:]):
+                self.assertAlmostEqual(value, expected_value)
+
+    def test_update(self):
+        """Aggregates the values per mesh.
+        """
+        aggregator = MeshAggregator(QuarterMesh)
+        aggregator.update(self.points)
+        self._assert_stats(aggregator, 5)
+        eq_(aggregator.invalid, 1)
+        eq_(len(aggregator), len(self._expected(5)))
+        for stat in aggregator:
+            self.assertAlmostEqual(stat.mean, stat.sum / stat.count)
+            eq_(stat.mesh, None)
+
+    def test_count(self):
+        """Counts points without values.
+        """
+        aggregator = MeshAggregator(1)
+        ok_(aggregator.add(139.7, 35.6))
+        ok_(not aggregator.add(139.7, 'x'))
+        aggregator.update([(139.8, 35.7)])
+        eq_(self._stats(aggregator), [('5339', 2, 2.0, 1.0, 1.0)])
+        eq_(aggregator.invalid, 1)
+
+    def test_merge(self):
+        """Merges partial results, also after pickling.
+        """
+        aggregator = MeshAggregator(ThirdMesh)
+        aggregator.update(self.points[:200])
+        partial = MeshAggregator(ThirdMesh)
+        partial.update(self.points[200:])
+        partial = pickle.loads(pickle.dumps(partial))
+        eq_(aggregator.merge(partial), aggregator)
+        self._assert_stats(aggregator, 3)
+        eq_(aggregator.invalid, 1)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_merge_different_level():
+        """Raises ValueError to merge aggregators of different levels.
+        """
+        MeshAggregator(3).merge(MeshAggregator(4))
+
+    def test_geometry(self):
+        """Attaches the meshes if required.
+        """
+        aggregator = MeshAggregator(ThirdMesh)
+        aggregator.update(self.points)
+        for stat in aggregator.statistics(geometry=True):
+            eq_(stat.mesh, parse_mesh_code(stat.code))
+
+    @staticmethod
+    def test_to_arrays():
+        """Returns the statistics in typed arrays with packed codes.
+        """
+        aggregator = MeshAggregator(ThirdMesh)
+        aggregator.add(139.7, 35.6, 2.0)
+        aggregator.add(139.8, 35.7, 3.0)
+        aggregator.add(139.7, 35.6, -1.0)
+        arrays = aggregator.to_arrays()
+        eq_(arrays.packed_code.tolist(), [300053393526, 300053394644])
+        eq_(arrays.count.tolist(), [2, 1])
+        eq_(arrays.sum.tolist(), [1.0, 3.0])
+        eq_(arrays.min.tolist(), [-1.0, 3.0])
+        eq_(arrays.max.tolist(), [2.0, 3.0])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_add_array(self):
+        """Aggregates the values in arrays in the same way.
+        """
+        lons, lats, values = (
+            numpy.array(column) for column in zip(*self.points))
+        aggregator = MeshAggregator(QuarterMesh)
+        aggregator.add_array(lons[:100], lats[:100], values[:100])
+        aggregator.add_array(lons[100:], lats[100:], values[100:])
+        self._assert_stats(aggregator, 5)
+        eq_(aggregator.invalid, 1)
+
+        counter = MeshAggregator(QuarterMesh)
+        counter.add_array(lons, lats)
+        eq_([stat.count for stat in counter],
+            [stat.count for stat in aggregator])
+
+    def test_roll_up(self):
+        """Rolls up the statistics to all the coarser levels.
+        """
+        aggregator = MeshAggregator(6)
+        aggregator.update(self.points)
+        aggregators = aggregator.roll_up()
+        eq_(sorted(aggregators), [1, 2, 3, 4, 5])
+        for level, rolled_up in aggregators.items():
+            eq_(rolled_up.level, level)
+            eq_(rolled_up.invalid, 1)
+            self._assert_stats(rolled_up, level)
+
+    def test_roll_up_to_level(self):
+        """Rolls up the statistics down to the given level.
+        """
+        aggregator = MeshAggregator(QuarterMesh)
+        aggregator.update(self.points)
+        eq_(sorted(aggregator.roll_up(ThirdMesh)), [3, 4])
+        eq_(aggregator.roll_up(QuarterMesh), {})
+
+    @staticmethod
+    @raises(ValueError)
+    def test_roll_up_finer_level():
+        """Raises ValueError to roll up to a finer level.
+        """
+        MeshAggregator(ThirdMesh).roll_up(4)
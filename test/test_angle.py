@@ -20,6 +20,9 @@ class TestAngle(unittest.TestCase):
         self.assertEqual(angle.minute, float(millisecond) / 60 / 1000)
         self.assertEqual(angle.second, float(millisecond) / 1000)
         self.assertEqual(angle.millisecond, float(millisecond))
+        self.assertEqual(angle.exact_millisecond, millisecond)
+        self.assertEqual(
+            Angle.from_degree(35.675).exact_millisecond, 128430000)
 
     def test_operators(self):
         """Test for operators.
@@ -0,0 +1,337 @@
+"""
+Tests for the array functions of jpmesh.
+"""
+
+import array
+import random
+import unittest
+
+from nose.tools import eq_, ok_, raises
+
+from jpmesh import MESH_CLASSES, SecondMesh
+from jpmesh import encode, encode_array, decode_array
+from jpmesh import parse_mesh_code
+from jpmesh import pack_mesh_codes, unpack_mesh_codes
+from jpmesh import encode_parallel
+from jpmesh import values_to_grid, iter_grid_values
+from jpmesh import ThirdMesh, HalfMesh, iter_bbox_codes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _random_coordinates(size):
+    """Returns random coordinates including ones out of the mesh range.
+    """
+    rand = random.Random(0)
+    lons = [rand.uniform(90.0, 210.0) for _ in range(size)]
+    lats = [rand.uniform(-5.0, 70.0) for _ in range(size)]
+    return lons, lats
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed.')
+class TestEncodeArray(unittest.TestCase):
+    """Tests for jpmesh.encode_array.
+    """
+
+    @staticmethod
+    def test_same_as_encode():
+        """Returns the same codes as encode() for each mesh class.
+        """
+        lons, lats = _random_coordinates(2000)
+        for mesh_class in MESH_CLASSES:
+            codes, valid = encode_array(lons, lats, mesh_class)
+            for lon, lat, code, is_valid in zip(lons, lats, codes, valid):
+                try:
+                    expected = encode(lon, lat, mesh_class, as_int=True)
+                except ValueError:
+                    expected = None
+                eq_(bool(is_valid), expected is not None)
+                eq_(int(code), expected or 0)
+
+    @staticmethod
+    def test_exact():
+        """Returns the same codes as encode() in the exact mode.
+        """
+        lons, lats = _random_coordinates(2000)
+        lons.append(128.0125)
+        lats.append(35.5)
+        for mesh_class in MESH_CLASSES:
+            codes, valid = encode_array(lons, lats, mesh_class, exact=True)
+            for lon, lat, code, is_valid in zip(lons, lats, codes, valid):
+                try:
+                    expected = encode(
+                        lon, lat, mesh_class, as_int=True, exact=True)
+                except ValueError:
+                    expected = None
+                eq_(bool(is_valid), expected is not None)
+                eq_(int(code), expected or 0)
+        codes, valid = encode_array(
+            [float('nan'), 1e300], [35.6, 35.6], 3, exact=True)
+        eq_(valid.tolist(), [False, False])
+
+    @staticmethod
+    def test_invalid_values():
+        """Reports NaN and infinite values as invalid.
+        """
+        codes, valid = encode_array(
+            [139.7, float('nan'), float('inf')], [35.6, 35.6, 35.6], 3)
+        eq_(codes.tolist(), [53393526, 0, 0])
+        eq_(valid.tolist(), [True, False, False])
+
+    @staticmethod
+    def test_memoryview():
+        """Accepts buffers of doubles.
+        """
+        lons = array.array('d', [139.7, 139.7])
+        lats = array.array('d', [35.6, 35.7])
+        codes, valid = encode_array(memoryview(lons), memoryview(lats), 1)
+        eq_(codes.tolist(), [5339, 5339])
+        eq_(valid.tolist(), [True, True])
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed.')
+class TestDecodeArray(unittest.TestCase):
+    """Tests for jpmesh.decode_array.
+    """
+
+    @staticmethod
+    def _codes():
+        """Returns valid mesh codes of every level.
+        """
+        lons, lats = _random_coordinates(300)
+        return [
+            encode(lon, lat, mesh_class)
+            for lon, lat in zip(lons, lats) if 122.0 < lon < 154.0
+            and 20.0 < lat < 46.0 for mesh_class in MESH_CLASSES]
+
+    def _test_geometry(self, codes, geometry):
+        """Test the geometry for the codes.
+        """
+        for index, code in enumerate(codes):
+            mesh = parse_mesh_code(str(code))
+            eq_(geometry.level[index], MESH_CLASSES.index(type(mesh)) + 1)
+            eq_(tuple(geometry.south_west[index]),
+                (mesh.south_west.lon.degree, mesh.south_west.lat.degree))
+            eq_(tuple(geometry.size[index]),
+                (mesh.size.lon.degree, mesh.size.lat.degree))
+            eq_(tuple(geometry.bounds[index]), (
+                mesh.south_west.lon.degree, mesh.south_west.lat.degree,
+                mesh.south_west.lon.degree + mesh.size.lon.degree,
+                mesh.south_west.lat.degree + mesh.size.lat.degree))
+        self.assertTrue(geometry.valid.all())
+        self.assertTrue(numpy.allclose(
+            geometry.center, geometry.south_west + geometry.size / 2.0))
+
+    def test_strings(self):
+        """Decodes code strings the same as parse_mesh_code().
+        """
+        codes = self._codes()
+        self._test_geometry(codes, decode_array(codes))
+        self._test_geometry(codes, decode_array(numpy.array(codes, 'S')))
+
+    def test_integers(self):
+        """Decodes integer codes the same as parse_mesh_code().
+        """
+        codes = self._codes()
+        self._test_geometry(codes, decode_array(
+            numpy.array([int(code) for code in codes])))
+        for mesh_class in MESH_CLASSES:
+            level_codes = [
+                code for code in codes
+                if isinstance(parse_mesh_code(code), mesh_class)]
+            self._test_geometry(level_codes, decode_array(
+                (int(code) for code in level_codes), level=mesh_class))
+
+    def test_packed_codes(self):
+        """Decodes packed codes the same as parse_mesh_code().
+        """
+        codes = self._codes()
+        self._test_geometry(codes, decode_array(pack_mesh_codes(codes)))
+
+    @staticmethod
+    def test_hyphens():
+        """Accepts hyphens only at the level borders.
+        """
+        geometry = decode_array([
+            '5339-35-96-1-1-4', '533935-96', '53-39', '5339-', '5339--35',
+            '-5339'])
+        eq_(geometry.level.tolist(), [6, 3, 0, 0, 0, 0])
+        eq_(geometry.valid.tolist(), [True, True, False, False, False, False])
+
+    def test_invalid_codes(self):
+        """Reports invalid codes with the mask.
+        """
+        geometry = decode_array(
+            ['', '53393', '533985', '533935965', '53393596111x', 'abcd'])
+        self.assertFalse(geometry.valid.any())
+        eq_(geometry.level.tolist(), [0] * 6)
+        self.assertTrue(numpy.isnan(geometry.bounds).all())
+        geometry = decode_array([-1, 5339, 533985], level=SecondMesh)
+        eq_(geometry.valid.tolist(), [False, False, False])
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed.')
+class TestPackMeshCodes(unittest.TestCase):
+    """Tests for jpmesh.pack_mesh_codes with NumPy arrays.
+    """
+
+    @staticmethod
+    def test_pack():
+        """Packs NumPy string arrays to uint64 arrays.
+        """
+        codes = numpy.array([['5339', '5339-35-96'], ['533935', '53393596']])
+        packed_codes = pack_mesh_codes(codes)
+        eq_(packed_codes.dtype, numpy.uint64)
+        eq_(packed_codes.tolist(), [
+            [100000005339, 300053393596], [200000533935, 300053393596]])
+        eq_(unpack_mesh_codes(packed_codes[0], hyphen=True),
+            ['5339', '5339-35-96'])
+
+    @staticmethod
+    def test_invalid_code():
+        """Raises ValueError if the array has an invalid code.
+        """
+        try:
+            pack_mesh_codes(numpy.array(['5339', '5339-8', '533935']))
+        except ValueError as error:
+            eq_(str(error), 'Invalid mesh code: 5339-8')
+        else:
+            raise AssertionError('No ValueError')
+
+
+class TestEncodeParallel(unittest.TestCase):
+    """Tests for jpmesh.encode_parallel.
+    """
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.lons = [rand.uniform(122.0, 154.0) for _ in range(1000)]
+        self.lats = [rand.uniform(20.0, 46.0) for _ in range(1000)]
+        self.lons[10] = 99.0
+        self.lats[20] = 'x'
+
+    def _expected(self, level, exact=False):
+        """Returns the packed codes encoded one by one."""
+        expected = []
+        for lon, lat in zip(self.lons, self.lats):
+            try:
+                expected.append(
+                    level * 10 ** 11 +
+                    encode(lon, lat, level, as_int=True, exact=exact))
+            except ValueError:
+                expected.append(0)
+        return expected
+
+    def test_same_as_serial(self):
+        """Returns the same packed codes in order with worker processes.
+        """
+        for workers in (1, 2):
+            for exact in (False, True):
+                codes = encode_parallel(
+                    self.lons, self.lats, 6, workers=workers,
+                    chunk_size=64, exact=exact)
+                ok_(isinstance(codes, array.array))
+                eq_(codes.tolist(), self._expected(6, exact))
+        eq_(encode_parallel([], [], 1, workers=2).tolist(), [])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_numpy(self):
+        """Encodes NumPy arrays with encode_array in the workers.
+        """
+        self.lats[20] = 35.0
+        codes = encode_parallel(
+            numpy.array(self.lons), numpy.array(self.lats), SecondMesh,
+            workers=2, chunk_size=100)
+        eq_(codes.tolist(), self._expected(2))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_length_mismatch():
+        """Raises ValueError for coordinates of different lengths.
+        """
+        encode_parallel([139.7], [], 3)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed.')
+class TestGrid(unittest.TestCase):
+    """Tests for jpmesh.values_to_grid and jpmesh.iter_grid_values.
+    """
+
+    @staticmethod
+    def test_second_mesh():
+        """Lays out the 3rd meshes of a 2nd mesh in a 10x10 grid.
+        """
+        grid = values_to_grid(
+            ['53393526', '53393500', '53393599', '53393600', '5339352611'],
+            [1.0, 2.0, 3.0, 4.0, 5.0], parse_mesh_code('533935'), ThirdMesh)
+        eq_(grid.values.shape, (10, 10))
+        eq_(grid.values[0, 0], 2.0)
+        eq_(grid.values[2, 6], 1.0)
+        eq_(grid.values[9, 9], 3.0)
+        eq_(int(numpy.isnan(grid.values).sum()), 97)
+        mesh = parse_mesh_code('53393500')
+        eq_(grid.south_west, mesh.south_west)
+        eq_(grid.mesh_size, mesh.size)
+        eq_(grid.codes()[2, 6], 53393526)
+        eq_(list(iter_grid_values(grid)), [
+            ('53393500', 2.0), ('53393526', 1.0), ('53393599', 3.0)])
+
+    @staticmethod
+    def test_first_mesh():
+        """Lays out the half meshes of a 1st mesh across the 2nd meshes.
+        """
+        rand = random.Random(0)
+        codes = list(set(
+            encode(rand.uniform(139.0, 140.0), rand.uniform(35.34, 35.99),
+                   HalfMesh)
+            for _ in range(1000)))
+        values = numpy.arange(1, len(codes) + 1, dtype=numpy.int32)
+        grid = values_to_grid(
+            numpy.array(codes), values, '5339', HalfMesh, fill_value=0)
+        eq_(grid.values.shape, (160, 160))
+        eq_(grid.values.dtype, numpy.int32)
+        eq_(sorted(iter_grid_values(grid, fill_value=0)),
+            sorted(zip(codes, values.tolist())))
+        eq_(list(iter_grid_values(grid, fill_value=0, as_int=True))[0][0],
+            int(sorted(codes, key=lambda code: parse_mesh_code(
+                code).spatial_key)[0]))
+
+    @staticmethod
+    def test_bounding_box():
+        """Lays out the meshes in a bounding box.
+        """
+        box = (139.7, 35.6, 139.72, 35.61)
+        codes = list(iter_bbox_codes(*box, level=ThirdMesh))
+        grid = values_to_grid(
+            pack_mesh_codes(codes), [1.0, 2.0, 3.0, 4.0], box, ThirdMesh)
+        eq_(grid.values.tolist(), [[1.0, 2.0], [3.0, 4.0]])
+        eq_(grid.codes().ravel().tolist(), [int(code) for code in codes])
+        eq_(values_to_grid([], [], (0.0, 0.0, 1.0, 1.0), 1).values.shape,
+            (0, 0))
+
+    @staticmethod
+    def test_integer_codes():
+        """Lays out integer codes of the level as the string codes,
+        where 0 is for invalid coordinates.
+        """
+        box = (139.7, 35.6, 139.72, 35.61)
+        codes, _ = encode_array(
+            [139.705, 139.715, 139.705, 0.0], [35.605, 35.605, 35.612, 0.0],
+            ThirdMesh)
+        grid = values_to_grid(codes, [1.0, 2.0, 3.0, 4.0], box, ThirdMesh)
+        eq_(grid.values[0].tolist(), [1.0, 2.0])
+        eq_(grid.values[1, 0], 3.0)
+        ok_(numpy.isnan(grid.values[1, 1]))
+        eq_(list(iter_grid_values(grid)), list(iter_grid_values(
+            values_to_grid(codes.astype(str)[:3], [1.0, 2.0, 3.0], box,
+                           ThirdMesh))))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_finer_region():
+        """Raises ValueError for a region finer than the level.
+        """
+        values_to_grid([], [], '53393526', SecondMesh)
@@ -0,0 +1,130 @@
+"""
+Tests for the command line interface of jpmesh.
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from nose.tools import eq_
+
+from jpmesh import main
+
+
+class TestMain(unittest.TestCase):
+    """Tests for jpmesh.main.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, name, content, *args):
+        """Run main() for the input file and returns the exit status
+        and the output.
+        """
+        input_path = os.path.join(self.directory, name)
+        output_path = os.path.join(self.directory, 'output')
+        with io.open(input_path, 'w', newline='') as input_file:
+            input_file.write(content)
+        status = main(
+            [input_path, '-o', output_path, '--quiet'] + list(args))
+        if not os.path.exists(output_path):
+            return status, None
+        with io.open(output_path, newline='') as output_file:
+            return status, output_file.read()
+
+    def test_csv(self):
+        """Appends mesh codes to CSV rows in chunks.
+        """
+        status, output = self._run(
+            'points.csv',
+            u'id,lat,lon\n1,35.6,139.7\n2,35.6,99.0\n3,x,139.7\n'
+            u'4,35.7,139.8\n5\n',
+            '--level', '6', '--chunk-size', '2')
+        eq_(status, 0)
+        eq_(output,
+            'id,lat,lon,mesh_code\n1,35.6,139.7,53393526111\n2,35.6,99.0,\n'
+            '3,x,139.7,\n4,35.7,139.8,53394644111\n5,\n')
+
+    def test_tsv(self):
+        """Appends mesh codes to TSV rows with the given column names.
+        """
+        status, output = self._run(
+            'points.tsv', u'x\ty\n139.7\t35.6\n',
+            '--lon', 'x', '--lat', 'y', '--code-column', 'mesh')
+        eq_(status, 0)
+        eq_(output, 'x\ty\tmesh\n139.7\t35.6\t53393526\n')
+
+    def test_jsonl(self):
+        """Adds mesh codes to JSON lines.
+        """
+        status, output = self._run(
+            'points.jsonl',
+            u'{"lon": 139.7, "lat": 35.6}\n\n{"lon": "139.7", "lat": "35.6"}\n'
+            u'{"id": 3}\n',
+            '--level', '1')
+        eq_(status, 0)
+        eq_([json.loads(line) for line in output.splitlines()], [
+            {'lon': 139.7, 'lat': 35.6, 'mesh_code': '5339'},
+            {'lon': '139.7', 'lat': '35.6', 'mesh_code': '5339'},
+            {'id': 3, 'mesh_code': ''}])
+
+    def test_invalid_coordinates(self):
+        """Appends empty codes to the rows of infinite or NaN coordinates.
+        """
+        status, output = self._run(
+            'points.csv',
+            u'lon,lat\ninf,35.6\n1e400,35.6\n139.7,-inf\nnan,35.6\n'
+            u'139.7,35.6\n')
+        eq_(status, 0)
+        eq_(output,
+            'lon,lat,mesh_code\ninf,35.6,\n1e400,35.6,\n139.7,-inf,\n'
+            'nan,35.6,\n139.7,35.6,53393526\n')
+        status, output = self._run(
+            'points.jsonl', u'{"lon": 1e400, "lat": 35.6}\n')
+        eq_(status, 0)
+        eq_(json.loads(output)['mesh_code'], '')
+
+    def test_csv_workers(self):
+        """Writes the same output in the same order with worker processes.
+        """
+        content = u'id,lat,lon\n' + u''.join(
+            u'{0},{1},{2}\n'.format(index, 35.0 + index * 0.01, 139.7)
+            for index in range(20)) + u'20,x,139.7\n21\n'
+        _, expected = self._run('points.csv', content, '--chunk-size', '3')
+        status, output = self._run(
+            'points.csv', content, '--chunk-size', '3', '--workers', '2')
+        eq_(status, 0)
+        eq_(output, expected)
+
+    def test_jsonl_workers(self):
+        """Writes the same JSON lines in the same order with worker processes.
+        """
+        content = u''.join(
+            u'{{"id": {0}, "lon": 139.7, "lat": {1}}}\n'.format(
+                index, 35.0 + index * 0.01)
+            for index in range(10))
+        _, expected = self._run('points.jsonl', content, '--chunk-size', '3')
+        status, output = self._run(
+            'points.jsonl', content, '--chunk-size', '3', '--workers', '3')
+        eq_(status, 0)
+        eq_(output, expected)
+
+    def test_jsonl_not_object(self):
+        """Exits with an error if a JSON line is not an object.
+        """
+        status, _ = self._run(
+            'points.jsonl', u'{"lon": 139.7, "lat": 35.6}\n[1, 2]\n')
+        eq_(status, 1)
+
+    def test_missing_column(self):
+        """Exits with an error if the columns are not found.
+        """
+        status, _ = self._run('points.csv', u'x,y\n139.7,35.6\n')
+        eq_(status, 1)
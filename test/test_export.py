@@ -0,0 +1,174 @@
+"""
+Tests for the polygon export of jpmesh.
+"""
+
+import io
+import json
+import random
+import sys
+import unittest
+
+from nose.tools import eq_, ok_
+
+from jpmesh import MeshPolygon, QuarterMesh, ThirdMesh
+from jpmesh import iter_bbox_codes, iter_mesh_polygons, parse_mesh_code
+from jpmesh import pack_mesh_code, write_geojson, write_wkt
+
+
+def _text_stream():
+    """Returns a stream of native strings as written by the writers,
+    which are bytes on Python 2.7.
+    """
+    return io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+
+
+def _assert_dissolved(polygons, items, area):
+    """Asserts that the dissolved polygons cover the area,
+    and that each mesh is in a polygon of its value.
+
+    :param polygons: Dissolved MeshPolygons.
+    :param items: (mesh code, value) of the meshes.
+    :param area: The total area of the polygons in square degrees.
+    """
+    total = 0.0
+    for polygon in polygons:
+        west, south, east, north = polygon.bounds
+        total += (east - west) * (north - south)
+    ok_(abs(total - area) < 1e-9)
+    for code, value in items:
+        mesh = parse_mesh_code(code)
+        center = mesh.south_west + mesh.size / 2
+        lon, lat = center.lon.degree, center.lat.degree
+        eq_([polygon.values for polygon in polygons
+             if polygon.bounds[0] < lon < polygon.bounds[2] and
+             polygon.bounds[1] < lat < polygon.bounds[3]],
+            [(value,)])
+
+
+class TestMeshPolygons(unittest.TestCase):
+    """Tests for jpmesh.iter_mesh_polygons.
+    """
+
+    @staticmethod
+    def test_polygons():
+        """Test for iter_mesh_polygons.
+        """
+        codes = ['53393526', parse_mesh_code('5339352611'),
+                 pack_mesh_code('5339')]
+        polygons = list(iter_mesh_polygons(codes, [('value', [1, 2, 3])]))
+        eq_([polygon.code for polygon in polygons],
+            ['53393526', '5339352611', '5339'])
+        eq_([polygon.values for polygon in polygons], [(1,), (2,), (3,)])
+        for polygon in polygons:
+            mesh = parse_mesh_code(polygon.code)
+            south_west = mesh.south_west
+            north_east = south_west + mesh.size
+            for actual, expected in zip(polygon.bounds, (
+                    south_west.lon.degree, south_west.lat.degree,
+                    north_east.lon.degree, north_east.lat.degree)):
+                ok_(abs(actual - expected) < 1e-9)
+
+    @staticmethod
+    def test_wkt():
+        """Test for MeshPolygon.wkt.
+        """
+        polygon = MeshPolygon(
+            code='53393526', bounds=(139.7, 35.6, 139.7125, 35.6125),
+            values=())
+        eq_(polygon.wkt,
+            'POLYGON ((139.7 35.6, 139.7125 35.6, 139.7125 35.6125, '
+            '139.7 35.6125, 139.7 35.6))')
+        eq_(json.loads(polygon.geojson),
+            {'type': 'Polygon', 'coordinates': polygon.coordinates})
+
+    @staticmethod
+    def test_dissolve():
+        """Test for iter_mesh_polygons with dissolving.
+        """
+        rand = random.Random(0)
+        codes = list(iter_bbox_codes(139.7, 35.6, 139.8, 35.7, QuarterMesh))
+        values = [rand.choice((0, 0, 0, 1)) for _ in codes]
+        records = list(zip(codes, values))
+        rand.shuffle(records)
+        for items in (list(zip(codes, values)), records):
+            polygons = list(iter_mesh_polygons(
+                [code for code, _ in items],
+                {'value': [value for _, value in items]}, dissolve=True))
+            ok_(all(polygon.code is None for polygon in polygons))
+            _assert_dissolved(polygons, items, 0.01)
+        eq_(len(list(iter_mesh_polygons(
+            codes, {'value': range(len(codes))}, dissolve=True))),
+            len(codes))
+        eq_(len(list(iter_mesh_polygons(codes, dissolve=True))), 1)
+
+    @staticmethod
+    def test_dissolve_levels():
+        """Test for iter_mesh_polygons dissolving meshes of mixed levels.
+        """
+        codes = ['53393526', '53393527', '5339352811', '5339352812']
+        eq_([polygon.bounds for polygon in iter_mesh_polygons(
+            (pack_mesh_code(code) for code in codes), dissolve=True)],
+            [(139.7, 35.6, 139.725, 35.608333333333334),
+             (139.725, 35.6, 139.73125, 35.60208333333333)])
+
+    @staticmethod
+    def test_empty():
+        """Test for iter_mesh_polygons with no meshes.
+        """
+        eq_(list(iter_mesh_polygons([])), [])
+        eq_(list(iter_mesh_polygons([], dissolve=True)), [])
+
+
+class TestWriters(unittest.TestCase):
+    """Tests for jpmesh.write_geojson and jpmesh.write_wkt.
+    """
+
+    def setUp(self):
+        self.codes = list(iter_bbox_codes(139.7, 35.6, 139.72, 35.61,
+                                          ThirdMesh))
+        self.columns = [('name', ['a', 'b', 'c', 'd']), ('value', [1] * 4)]
+
+    def test_geojson(self):
+        """Test for write_geojson.
+        """
+        stream = _text_stream()
+        eq_(write_geojson(stream, iter(self.codes), self.columns), 4)
+        collection = json.loads(stream.getvalue())
+        eq_(collection['type'], 'FeatureCollection')
+        eq_([feature['properties'] for feature in collection['features']],
+            [{'code': code, 'name': name, 'value': 1}
+             for code, name in zip(self.codes, 'abcd')])
+        polygons = iter_mesh_polygons(self.codes)
+        for feature, polygon in zip(collection['features'], polygons):
+            eq_(feature['geometry'],
+                {'type': 'Polygon', 'coordinates': polygon.coordinates})
+
+        stream = _text_stream()
+        eq_(write_geojson(stream, []), 0)
+        eq_(json.loads(stream.getvalue())['features'], [])
+
+    def test_geojson_seq(self):
+        """Test for write_geojson writing a feature per line.
+        """
+        stream = _text_stream()
+        eq_(write_geojson(stream, self.codes, {'value': [1, 1, 2, 2]},
+                          dissolve=True, seq=True), 2)
+        features = [json.loads(line)
+                    for line in stream.getvalue().splitlines()]
+        eq_([feature['properties'] for feature in features],
+            [{'value': 1}, {'value': 2}])
+
+    def test_wkt(self):
+        """Test for write_wkt.
+        """
+        stream = _text_stream()
+        eq_(write_wkt(stream, self.codes, self.columns, delimiter='\t'), 4)
+        lines = stream.getvalue().splitlines()
+        eq_(lines[0], 'code\tname\tvalue\twkt')
+        eq_(lines[1].split('\t')[:3], ['53393526', 'a', '1'])
+        eq_(lines[1].split('\t')[3],
+            next(iter_mesh_polygons(self.codes)).wkt)
+
+        stream = _text_stream()
+        eq_(write_wkt(stream, self.codes, dissolve=True), 1)
+        eq_(stream.getvalue().splitlines()[0], 'wkt')
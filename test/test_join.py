@@ -0,0 +1,110 @@
+"""
+Tests for the spatial join of jpmesh.
+"""
+
+import random
+import unittest
+
+from nose.tools import eq_, raises
+
+from jpmesh import MeshJoinIndex, ThirdMesh, QuarterMesh
+from jpmesh import encode, pack_mesh_code, parse_mesh_code
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestMeshJoinIndex(unittest.TestCase):
+    """Tests for jpmesh.MeshJoinIndex.
+    """
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.references = {}
+        for _ in range(500):
+            mesh_class = rand.choice((ThirdMesh, QuarterMesh))
+            code = encode(
+                rand.uniform(139.6, 139.8), rand.uniform(35.5, 35.7),
+                mesh_class)
+            self.references[pack_mesh_code(code)] = code
+        self.index = MeshJoinIndex(self.references.items())
+        self.points = [
+            (rand.uniform(139.6, 139.8), rand.uniform(35.5, 35.7))
+            for _ in range(2000)]
+        self.points.append((99.0, 35.6))
+
+    def _expected(self, lon, lat):
+        """Returns the packed code of the most specific reference mesh
+        found by trying each level.
+        """
+        for mesh_class in (QuarterMesh, ThirdMesh):
+            try:
+                packed_code = pack_mesh_code(encode(lon, lat, mesh_class))
+            except ValueError:
+                return None
+            if packed_code in self.references:
+                return packed_code
+        return None
+
+    def test_lookup(self):
+        """Returns the most specific reference meshes.
+        """
+        for lon, lat in self.points:
+            match = self.index.lookup(lon, lat)
+            expected = self._expected(lon, lat)
+            if expected is None:
+                eq_(match, None)
+            else:
+                eq_(match, (expected, self.references[expected]))
+        eq_(self.index.levels, [5, 3])
+        eq_(len(self.index), len(self.references))
+
+    @staticmethod
+    def test_most_specific():
+        """Prefers finer meshes to their ancestors.
+        """
+        index = MeshJoinIndex([('53393526', 'third'), ('5339-35', 'second')])
+        index.add(parse_mesh_code('5339352611'), 'quarter')
+        eq_(index.lookup(139.7, 35.6), (pack_mesh_code('5339352611'),
+                                        'quarter'))
+        eq_(index.lookup(139.71, 35.6), (pack_mesh_code('53393526'),
+                                         'third'))
+        eq_(index.lookup(139.71, 35.59), (pack_mesh_code('533935'),
+                                          'second'))
+        eq_(index.lookup(139.0, 35.0), None)
+        eq_(index['5339-35-26'], 'third')
+        eq_(MeshJoinIndex().lookup(139.7, 35.6), None)
+
+    def test_stats(self):
+        """Counts the lookups, the matches and the probes.
+        """
+        index = MeshJoinIndex([('53393526', 1), ('5339-35-26-1-1', 2)])
+        index.lookup(139.7, 35.6)
+        index.lookup(139.71, 35.6)
+        index.lookup(139.0, 35.0)
+        eq_(index.stats(), (3, 2, 5))
+        index.reset_stats()
+        eq_(index.stats(), (0, 0, 0))
+        self.index.reset_stats()
+
+    @raises(ValueError)
+    def test_invalid_reference(self):
+        """Raises ValueError for an invalid reference mesh.
+        """
+        self.index.add('invalid', 0)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_lookup_array(self):
+        """Returns the same matches for arrays of points.
+        """
+        lons, lats = (numpy.array(column) for column in zip(*self.points))
+        matches = self.index.lookup_array(lons, lats)
+        eq_(matches.tolist(), [
+            self._expected(lon, lat) or 0 for lon, lat in self.points])
+        stats = self.index.stats()
+        eq_(stats.lookups, len(self.points))
+        eq_(stats.matches, int((matches > 0).sum()))
+        eq_(MeshJoinIndex().lookup_array(lons, lats).tolist(),
+            [0] * len(self.points))
@@ -2,6 +2,11 @@
 Tests for jpmesh.coordinate.
 """
 
+import collections
+import heapq
+import pickle
+import random
+import sys
 import unittest
 
 from nose.tools import ok_, eq_
@@ -10,8 +15,47 @@ from nose.tools import raises
 from jpmesh import FirstMesh, SecondMesh, ThirdMesh
 from jpmesh import HalfMesh, QuarterMesh, OneEighthMesh
 from jpmesh import parse_mesh_code
+from jpmesh import encode
+from jpmesh import pack_mesh_code, unpack_mesh_code, parse_packed_code
+from jpmesh import pack_mesh_codes, unpack_mesh_codes
+from jpmesh import parent_code, child_codes, descendant_codes
+from jpmesh import enable_mesh_cache, disable_mesh_cache
+from jpmesh import clear_mesh_cache, mesh_cache_info
+from jpmesh import MESH_CLASSES
 from jpmesh import Coordinate
 from jpmesh import Angle
+from jpmesh import IndexDividedMesh
+
+
+def reference_code(lon, lat, mesh_class):
+    """Returns the mesh code calculated with Angle and Coordinate objects
+    from the 1st mesh down, as from_coordinate() did before encode().
+    It is also the baseline of benchmark/benchmark_encode.py.
+    """
+    mesh_classes = []
+    parent_class = mesh_class
+    while parent_class is not FirstMesh:
+        mesh_classes.insert(0, parent_class)
+        parent_class = parent_class.ParentMesh
+    coord = Coordinate(lon=Angle.from_degree(lon), lat=Angle.from_degree(lat))
+    lon_number = int(coord.lon.degree) - 100
+    lat_number = int(coord.lat.degree * 1.5)
+    code = '{0:02d}{1:02d}'.format(lat_number, lon_number)
+    south_west = Coordinate(
+        lon=Angle.from_degree(lon_number + 100),
+        lat=Angle.from_minute(lat_number * 40))
+    for child_class in mesh_classes:
+        remaining = coord - south_west
+        lon_number = int(remaining.lon.ratio_in(child_class.size.lon))
+        lat_number = int(remaining.lat.ratio_in(child_class.size.lat))
+        if issubclass(child_class, IndexDividedMesh):
+            code += '{0:d}'.format(lat_number * 2 + lon_number + 1)
+        else:
+            code += '{0:d}{1:d}'.format(lat_number, lon_number)
+        south_west = south_west + Coordinate(
+            lon=child_class.size.lon * lon_number,
+            lat=child_class.size.lat * lat_number)
+    return code
 
 
 def _test_from_code(test_class, org_code, code, south_west):
@@ -259,6 +303,36 @@ class TestParseMeshCode(unittest.TestCase):
         ok_(isinstance(parse_mesh_code('5339357312'), QuarterMesh))
         ok_(isinstance(parse_mesh_code('53393573123'), OneEighthMesh))
 
+    @staticmethod
+    def test_hyphenated_code():
+        """
+        Accepts hyphens at the level borders.
+        """
+        eq_(parse_mesh_code('5339-35-96-1-1-4').code, '53393596114')
+        eq_(parse_mesh_code('533935-961-14').code, '53393596114')
+        eq_(parse_mesh_code('5339-35').code, '533935')
+
+    @staticmethod
+    def test_invalid_codes():
+        """
+        Raises ValueError if invalid digits or hyphens are given.
+        """
+        for code in ['53-39', '5339-', '5339--35', '-5339', '533985',
+                     '5339359a', '533935965', u'\uff15\uff13\uff13\uff19']:
+            try:
+                parse_mesh_code(code)
+            except ValueError:
+                continue
+            raise AssertionError('No ValueError for {0}'.format(code))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_other_level_code():
+        """
+        Raises ValueError if the code is for the other level.
+        """
+        HalfMesh.from_code('5339359614')
+
     @staticmethod
     @raises(ValueError)
     def test_empty_code():
@@ -274,3 +348,428 @@ class TestParseMeshCode(unittest.TestCase):
         Raises ValueError if invalid mesh codes are given.
         """
         isinstance(parse_mesh_code('533935731234'), FirstMesh)
+
+
+class TestParentMesh(unittest.TestCase):
+    """
+    Tests for parent_mesh of the mesh classes.
+    """
+    @staticmethod
+    def test_parent_mesh():
+        """
+        Returns the parent meshes calculated from the code.
+        """
+        mesh = parse_mesh_code('53393596114')
+        codes = []
+        while mesh is not None:
+            codes.append((type(mesh), mesh.code, mesh.int_code))
+            mesh = mesh.parent_mesh
+        eq_(codes, [
+            (OneEighthMesh, '53393596114', 53393596114),
+            (QuarterMesh, '5339359611', 5339359611),
+            (HalfMesh, '533935961', 533935961),
+            (ThirdMesh, '53393596', 53393596),
+            (SecondMesh, '533935', 533935),
+            (FirstMesh, '5339', 5339)])
+
+    @staticmethod
+    def test_constructed_parent_mesh():
+        """
+        Returns the parent mesh given to the constructor.
+        """
+        mesh = SecondMesh(FirstMesh(39, 53), 5, 4)
+        eq_(mesh.code, '533945')
+        eq_(mesh.parent_mesh.code, '5339')
+
+
+class TestNavigation(unittest.TestCase):
+    """
+    Tests for the parents, the children and the descendants.
+    """
+
+    @staticmethod
+    def test_parent():
+        """
+        Returns the ancestors of the levels.
+        """
+        mesh = parse_mesh_code('5339-35-96-1-2')
+        eq_(mesh.parent().code, '533935961')
+        eq_(mesh.parent(SecondMesh).code, '533935')
+        eq_(mesh.parent(1), FirstMesh.from_code('5339'))
+        eq_(mesh.parent(QuarterMesh), mesh)
+        eq_(unpack_mesh_code(parent_code(mesh.packed_code)), '533935961')
+        eq_(unpack_mesh_code(parent_code(mesh.packed_code, 2)), '533935')
+
+    @staticmethod
+    @raises(ValueError)
+    def test_parent_finer():
+        """
+        Raises ValueError for a finer level.
+        """
+        parse_mesh_code('53393596').parent(HalfMesh)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_parent_first():
+        """
+        Raises ValueError for the parent of a 1st mesh.
+        """
+        parent_code(pack_mesh_code('5339'))
+
+    @staticmethod
+    def test_children():
+        """
+        Returns the children in the spatial order.
+        """
+        children = parse_mesh_code('5339').children()
+        eq_(len(children), 64)
+        eq_(children, sorted(children))
+        eq_(children[:2], [SecondMesh.from_code('533900'),
+                           SecondMesh.from_code('533901')])
+        eq_([child.code for child in parse_mesh_code('53393596').children()],
+            ['533935961', '533935962', '533935963', '533935964'])
+        eq_(len(parse_mesh_code('533935').children()), 100)
+        eq_(parse_mesh_code('53393596111').children(), [])
+        eq_(unpack_mesh_codes(child_codes(pack_mesh_code('533935961'))),
+            ['5339359611', '5339359612', '5339359613', '5339359614'])
+        eq_(child_codes(pack_mesh_code('53393596111')), [])
+        for child in parse_mesh_code('533935').children():
+            eq_(child.parent_mesh.code, '533935')
+
+    @staticmethod
+    def test_descendants():
+        """
+        Yields the descendants lazily in the order of the codes.
+        """
+        descendants = parse_mesh_code('5339').descendants(OneEighthMesh)
+        eq_(next(descendants).code, '53390000111')
+        eq_(next(descendants).code, '53390000112')
+        codes = list(descendant_codes(pack_mesh_code('533935'), 5))
+        eq_(len(codes), 100 * 4 * 4)
+        eq_(codes, sorted(codes))
+        for packed_code in codes:
+            eq_(unpack_mesh_code(parent_code(packed_code, 2)), '533935')
+        eq_(list(descendant_codes(pack_mesh_code('5339'), 1)),
+            [pack_mesh_code('5339')])
+        eq_(len(list(descendant_codes(pack_mesh_code('5339'), 6))),
+            64 * 100 * 4 * 4 * 4)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_descendants_coarser():
+        """
+        Raises ValueError for a coarser level.
+        """
+        list(parse_mesh_code('53393596').descendants(SecondMesh))
+
+
+class TestMeshIdentity(unittest.TestCase):
+    """
+    Tests for the equality, the hash and the order of meshes.
+    """
+    def test_equality(self):
+        """
+        Meshes are equal if their levels and codes are the same.
+        """
+        mesh = parse_mesh_code('5339-35-96')
+        coord = Coordinate(
+            lon=Angle.from_degree(139.71), lat=Angle.from_degree(35.71))
+        eq_(mesh, ThirdMesh.from_code('53393596'))
+        eq_(mesh, ThirdMesh.from_coordinate(mesh.south_west))
+        eq_(hash(mesh), hash(ThirdMesh.from_code('53393596')))
+        self.assertNotEqual(mesh, parse_mesh_code('53393597'))
+        self.assertNotEqual(mesh, mesh.parent_mesh)
+        self.assertNotEqual(mesh, '53393596')
+        self.assertNotEqual(
+            FirstMesh.from_coordinate(coord), SecondMesh.from_coordinate(coord))
+
+    def test_collections(self):
+        """
+        Meshes can be dictionary keys and set members.
+        """
+        codes = ['5339', '5339-35', '5339-35-96', '5339-35-96', '5339']
+        counter = collections.Counter(parse_mesh_code(code) for code in codes)
+        eq_(counter[FirstMesh.from_code('5339')], 2)
+        eq_(counter[ThirdMesh.from_code('53393596')], 2)
+        eq_(len(set(counter)), 3)
+        self.assertIn(SecondMesh.from_code('533935'), counter)
+
+    @staticmethod
+    def test_order():
+        """
+        Meshes are sorted by the level, from the south and from the west.
+        """
+        codes = ['533946', '5340', '533937', '523900', '5339', '533945']
+        meshes = [parse_mesh_code(code) for code in codes]
+        eq_([mesh.code for mesh in sorted(meshes)],
+            ['5339', '5340', '523900', '533937', '533945', '533946'])
+        heapq.heapify(meshes)
+        eq_(heapq.heappop(meshes).code, '5339')
+        ok_(parse_mesh_code('533937') < parse_mesh_code('533945'))
+        ok_(parse_mesh_code('533937') <= parse_mesh_code('533937'))
+        ok_(parse_mesh_code('533946') > parse_mesh_code('533945'))
+        ok_(parse_mesh_code('533946') >= parse_mesh_code('533907'))
+
+
+class TestPackedCode(unittest.TestCase):
+    """
+    Tests for the packed mesh codes.
+    """
+    CODES = [
+        ('5339', '5339', 100000005339),
+        ('533935', '5339-35', 200000533935),
+        ('53393596', '5339-35-96', 300053393596),
+        ('533935961', '5339-35-96-1', 400533935961),
+        ('5339359612', '5339-35-96-1-2', 505339359612),
+        ('53393596123', '5339-35-96-1-2-3', 653393596123),
+        ('0000', '0000', 100000000000),
+        ('000000', '0000-00', 200000000000)]
+
+    def test_pack(self):
+        """
+        Packs and unpacks mesh codes of every level.
+        """
+        for code, hyphenated, packed_code in self.CODES:
+            eq_(pack_mesh_code(code), packed_code)
+            eq_(pack_mesh_code(hyphenated), packed_code)
+            eq_(unpack_mesh_code(packed_code), code)
+            eq_(unpack_mesh_code(packed_code, hyphen=True), hyphenated)
+            mesh = parse_packed_code(packed_code)
+            eq_(mesh.code, code)
+            eq_(mesh.packed_code, packed_code)
+            ok_(packed_code < 2 ** 64)
+
+    def test_bulk(self):
+        """
+        Packs and unpacks lists and arrays of mesh codes.
+        """
+        codes = [code for code, _, _ in self.CODES]
+        hyphenated = [code for _, code, _ in self.CODES]
+        packed_codes = pack_mesh_codes(hyphenated)
+        eq_(packed_codes.itemsize, 8)
+        eq_(packed_codes.tolist(),
+            [packed_code for _, _, packed_code in self.CODES])
+        eq_(unpack_mesh_codes(packed_codes), codes)
+        eq_(unpack_mesh_codes(list(packed_codes), hyphen=True), hyphenated)
+
+    @staticmethod
+    def test_invalid_packed_codes():
+        """
+        Raises ValueError if invalid packed codes are given.
+        """
+        for packed_code in [5339, 100000015339, 200000533985, 400533935965,
+                            700053393596, -100000005339]:
+            try:
+                unpack_mesh_code(packed_code)
+            except ValueError:
+                continue
+            raise AssertionError(
+                'No ValueError for {0}'.format(packed_code))
+
+
+class TestMemoryFootprint(unittest.TestCase):
+    """
+    Tests for the memory footprint of meshes, angles and coordinates.
+    """
+    class OneSlot(object): # pylint: disable=R0903
+        """
+        An object with only one slot.
+        """
+        __slots__ = ('value',)
+
+    def test_mesh(self):
+        """
+        Meshes hold only one integer without __dict__.
+        """
+        one_slot_size = sys.getsizeof(self.OneSlot())
+        coord = Coordinate(
+            lon=Angle.from_degree(139.7), lat=Angle.from_degree(35.6))
+        for mesh_class in MESH_CLASSES:
+            mesh = mesh_class.from_coordinate(coord)
+            ok_(not hasattr(mesh, '__dict__'))
+            eq_(sys.getsizeof(mesh), one_slot_size)
+
+    def test_angle_and_coordinate(self):
+        """
+        Angles and coordinates have no __dict__.
+        """
+        coord = Coordinate(
+            lon=Angle.from_degree(139.7), lat=Angle.from_degree(35.6))
+        ok_(not hasattr(coord, '__dict__'))
+        ok_(not hasattr(coord.lon, '__dict__'))
+        with self.assertRaises(AttributeError):
+            coord.lon.value = 1.0
+        with self.assertRaises(AttributeError):
+            coord.lon = Angle.from_degree(139.0)
+
+    @staticmethod
+    def test_pickle():
+        """
+        Meshes, angles and coordinates can be pickled.
+        """
+        mesh = pickle.loads(pickle.dumps(parse_mesh_code('53393596114')))
+        ok_(isinstance(mesh, OneEighthMesh))
+        eq_(mesh.code, '53393596114')
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            eq_(pickle.loads(pickle.dumps(mesh.south_west, protocol)),
+                mesh.south_west)
+
+
+class TestEncode(unittest.TestCase):
+    """
+    Tests for jpmesh.encode.
+    """
+    @staticmethod
+    def _coordinates():
+        """
+        Returns coordinates including ones on the mesh borders.
+        """
+        rand = random.Random(0)
+        for _ in range(1000):
+            yield rand.uniform(122.0, 154.0), rand.uniform(20.0, 46.0)
+        for lon_number in range(0, 641, 7):
+            for lat_number in range(0, 641, 11):
+                yield (139.0 + lon_number * 5.625 / 3600.0,
+                       35.0 + lat_number * 3.75 / 3600.0)
+
+    def test_same_as_from_coordinate(self):
+        """
+        Returns the same codes as from_coordinate() for each mesh class,
+        which are the same as those calculated with the angle objects.
+        """
+        for lon, lat in self._coordinates():
+            coord = Coordinate(
+                lon=Angle.from_degree(lon), lat=Angle.from_degree(lat))
+            for mesh_class in MESH_CLASSES:
+                code = reference_code(lon, lat, mesh_class)
+                eq_(mesh_class.from_coordinate(coord).code, code)
+                eq_(encode(lon, lat, mesh_class), code)
+                eq_(encode(lon, lat, mesh_class.level), code)
+                eq_(encode(lon, lat, mesh_class, as_int=True), int(code))
+
+    def test_exact_same_as_from_coordinate(self):
+        """
+        Returns the same codes as from_coordinate() in the exact mode.
+        """
+        for lon, lat in self._coordinates():
+            coord = Coordinate(
+                lon=Angle.from_degree(lon), lat=Angle.from_degree(lat))
+            for mesh_class in MESH_CLASSES:
+                code = mesh_class.from_coordinate(coord, exact=True).code
+                eq_(encode(lon, lat, mesh_class, exact=True), code)
+
+    @staticmethod
+    def test_exact_border():
+        """
+        Points on the mesh borders belong to the north-east meshes
+        in the exact mode.
+        """
+        # 128.0125 is the west border of '53282001111'.
+        coord = Coordinate(
+            lon=Angle.from_degree(128.0125), lat=Angle.from_degree(35.5))
+        eq_(OneEighthMesh.from_coordinate(coord).code, '53282000222')
+        eq_(OneEighthMesh.from_coordinate(coord, exact=True).code,
+            '53282001111')
+        eq_(encode(128.0125, 35.5, OneEighthMesh, exact=True), '53282001111')
+        # 32.003125 is the south border of '48390400133'.
+        eq_(encode(139.5, 32.003125, OneEighthMesh), '48390400131')
+        eq_(encode(139.5, 32.003125, OneEighthMesh, exact=True),
+            '48390400133')
+
+    @staticmethod
+    @raises(ValueError)
+    def test_out_of_range():
+        """
+        Raises ValueError if the coordinate is out of the 1st mesh range.
+        """
+        encode(99.0, 35.0, ThirdMesh)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_exact_out_of_range():
+        """
+        Raises ValueError if the coordinate is out of the 1st mesh range
+        in the exact mode.
+        """
+        encode(139.0, -0.1, ThirdMesh, exact=True)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_level():
+        """
+        Raises ValueError if an invalid mesh level is given.
+        """
+        encode(139.0, 35.0, 7)
+
+
+class TestMeshCache(unittest.TestCase):
+    """
+    Tests for the mesh cache.
+    """
+    def setUp(self):
+        enable_mesh_cache(maxsize=8)
+
+    def tearDown(self):
+        disable_mesh_cache()
+
+    def test_cached(self):
+        """
+        Returns the cached instances for the same meshes.
+        """
+        mesh = parse_mesh_code('5339-35-96-1-1-4')
+        self.assertIs(OneEighthMesh.from_code('53393596114'), mesh)
+        self.assertIs(OneEighthMesh.from_coordinate(mesh.south_west), mesh)
+        eq_(mesh_cache_info(), (2, 1, 8, 1))
+
+    def test_shared_parent(self):
+        """
+        Parent meshes are shared by their children.
+        """
+        mesh1 = parse_mesh_code('53393596114')
+        mesh2 = parse_mesh_code('53393596113')
+        self.assertIs(mesh1.parent_mesh, mesh2.parent_mesh)
+        eq_(mesh_cache_info(), (1, 3, 8, 3))
+
+    @staticmethod
+    def test_eviction():
+        """
+        The least recently used meshes are evicted.
+        """
+        for lon_number in range(30, 38):
+            parse_mesh_code('53{0:02d}'.format(lon_number))
+        parse_mesh_code('5330')
+        eq_(mesh_cache_info(), (1, 8, 8, 8))
+        parse_mesh_code('5338')
+        eq_(mesh_cache_info(), (1, 9, 8, 8))
+        # '5330' was used recently and is still cached.
+        parse_mesh_code('5330')
+        eq_(mesh_cache_info(), (2, 9, 8, 8))
+        # '5331' was used least recently and has been evicted.
+        parse_mesh_code('5331')
+        eq_(mesh_cache_info(), (2, 10, 8, 8))
+
+    @staticmethod
+    def test_clear():
+        """
+        Clears the meshes and the statistics.
+        """
+        parse_mesh_code('53393596114')
+        clear_mesh_cache()
+        eq_(mesh_cache_info(), (0, 0, 8, 0))
+
+    @staticmethod
+    def test_disabled():
+        """
+        Returns None for the statistics if disabled.
+        """
+        disable_mesh_cache()
+        eq_(mesh_cache_info(), None)
+        ok_(parse_mesh_code('5339') is not parse_mesh_code('5339'))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_size():
+        """
+        Raises ValueError if an invalid size is given.
+        """
+        enable_mesh_cache(maxsize=0)
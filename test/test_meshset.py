@@ -0,0 +1,137 @@
+"""
+Tests for jpmesh.MeshSet.
+"""
+
+import pickle
+import random
+import unittest
+
+from nose.tools import eq_, ok_, raises
+
+from jpmesh import MESH_CLASSES, MeshSet, ThirdMesh, OneEighthMesh
+from jpmesh import encode, parse_mesh_code, pack_mesh_code, unpack_mesh_codes
+
+
+def _random_codes(level, size, seed):
+    """Returns random mesh codes around Tokyo.
+    """
+    rand = random.Random(seed)
+    return set(
+        encode(rand.uniform(139.0, 140.5), rand.uniform(35.0, 36.0), level)
+        for _ in range(size))
+
+
+class TestMeshSet(unittest.TestCase):
+    """Tests for jpmesh.MeshSet.
+    """
+
+    @staticmethod
+    def test_membership():
+        """Adds, discards and tests meshes in any forms.
+        """
+        meshes = MeshSet(ThirdMesh, ['53393526', '5339-35-27'])
+        meshes.add(parse_mesh_code('53393599'))
+        meshes.add(pack_mesh_code('53393526'))
+        eq_(len(meshes), 3)
+        ok_('53393526' in meshes)
+        ok_(parse_mesh_code('5339-35-27') in meshes)
+        ok_(pack_mesh_code('53393599') in meshes)
+        ok_('53393598' not in meshes)
+        ok_('5339' not in meshes)
+        ok_('invalid' not in meshes)
+        ok_(None not in meshes)
+        meshes.discard('53393599')
+        meshes.discard('53393598')
+        eq_(list(meshes.iter_codes()), ['53393526', '53393527'])
+        ok_(meshes)
+        ok_(not MeshSet(1))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_level():
+        """Raises ValueError to add a mesh of another level.
+        """
+        MeshSet(ThirdMesh).add('5339')
+
+    @staticmethod
+    def test_iteration():
+        """Iterates the meshes and the codes.
+        """
+        for mesh_class in MESH_CLASSES:
+            codes = _random_codes(mesh_class.level, 200, 0)
+            meshes = MeshSet(mesh_class, codes)
+            eq_(len(meshes), len(codes))
+            eq_(sorted(meshes.iter_codes()), sorted(codes))
+            eq_(sorted(mesh.code for mesh in meshes), sorted(codes))
+            eq_(sorted(unpack_mesh_codes(meshes.packed_codes())),
+                sorted(codes))
+            eq_(list(meshes.iter_codes(as_int=True)),
+                [int(code) for code in meshes.iter_codes()])
+
+    @staticmethod
+    def test_operations():
+        """Calculates the union, the intersection and the differences.
+        """
+        for mesh_class in MESH_CLASSES:
+            codes = _random_codes(mesh_class.level, 300, 0)
+            other_codes = _random_codes(mesh_class.level, 300, 1)
+            meshes = MeshSet(mesh_class, codes)
+            other_meshes = MeshSet(mesh_class, other_codes)
+            eq_(set((meshes | other_meshes).iter_codes()),
+                codes | other_codes)
+            eq_(set((meshes & other_meshes).iter_codes()),
+                codes & other_codes)
+            eq_(set((meshes - other_meshes).iter_codes()),
+                codes - other_codes)
+            eq_(set((meshes ^ other_meshes).iter_codes()),
+                codes ^ other_codes)
+            eq_(meshes & other_meshes <= meshes, True)
+            eq_(meshes >= meshes & other_meshes, True)
+            eq_(meshes <= other_meshes, codes <= other_codes)
+
+    @staticmethod
+    def test_in_place_operations():
+        """Updates the set in place.
+        """
+        codes = _random_codes(6, 300, 0)
+        other_codes = _random_codes(6, 300, 1)
+        meshes = MeshSet(OneEighthMesh, codes)
+        other_meshes = MeshSet(OneEighthMesh, other_codes)
+        meshes |= other_meshes
+        eq_(set(meshes.iter_codes()), codes | other_codes)
+        meshes -= MeshSet(OneEighthMesh, codes)
+        eq_(set(meshes.iter_codes()), other_codes - codes)
+        meshes &= MeshSet(OneEighthMesh, codes | other_codes)
+        eq_(set(meshes.iter_codes()), other_codes - codes)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_operation_levels():
+        """Raises ValueError for the operations of different levels.
+        """
+        MeshSet(3) | MeshSet(4) # pylint: disable=W0106
+
+    @staticmethod
+    def test_serialization():
+        """Serializes to bytes and pickles compactly.
+        """
+        for mesh_class in MESH_CLASSES:
+            meshes = MeshSet(
+                mesh_class, _random_codes(mesh_class.level, 100, 0))
+            eq_(MeshSet.from_bytes(meshes.to_bytes()), meshes)
+            eq_(pickle.loads(pickle.dumps(meshes)), meshes)
+        eq_(MeshSet.from_bytes(MeshSet(2).to_bytes()), MeshSet(2))
+        dense = MeshSet(OneEighthMesh, (
+            '533935{0:02d}{1}{2}{3}'.format(number, first, second, third)
+            for number in range(100) for first in range(1, 5)
+            for second in range(1, 5) for third in range(1, 5)))
+        eq_(len(dense), 6400)
+        ok_(len(dense.to_bytes()) < 6400 // 8 + 100 * 4 + 20)
+        ok_(MeshSet(3) != MeshSet(4))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_bytes():
+        """Raises ValueError for invalid bytes.
+        """
+        MeshSet.from_bytes(MeshSet(3, ['53393526']).to_bytes()[:-1])
@@ -0,0 +1,122 @@
+"""
+Tests for the nearest mesh search of jpmesh.
+"""
+
+import math
+import random
+import unittest
+
+from nose.tools import eq_, ok_, raises
+
+from jpmesh import MeshNearestIndex, FirstMesh, QuarterMesh
+from jpmesh import encode, parse_mesh_code, pack_mesh_code
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestMeshNearestIndex(unittest.TestCase):
+    """Tests for jpmesh.MeshNearestIndex.
+    """
+
+    def setUp(self):
+        rand = random.Random(0)
+        self.codes = list(set(
+            encode(rand.uniform(135.0, 140.0), rand.uniform(33.0, 37.0),
+                   QuarterMesh)
+            for _ in range(300)))
+        self.codes.extend(['5339', '53393526'])
+        self.index = MeshNearestIndex(self.codes)
+        self.points = [
+            (rand.uniform(130.0, 145.0), rand.uniform(30.0, 40.0))
+            for _ in range(50)]
+        self.points.extend([(139.7, 35.6), (0.0, 0.0)])
+
+    def _expected(self, lon, lat, k):
+        """Returns (packed code, distance) of the k nearest meshes
+        by comparing all the meshes.
+        """
+        results = []
+        for code in self.codes:
+            mesh = parse_mesh_code(code)
+            center_lon = mesh.south_west.lon.degree + mesh.size.lon.degree / 2
+            center_lat = mesh.south_west.lat.degree + mesh.size.lat.degree / 2
+            distance = math.hypot(
+                (center_lon - lon) * math.cos(math.radians(lat)),
+                center_lat - lat) * math.radians(1.0) * 6371008.8
+            results.append((distance, pack_mesh_code(code)))
+        results.sort()
+        return [(packed_code, distance)
+                for distance, packed_code in results[:k]]
+
+    @staticmethod
+    def _assert_results(actual, expected):
+        """Asserts the codes and the distances of the nearest meshes.
+        """
+        eq_([packed_code for packed_code, _ in actual],
+            [packed_code for packed_code, _ in expected])
+        for (_, actual_distance), (_, expected_distance) in zip(
+                actual, expected):
+            ok_(abs(actual_distance - expected_distance) < 1e-6)
+
+    def test_k_nearest(self):
+        """Test for MeshNearestIndex.k_nearest.
+        """
+        eq_(len(self.index), len(self.codes))
+        for lon, lat in self.points:
+            for k in (1, 5):
+                self._assert_results(
+                    self.index.k_nearest(lon, lat, k),
+                    self._expected(lon, lat, k))
+
+    def test_nearest(self):
+        """Test for MeshNearestIndex.nearest.
+        """
+        packed_code, distance = self.index.nearest(139.7, 35.6)
+        eq_(packed_code, pack_mesh_code('53393526'))
+        ok_(distance < 1000.0)
+        eq_(MeshNearestIndex().nearest(139.7, 35.6), None)
+        eq_(MeshNearestIndex().k_nearest(139.7, 35.6, 3), [])
+
+    def test_bucket_level(self):
+        """Test for MeshNearestIndex with another bucket level.
+        """
+        index = MeshNearestIndex(self.codes, FirstMesh)
+        for lon, lat in self.points:
+            self._assert_results(
+                index.k_nearest(lon, lat, 3), self._expected(lon, lat, 3))
+
+    @staticmethod
+    def test_too_many():
+        """Test for MeshNearestIndex.k_nearest with k more than the meshes.
+        """
+        index = MeshNearestIndex(['53393526', '53393599'])
+        eq_([packed_code for packed_code, _
+             in index.k_nearest(139.7, 35.6, 5)],
+            [pack_mesh_code('53393526'), pack_mesh_code('53393599')])
+
+    @raises(ValueError)
+    def test_invalid_k(self):
+        """Test for MeshNearestIndex.k_nearest with an invalid k.
+        """
+        self.index.k_nearest(139.7, 35.6, 0)
+
+    @staticmethod
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_k_nearest_array():
+        """Test for MeshNearestIndex.k_nearest_array.
+        """
+        index = MeshNearestIndex(['53393526', '53393599'])
+        packed_codes, distances = index.k_nearest_array(
+            [139.7, 139.75], [35.6, 35.65], k=3)
+        eq_(packed_codes.shape, (2, 3))
+        for row, (lon, lat) in enumerate([(139.7, 35.6), (139.75, 35.65)]):
+            expected = index.k_nearest(lon, lat, 3)
+            eq_(packed_codes[row, :2].tolist(),
+                [packed_code for packed_code, _ in expected])
+            eq_(distances[row, :2].tolist(),
+                [distance for _, distance in expected])
+            eq_(packed_codes[row, 2], 0)
+            ok_(numpy.isinf(distances[row, 2]))
@@ -0,0 +1,369 @@
+"""
+Tests for the regional mesh operations of jpmesh.
+"""
+
+import random
+import unittest
+
+from nose.tools import eq_, ok_, raises
+
+from jpmesh import FirstMesh, SecondMesh, ThirdMesh, HalfMesh, QuarterMesh
+from jpmesh import MESH_CLASSES
+from jpmesh import encode, parse_mesh_code
+from jpmesh import iter_bbox_codes, iter_bbox_meshes, bbox_code_array
+from jpmesh import polygon_cover, compact_mesh_codes
+from jpmesh import neighbors, ring, neighbors_array, ring_array
+from jpmesh import pack_mesh_code, unpack_mesh_codes, parse_packed_code
+from jpmesh import morton_key, morton_key_to_packed_code, morton_ranges
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestBoundingBox(unittest.TestCase):
+    """Tests for the enumeration of meshes in bounding boxes.
+    """
+
+    @staticmethod
+    def test_codes():
+        """Yields the codes in the spatial order.
+        """
+        eq_(list(iter_bbox_codes(139.7, 35.6, 139.72, 35.61, ThirdMesh)),
+            ['53393526', '53393527', '53393536', '53393537'])
+        eq_(list(iter_bbox_codes(139.7, 35.6, 139.7, 35.6, 6, as_int=True)),
+            [53393526111])
+
+    @staticmethod
+    def test_borders():
+        """Excludes meshes which only touch the box at their borders.
+        """
+        eq_(list(iter_bbox_codes(139.0, 35.0 + 1.0 / 3.0, 140.0, 36.0, 1)),
+            ['5339'])
+        eq_(list(iter_bbox_codes(140.0, 36.0, 140.0, 36.0, FirstMesh)),
+            ['5440'])
+
+    @staticmethod
+    def test_clipped():
+        """Clips the box in the mesh range.
+        """
+        eq_(list(iter_bbox_codes(0.0, 0.0, 100.5, 0.5, 1)), ['0000'])
+        eq_(list(iter_bbox_codes(0.0, 0.0, 10.0, 10.0, 1)), [])
+
+    @staticmethod
+    def test_contains_points():
+        """Contains the meshes of the points in the box for all the levels.
+        """
+        rand = random.Random(0)
+        for mesh_class in MESH_CLASSES:
+            scale = 0.5 ** mesh_class.level
+            for _ in range(20):
+                west = rand.uniform(122.0, 153.0)
+                south = rand.uniform(20.0, 45.0)
+                east = west + rand.uniform(0.0, scale)
+                north = south + rand.uniform(0.0, scale)
+                codes = list(iter_bbox_codes(
+                    west, south, east, north, mesh_class))
+                eq_(len(codes), len(set(codes)))
+                for _ in range(20):
+                    code = encode(
+                        rand.uniform(west, east), rand.uniform(south, north),
+                        mesh_class, exact=True)
+                    ok_(code in codes)
+
+    @staticmethod
+    def test_meshes():
+        """Yields the meshes in the spatial order.
+        """
+        meshes = list(iter_bbox_meshes(139.7, 35.6, 139.71, 35.61, HalfMesh))
+        eq_(meshes, sorted(meshes))
+        eq_([mesh.code for mesh in meshes], list(iter_bbox_codes(
+            139.7, 35.6, 139.71, 35.61, HalfMesh)))
+        eq_(meshes[0], parse_mesh_code('533935261'))
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_box():
+        """Raises ValueError for an invalid box.
+        """
+        list(iter_bbox_codes(139.7, 35.6, 139.6, 35.7, 1))
+
+    @staticmethod
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_code_array():
+        """Returns the codes in a 2-dimensional array.
+        """
+        codes = bbox_code_array(139.7, 35.6, 139.72, 35.61, ThirdMesh)
+        eq_(codes.tolist(), [[53393526, 53393527], [53393536, 53393537]])
+        eq_(bbox_code_array(0.0, 0.0, 1.0, 1.0, 1).shape, (0, 0))
+        codes = bbox_code_array(138.9, 35.5, 139.9, 35.9, 4)
+        eq_(codes.ravel().tolist(), list(iter_bbox_codes(
+            138.9, 35.5, 139.9, 35.9, 4, as_int=True)))
+
+
+def _inside(lon, lat, rings):
+    """Returns whether the point is inside the rings in the even-odd rule.
+    """
+    result = False
+    for vertices in rings:
+        for (lon0, lat0), (lon1, lat1) in zip(
+                vertices, vertices[1:] + vertices[:1]):
+            if (lat0 > lat) != (lat1 > lat) and lon < (
+                    lon0 + (lat - lat0) * (lon1 - lon0) / (lat1 - lat0)):
+                result = not result
+    return result
+
+
+class TestPolygonCover(unittest.TestCase):
+    """Tests for jpmesh.polygon_cover and jpmesh.compact_mesh_codes.
+    """
+
+    def setUp(self):
+        self.exterior = [
+            (139.60, 35.50), (139.80, 35.52), (139.78, 35.70),
+            (139.70, 35.62), (139.62, 35.68)]
+        self.hole = [
+            (139.68, 35.55), (139.72, 35.55), (139.72, 35.58),
+            (139.68, 35.58)]
+        self.rings = [self.exterior, self.hole]
+
+    def test_cover(self):
+        """Covers all the points inside the polygon.
+        """
+        rand = random.Random(0)
+        for mesh_class in (SecondMesh, ThirdMesh, HalfMesh):
+            codes = polygon_cover(self.exterior, mesh_class, [self.hole])
+            eq_(codes, sorted(
+                codes, key=lambda code: parse_mesh_code(code).spatial_key))
+            for _ in range(2000):
+                lon = rand.uniform(139.6, 139.8)
+                lat = rand.uniform(35.5, 35.7)
+                if _inside(lon, lat, self.rings):
+                    ok_(encode(lon, lat, mesh_class, exact=True) in codes)
+
+    def test_contained(self):
+        """Returns the meshes inside the polygon.
+        """
+        rand = random.Random(0)
+        codes = polygon_cover(
+            self.exterior, ThirdMesh, [self.hole], contained=True)
+        ok_(codes)
+        ok_(set(codes) < set(
+            polygon_cover(self.exterior, ThirdMesh, [self.hole])))
+        for code in codes:
+            mesh = parse_mesh_code(code)
+            west, south = mesh.south_west.lon, mesh.south_west.lat
+            for _ in range(10):
+                ok_(_inside(
+                    (west + mesh.size.lon * rand.random()).degree,
+                    (south + mesh.size.lat * rand.random()).degree,
+                    self.rings))
+
+    @staticmethod
+    def test_rectangle():
+        """Covers a rectangle on the mesh borders exactly.
+        """
+        rectangle = [(139.0, 35.5), (139.25, 35.5), (139.25, 35.75),
+                     (139.0, 35.75), (139.0, 35.5)]
+        expected = list(iter_bbox_codes(139.0, 35.5, 139.25, 35.75, 3))
+        eq_(polygon_cover(rectangle, ThirdMesh), expected)
+        eq_(polygon_cover(rectangle, ThirdMesh, contained=True), expected)
+
+    @staticmethod
+    def test_outside():
+        """Returns no meshes for a polygon out of the mesh range.
+        """
+        eq_(polygon_cover([(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)], 1), [])
+        eq_(polygon_cover([], 1), [])
+
+    def test_compact(self):
+        """Replaces complete groups of the children with their parents.
+        """
+        codes = polygon_cover(self.exterior, QuarterMesh, [self.hole])
+        compacted = polygon_cover(
+            self.exterior, QuarterMesh, [self.hole], compact=True)
+        eq_(compacted, compact_mesh_codes(codes))
+        ok_(len(compacted) < len(codes))
+        levels = set(parse_mesh_code(code).level for code in compacted)
+        ok_(len(levels) > 1)
+        for code in codes:
+            mesh = parse_mesh_code(code)
+            ancestors = []
+            while mesh is not None:
+                ancestors.append(mesh.code)
+                mesh = mesh.parent_mesh
+            eq_(len(set(ancestors) & set(compacted)), 1)
+
+    @staticmethod
+    def test_compact_codes():
+        """Compacts the codes recursively.
+        """
+        codes = ['53393526{0}{1}'.format(index, child)
+                 for index in range(1, 5) for child in range(1, 5)]
+        eq_(compact_mesh_codes(codes + ['5339-35-27-1']),
+            ['53393526', '533935271'])
+        eq_(compact_mesh_codes(codes[1:]), [
+            '533935262', '533935263', '533935264',
+            '5339352612', '5339352613', '5339352614'])
+
+
+class TestNeighbors(unittest.TestCase):
+    """Tests for the neighbor queries of jpmesh.
+    """
+
+    @staticmethod
+    def test_neighbors():
+        """Returns the 8 neighbors across the upper level borders.
+        """
+        eq_(unpack_mesh_codes(neighbors(pack_mesh_code('53393599'))), [
+            '53393588', '53393589', '53393680', '53393598', '53393690',
+            '53394508', '53394509', '53394600'])
+        eq_(unpack_mesh_codes(neighbors(pack_mesh_code('5339-35-99-4-4'))), [
+            '5339359941', '5339359942', '5339369031', '5339359943',
+            '5339369033', '5339450921', '5339450922', '5339460011'])
+        eq_(unpack_mesh_codes(neighbors(pack_mesh_code('5339-77'))), [
+            '533966', '533967', '534060', '533976', '534070', '543906',
+            '543907', '544000'])
+
+    @staticmethod
+    def test_neighbors_k():
+        """Returns the meshes within the distance.
+        """
+        packed_code = pack_mesh_code('53393526')
+        eq_(len(neighbors(packed_code, 2)), 24)
+        eq_(set(neighbors(packed_code, 2)),
+            set(neighbors(packed_code)) | set(ring(packed_code, 2)))
+        eq_(ring(packed_code, 0), [packed_code])
+        eq_(ring(packed_code), neighbors(packed_code))
+
+    @staticmethod
+    def test_out_of_range():
+        """Omits the meshes out of the mesh range.
+        """
+        eq_(unpack_mesh_codes(neighbors(pack_mesh_code('0000'))),
+            ['0001', '0100', '0101'])
+        eq_(len(ring(pack_mesh_code('9999'), 2)), 5)
+
+    @staticmethod
+    def test_south_west():
+        """Returns the neighbors adjacent to the mesh for all the levels.
+        """
+        rand = random.Random(0)
+        for mesh_class in MESH_CLASSES:
+            code = encode(
+                rand.uniform(123.0, 153.0), rand.uniform(24.0, 45.0),
+                mesh_class)
+            mesh = parse_mesh_code(code)
+            west = mesh.south_west.lon
+            south = mesh.south_west.lat
+            for packed_code in ring(mesh.packed_code, 1):
+                neighbor = parse_packed_code(packed_code)
+                ok_(abs(neighbor.south_west.lon - west) <= mesh.size.lon)
+                ok_(abs(neighbor.south_west.lat - south) <= mesh.size.lat)
+                ok_(neighbor != mesh)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_distance():
+        """Raises ValueError for an invalid distance.
+        """
+        neighbors(pack_mesh_code('5339'), 0)
+
+    @staticmethod
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_array():
+        """Returns the same neighbors for many meshes.
+        """
+        rand = random.Random(0)
+        packed_codes = [
+            pack_mesh_code(encode(
+                rand.uniform(123.0, 153.0), rand.uniform(24.0, 45.0),
+                level))
+            for level in range(1, 7) for _ in range(20)]
+        packed_codes.append(pack_mesh_code('0000'))
+        results = neighbors_array(packed_codes, 2)
+        eq_(results.shape, (len(packed_codes), 24))
+        for packed_code, row in zip(packed_codes, results.tolist()):
+            eq_([code for code in row if code], neighbors(packed_code, 2))
+        results = ring_array(numpy.array(packed_codes + [0]))
+        eq_(results.shape, (len(packed_codes) + 1, 8))
+        eq_(results[-1].tolist(), [0] * 8)
+        eq_([code for code in results[0].tolist() if code],
+            ring(packed_codes[0]))
+
+
+class TestMortonKey(unittest.TestCase):
+    """Tests for the Morton keys of jpmesh.
+    """
+
+    @staticmethod
+    def test_key():
+        """Interleaves the bits of the rows and the columns.
+        """
+        level_bits = 1 << 32
+        eq_(morton_key(pack_mesh_code('0000')), level_bits)
+        eq_(morton_key(pack_mesh_code('0001')), level_bits + 1)
+        eq_(morton_key(pack_mesh_code('0100')), level_bits + 2)
+        eq_(morton_key(pack_mesh_code('0101')), level_bits + 3)
+        eq_(morton_key(pack_mesh_code('0002')), level_bits + 4)
+        eq_(morton_key(pack_mesh_code('533935961')),
+            parse_mesh_code('533935961').morton_key)
+        ok_(morton_key(pack_mesh_code('9999')) <
+            morton_key(pack_mesh_code('000000')))
+
+    @staticmethod
+    def test_round_trip():
+        """Converts the keys back to the packed codes for all the levels.
+        """
+        rand = random.Random(0)
+        for mesh_class in MESH_CLASSES:
+            for _ in range(100):
+                packed_code = pack_mesh_code(encode(
+                    rand.uniform(122.0, 154.0), rand.uniform(20.0, 46.0),
+                    mesh_class))
+                eq_(morton_key_to_packed_code(morton_key(packed_code)),
+                    packed_code)
+
+    @staticmethod
+    @raises(ValueError)
+    def test_invalid_key():
+        """Raises ValueError for a key out of the mesh range.
+        """
+        morton_key_to_packed_code((1 << 32) + (1 << 20))
+
+    @staticmethod
+    def test_ranges():
+        """Covers exactly the meshes in the box with key ranges.
+        """
+        rand = random.Random(0)
+        for mesh_class in MESH_CLASSES:
+            scale = 0.5 ** mesh_class.level
+            for _ in range(10):
+                west = rand.uniform(122.0, 153.0)
+                south = rand.uniform(20.0, 45.0)
+                east = west + rand.uniform(0.0, scale)
+                north = south + rand.uniform(0.0, scale)
+                ranges = morton_ranges(west, south, east, north, mesh_class)
+                eq_(ranges, sorted(ranges))
+                keys = [
+                    key for begin, end in ranges for key in range(begin, end)]
+                eq_(keys, sorted(
+                    morton_key(pack_mesh_code(code)) for code
+                    in iter_bbox_codes(west, south, east, north, mesh_class)))
+
+    @staticmethod
+    def test_max_ranges():
+        """Reduces the ranges by filling the smallest gaps.
+        """
+        ranges = morton_ranges(139.01, 35.01, 139.93, 35.62, ThirdMesh)
+        ok_(len(ranges) > 3)
+        reduced = morton_ranges(
+            139.01, 35.01, 139.93, 35.62, ThirdMesh, max_ranges=3)
+        eq_(len(reduced), 3)
+        eq_(reduced[0][0], ranges[0][0])
+        eq_(reduced[-1][1], ranges[-1][1])
+        for begin, end in ranges:
+            ok_(any(reduced_begin <= begin and end <= reduced_end
+                    for reduced_begin, reduced_end in reduced))
+        eq_(morton_ranges(0.0, 0.0, 1.0, 1.0, 1), [])
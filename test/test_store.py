@@ -0,0 +1,174 @@
+"""
+Tests for the mesh store files of jpmesh.
+"""
+
+import multiprocessing
+import os
+import pickle
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+
+from nose.tools import eq_, ok_, raises
+
+from jpmesh import MeshStore, MeshStoreWriter
+from jpmesh import encode, parse_mesh_code, pack_mesh_code
+
+
+def _lookup(args):
+    """Looks up a mesh in a store in a worker process.
+    """
+    store, code = args
+    return store[code]
+
+
+class TestMeshStore(unittest.TestCase):
+    """Tests for jpmesh.MeshStore and jpmesh.MeshStoreWriter.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'store.jpmv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lookup(self):
+        """Looks up the values by meshes, codes and packed codes.
+        """
+        rand = random.Random(0)
+        values = dict(
+            (encode(rand.uniform(122.0, 154.0), rand.uniform(20.0, 46.0), 4),
+             rand.uniform(0.0, 100.0))
+            for _ in range(1000))
+        with MeshStoreWriter(self.path) as writer:
+            writer.update(values.items())
+        with MeshStore(self.path) as store:
+            eq_(len(store), len(values))
+            for code, value in values.items():
+                eq_(store[code], value)
+                eq_(store.get(pack_mesh_code(code)), value)
+                mesh = parse_mesh_code(code)
+                eq_(store[mesh], value)
+                eq_(store.get_index(4, *mesh.spatial_key[1:]), value)
+            eq_(sorted(store.items()), sorted(
+                (pack_mesh_code(code), value)
+                for code, value in values.items()))
+            ok_('5339' not in store)
+            ok_('invalid' not in store)
+            eq_(store.get('5339', -1.0), -1.0)
+            eq_(store.get_index(4, -1, 0), None)
+
+    def test_fields(self):
+        """Stores tuples of multiple fields and keeps the last values.
+        """
+        with MeshStoreWriter(self.path, 'iHd') as writer:
+            writer.add('5339-35-26', (1, 2, 3.5))
+            writer.add('53393526', (4, 5, 6.5))
+            writer.add(parse_mesh_code('5339'), (7, 8, 9.0))
+        store = MeshStore(self.path)
+        eq_(len(store), 2)
+        eq_(store['53393526'], (4, 5, 6.5))
+        eq_(store['5339'], (7, 8, 9.0))
+        eq_(store.value_format, 'iHd')
+        store.close()
+
+    def test_empty(self):
+        """Writes and reads an empty store.
+        """
+        MeshStoreWriter(self.path, 'f').close()
+        with MeshStore(self.path) as store:
+            eq_(len(store), 0)
+            eq_(list(store.items()), [])
+            ok_('5339' not in store)
+
+    @raises(KeyError)
+    def test_missing(self):
+        """Raises KeyError for a missing mesh.
+        """
+        with MeshStoreWriter(self.path, 'B') as writer:
+            writer.add('5339', 1)
+        with MeshStore(self.path) as store:
+            store['5340'] # pylint: disable=W0104
+
+    def test_invalid_item(self):
+        """Keeps the values of the next meshes after an invalid item.
+        """
+        with MeshStoreWriter(self.path, 'B') as writer:
+            writer.add('53393526', 1)
+            for item, value in (('bad-code', 2), ('53393528', (3, 4))):
+                try:
+                    writer.add(item, value)
+                except (ValueError, struct.error):
+                    pass
+            writer.add('53393527', 3)
+        with MeshStore(self.path) as store:
+            eq_(len(store), 2)
+            eq_(store['53393526'], 1)
+            eq_(store['53393527'], 3)
+            ok_('53393528' not in store)
+
+    @raises(ValueError)
+    def test_invalid_file(self):
+        """Raises ValueError for an invalid file.
+        """
+        with open(self.path, 'wb') as store_file:
+            store_file.write(b'invalid mesh store file header')
+        MeshStore(self.path)
+
+    @raises(ValueError)
+    def test_truncated_file(self):
+        """Raises ValueError for a truncated file.
+        """
+        with MeshStoreWriter(self.path) as writer:
+            writer.add('5339', 1.0)
+        with open(self.path, 'rb+') as store_file:
+            store_file.truncate(os.path.getsize(self.path) - 1)
+        MeshStore(self.path)
+
+    @raises(ValueError)
+    def test_invalid_slot_count(self):
+        """Raises ValueError for a table without empty slots.
+        """
+        with MeshStoreWriter(self.path) as writer:
+            writer.add('5339', 1.0)
+        with open(self.path, 'rb+') as store_file:
+            store_file.seek(8)
+            store_file.write(struct.pack('<Q', 2))
+        MeshStore(self.path)
+
+    def test_full_table(self):
+        """Stops looking up a missing mesh in a table without empty slots.
+        """
+        with MeshStoreWriter(self.path) as writer:
+            writer.add('5339', 1.0)
+        with open(self.path, 'rb+') as store_file:
+            store_file.seek(32)
+            store_file.write(struct.pack(
+                '<QQ', pack_mesh_code('5339'), pack_mesh_code('5340')))
+        with MeshStore(self.path) as store:
+            ok_('5341' not in store)
+
+    @raises(ValueError)
+    def test_invalid_format(self):
+        """Raises ValueError for an invalid value format.
+        """
+        MeshStoreWriter(self.path, '<d')
+
+    def test_processes(self):
+        """Passes the store to worker processes by the path.
+        """
+        with MeshStoreWriter(self.path, 'q') as writer:
+            writer.update((code, int(code)) for code in ('5339', '5340'))
+        store = MeshStore(self.path)
+        eq_(pickle.loads(pickle.dumps(store))['5340'], 5340)
+        pool = multiprocessing.Pool(2)
+        try:
+            eq_(pool.map(_lookup, [(store, '5339'), (store, '5340')]),
+                [5339, 5340])
+        finally:
+            pool.terminate()
+            pool.join()
+        store.close()